@@ -1,18 +1,30 @@
-from . import types
-from ._anthropic import ChatAnthropic, ChatBedrockAnthropic
-from ._chat import Chat
-from ._content_image import content_image_file, content_image_plot, content_image_url
-from ._github import ChatGithub
-from ._google import ChatGoogle
-from ._groq import ChatGroq
-from ._interpolate import interpolate, interpolate_file
-from ._ollama import ChatOllama
-from ._openai import ChatAzureOpenAI, ChatOpenAI
-from ._perplexity import ChatPerplexity
-from ._provider import Provider
-from ._tokens import token_usage
-from ._tools import Tool
-from ._turn import Turn
+from typing import TYPE_CHECKING
+
+from ._utils import lazy_getattr
+
+if TYPE_CHECKING:
+    from . import types
+    from ._anthropic import ChatAnthropic, ChatBedrockAnthropic
+    from ._cache import LRUCache, ResponseCache, SQLiteCache
+    from ._chat import Chat
+    from ._content_image import (
+        content_image_file,
+        content_image_plot,
+        content_image_url,
+    )
+    from ._github import ChatGithub
+    from ._google import ChatGoogle
+    from ._groq import ChatGroq
+    from ._interpolate import interpolate, interpolate_file
+    from ._ollama import ChatOllama
+    from ._openai import ChatAzureOpenAI, ChatOpenAI
+    from ._perplexity import ChatPerplexity
+    from ._provider import Provider
+    from ._tokens import token_usage
+    from ._tools import Tool
+    from ._tracing import set_tracer
+    from ._turn import Turn
+    from ._usage import track_usage
 
 __all__ = (
     "ChatAnthropic",
@@ -30,9 +42,51 @@ __all__ = (
     "content_image_url",
     "interpolate",
     "interpolate_file",
+    "LRUCache",
     "Provider",
+    "ResponseCache",
+    "SQLiteCache",
+    "set_tracer",
     "token_usage",
     "Tool",
+    "track_usage",
     "Turn",
     "types",
 )
+
+# Exports are imported when first accessed (so `import chatlas` doesn't pay
+# for pydantic, rich, jinja2, etc. until they're actually needed)
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "ChatAnthropic": "._anthropic",
+        "ChatBedrockAnthropic": "._anthropic",
+        "ChatGithub": "._github",
+        "ChatGoogle": "._google",
+        "ChatGroq": "._groq",
+        "ChatOllama": "._ollama",
+        "ChatOpenAI": "._openai",
+        "ChatAzureOpenAI": "._openai",
+        "ChatPerplexity": "._perplexity",
+        "Chat": "._chat",
+        "content_image_file": "._content_image",
+        "content_image_plot": "._content_image",
+        "content_image_url": "._content_image",
+        "interpolate": "._interpolate",
+        "interpolate_file": "._interpolate",
+        "LRUCache": "._cache",
+        "Provider": "._provider",
+        "ResponseCache": "._cache",
+        "SQLiteCache": "._cache",
+        "set_tracer": "._tracing",
+        "token_usage": "._tokens",
+        "Tool": "._tools",
+        "track_usage": "._usage",
+        "Turn": "._turn",
+        "types": ".types",
+    },
+)
+
+
+def __dir__() -> list[str]:
+    return [*globals(), *__all__]
@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import json
 import warnings
-from typing import TYPE_CHECKING, Any, Literal, Optional, Union, cast, overload
+from typing import TYPE_CHECKING, Literal, Optional, Union, overload
 
 from pydantic import BaseModel
 
+from ._cache import keep_request, request_key, reuse_request
 from ._chat import Chat
+from ._clients import SharedClients
 from ._content import (
     Content,
     ContentImageInline,
@@ -17,19 +19,21 @@ from ._content import (
     ContentToolResult,
 )
 from ._provider import Provider
-from ._tokens import tokens_log
-from ._tools import Tool, basemodel_to_param_schema
+from ._ratelimit import credential_key
+from ._tools import Tool, basemodel_to_param_schema, cached_schema
+from ._tracing import span
 from ._turn import Turn, normalize_turns
+from ._usage import Tokens
 from ._utils import inform_model_default
 
 if TYPE_CHECKING:
+    from anthropic import Anthropic, AsyncAnthropic
     from anthropic.types import (
+        CacheControlEphemeralParam,
         Message,
         MessageParam,
         RawMessageStreamEvent,
-        TextBlock,
         ToolParam,
-        ToolUseBlock,
     )
     from anthropic.types.image_block_param import ImageBlockParam
     from anthropic.types.model_param import ModelParam
@@ -58,6 +62,7 @@ def ChatAnthropic(
     model: "Optional[ModelParam]" = None,
     api_key: Optional[str] = None,
     max_tokens: int = 4096,
+    prompt_caching: bool = False,
     kwargs: Optional["ChatClientArgs"] = None,
 ) -> Chat["SubmitInputArgs", Message]:
     """
@@ -117,6 +122,11 @@ def ChatAnthropic(
         variable.
     max_tokens
         Maximum number of tokens to generate before stopping.
+    prompt_caching
+        Whether to cache the (stable) start of each request, i.e., the system
+        prompt, tool definitions, and conversation so far, so that later
+        requests that start the same way are cheaper and faster. See the note
+        below for details.
     kwargs
         Additional arguments to pass to the `anthropic.Anthropic()` client
         constructor.
@@ -161,6 +171,17 @@ def ChatAnthropic(
     ```shell
     export ANTHROPIC_API_KEY=...
     ```
+
+    Note
+    ----
+    With `prompt_caching=True`, [cache
+    breakpoints](https://docs.anthropic.com/en/docs/build-with-claude/prompt-caching)
+    are placed on the system prompt, the last tool definition, and the last
+    turn of each request (within the API's limit of 4 breakpoints, including
+    any in `kwargs`). Prompts shorter than the model's minimum cacheable length
+    (e.g., 1024 tokens) aren't cached. The number of input tokens read from,
+    and written to, the cache are available from a turn's `.tokens` (as
+    `.cache_read` and `.cache_write`) and from [](`~chatlas.token_usage`).
     """
 
     if model is None:
@@ -171,6 +192,7 @@ def ChatAnthropic(
             api_key=api_key,
             model=model,
             max_tokens=max_tokens,
+            prompt_caching=prompt_caching,
             kwargs=kwargs,
         ),
         turns=normalize_turns(
@@ -180,13 +202,17 @@ def ChatAnthropic(
     )
 
 
-class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
+class AnthropicProvider(Provider[Message, RawMessageStreamEvent, "MessageAccumulator"]):
+    # The client attributes that identify the account requests are made with
+    _credentials: tuple[str, ...] = ("api_key", "auth_token")
+
     def __init__(
         self,
         *,
         max_tokens: int,
         model: str,
         api_key: str | None,
+        prompt_caching: bool = False,
         kwargs: Optional["ChatClientArgs"] = None,
     ):
         try:
@@ -199,6 +225,7 @@ class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
 
         self._model = model
         self._max_tokens = max_tokens
+        self._prompt_caching = prompt_caching
 
         kwargs_full: "ChatClientArgs" = {
             "api_key": api_key,
@@ -206,8 +233,17 @@ class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
         }
 
         # TODO: worth bringing in sync types?
-        self._client = Anthropic(**kwargs_full)  # type: ignore
-        self._async_client = AsyncAnthropic(**kwargs_full)
+        self._clients: SharedClients[Anthropic, AsyncAnthropic] = SharedClients(
+            Anthropic, AsyncAnthropic, kwargs_full
+        )
+
+    @property
+    def _client(self) -> "Anthropic":
+        return self._clients.client
+
+    @property
+    def _async_client(self) -> "AsyncAnthropic":
+        return self._clients.async_client
 
     @overload
     def chat_perform(
@@ -240,8 +276,14 @@ class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
         data_model: Optional[type[BaseModel]] = None,
         kwargs: Optional["SubmitInputArgs"] = None,
     ):
-        kwargs = self._chat_perform_args(stream, turns, tools, data_model, kwargs)
-        return self._client.messages.create(**kwargs)  # type: ignore
+        with span("chatlas.request.build"):
+            kwargs = reuse_request(
+                self,
+                (stream, turns, tools, data_model, kwargs),
+                self._chat_perform_args,
+            )
+        with span("chatlas.request", provider=self):
+            return self._client.messages.create(**kwargs)  # type: ignore
 
     @overload
     async def chat_perform_async(
@@ -274,8 +316,14 @@ class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
         data_model: Optional[type[BaseModel]] = None,
         kwargs: Optional["SubmitInputArgs"] = None,
     ):
-        kwargs = self._chat_perform_args(stream, turns, tools, data_model, kwargs)
-        return await self._async_client.messages.create(**kwargs)  # type: ignore
+        with span("chatlas.request.build"):
+            kwargs = reuse_request(
+                self,
+                (stream, turns, tools, data_model, kwargs),
+                self._chat_perform_args,
+            )
+        with span("chatlas.request", provider=self):
+            return await self._async_client.messages.create(**kwargs)  # type: ignore
 
     def _chat_perform_args(
         self,
@@ -286,27 +334,23 @@ class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
         kwargs: Optional["SubmitInputArgs"] = None,
     ) -> "SubmitInputArgs":
         tool_schemas = [
-            self._anthropic_tool_schema(tool.schema) for tool in tools.values()
+            cached_schema(
+                tool, "anthropic", lambda: self._anthropic_tool_schema(tool.schema)
+            )
+            for tool in tools.values()
         ]
 
         # If data extraction is requested, add a "mock" tool with parameters inferred from the data model
-        data_model_tool: Tool | None = None
         if data_model is not None:
-
-            def _structured_tool_call(**kwargs: Any):
-                """Extract structured data"""
-                pass
-
-            data_model_tool = Tool(_structured_tool_call)
-
-            data_model_tool.schema["function"]["parameters"] = {
-                "type": "object",
-                "properties": {
-                    "data": basemodel_to_param_schema(data_model),
-                },
-            }
-
-            tool_schemas.append(self._anthropic_tool_schema(data_model_tool.schema))
+            tool_schemas.append(
+                cached_schema(
+                    data_model,
+                    "anthropic",
+                    lambda: self._anthropic_tool_schema(
+                        data_model_tool_schema(data_model)
+                    ),
+                )
+            )
 
             if stream:
                 stream = False
@@ -323,59 +367,71 @@ class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
             **(kwargs or {}),
         }
 
-        if data_model_tool:
+        if data_model is not None:
             kwargs_full["tool_choice"] = {
                 "type": "tool",
-                "name": data_model_tool.name,
+                "name": "_structured_tool_call",
             }
 
         if "system" not in kwargs_full:
             if len(turns) > 0 and turns[0].role == "system":
                 kwargs_full["system"] = turns[0].text
 
+        if self._prompt_caching:
+            add_cache_breakpoints(
+                kwargs_full, MAX_CACHE_BREAKPOINTS - count_cache_breakpoints(kwargs)
+            )
+
         return kwargs_full
 
+    def cache_key(self, *, turns, tools, data_model=None, kwargs=None, stream=False):
+        args = (stream, turns, tools, data_model, kwargs)
+        request = self._chat_perform_args(*args)
+        keep_request(self, args, request)
+        # The same model may be served by different (e.g., compatible) APIs
+        return request_key(self, request, base_url=self._clients.base_url)
+
+    def rate_limit_key(self):
+        # (Providers with the same credentials share limits, whatever their
+        # other client options, e.g., timeouts)
+        clients = self._clients
+        credentials = [getattr(clients.client, x, None) for x in self._credentials]
+        return credential_key(self, clients.base_url, *credentials)
+
+    def usage_key(self):
+        name, _, model = super().usage_key()
+        return name, self._clients.base_url, model
+
     def stream_text(self, chunk) -> Optional[str]:
         if chunk.type == "content_block_delta" and chunk.delta.type == "text_delta":
             return chunk.delta.text
         return None
 
     def stream_merge_chunks(self, completion, chunk):
-        if chunk.type == "message_start":
-            return chunk.message
-        completion = cast("Message", completion)
-
-        if chunk.type == "content_block_start":
-            completion.content.append(chunk.content_block)
-        elif chunk.type == "content_block_delta":
-            this_content = completion.content[chunk.index]
-            if chunk.delta.type == "text_delta":
-                this_content = cast("TextBlock", this_content)
-                this_content.text += chunk.delta.text
-            elif chunk.delta.type == "input_json_delta":
-                this_content = cast("ToolUseBlock", this_content)
-                if not isinstance(this_content.input, str):
-                    this_content.input = ""
-                this_content.input += chunk.delta.partial_json
-        elif chunk.type == "content_block_stop":
-            this_content = completion.content[chunk.index]
-            if this_content.type == "tool_use" and isinstance(this_content.input, str):
-                try:
-                    this_content.input = json.loads(this_content.input or "{}")
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Invalid JSON input: {e}")
-        elif chunk.type == "message_delta":
-            completion.stop_reason = chunk.delta.stop_reason
-            completion.stop_sequence = chunk.delta.stop_sequence
-            completion.usage.output_tokens = chunk.usage.output_tokens
-
+        if completion is None:
+            completion = MessageAccumulator()
+        completion.add(chunk)
         return completion
 
+    def stream_tool_requests(self, completion, chunk) -> list[ContentToolRequest]:
+        if chunk.type != "content_block_stop":
+            return []
+        content = completion.message.content[chunk.index]
+        if content.type != "tool_use" or content.name == "_structured_tool_call":
+            return []
+        return [
+            ContentToolRequest(
+                content.id,
+                name=content.name,
+                arguments=content.input,
+            )
+        ]
+
     def stream_turn(self, completion, has_data_model, stream) -> Turn:
-        return self._as_turn(completion, has_data_model)
+        return self._as_turn(completion.result(), has_data_model)
 
     async def stream_turn_async(self, completion, has_data_model, stream) -> Turn:
-        return self._as_turn(completion, has_data_model)
+        return self._as_turn(completion.result(), has_data_model)
 
     def value_turn(self, completion, has_data_model) -> Turn:
         return self._as_turn(completion, has_data_model)
@@ -385,14 +441,20 @@ class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
         for turn in turns:
             if turn.role == "system":
                 continue  # system prompt passed as separate arg
-            if turn.role not in ["user", "assistant"]:
-                raise ValueError(f"Unknown role {turn.role}")
-
-            content = [self._as_content_block(c) for c in turn.contents]
-            role = "user" if turn.role == "user" else "assistant"
-            messages.append({"role": role, "content": content})
+            messages.append(
+                turn._cached_params(AnthropicProvider, self._turn_as_message_param)
+            )
         return messages
 
+    @staticmethod
+    def _turn_as_message_param(turn: Turn) -> "MessageParam":
+        if turn.role not in ["user", "assistant"]:
+            raise ValueError(f"Unknown role {turn.role}")
+
+        content = [AnthropicProvider._as_content_block(c) for c in turn.contents]
+        role = "user" if turn.role == "user" else "assistant"
+        return {"role": role, "content": content}
+
     @staticmethod
     def _as_content_block(content: Content) -> "ContentBlockParam":
         if isinstance(content, ContentText):
@@ -474,9 +536,17 @@ class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
                         )
                     )
 
-        tokens = completion.usage.input_tokens, completion.usage.output_tokens
-
-        tokens_log(self, tokens)
+        # (Anthropic's input tokens don't include those read from, or written
+        # to, the prompt cache)
+        usage = completion.usage
+        cache_read = usage.cache_read_input_tokens or 0
+        cache_write = usage.cache_creation_input_tokens or 0
+        tokens = Tokens(
+            usage.input_tokens + cache_read + cache_write,
+            usage.output_tokens,
+            cache_read=cache_read,
+            cache_write=cache_write,
+        )
 
         return Turn(
             "assistant",
@@ -487,6 +557,158 @@ class AnthropicProvider(Provider[Message, RawMessageStreamEvent, Message]):
         )
 
 
+def data_model_tool_schema(data_model: type[BaseModel]) -> "ChatCompletionToolParam":
+    """
+    The schema of a "mock" tool, whose (only) parameter is the data model, for
+    structured data extraction.
+    """
+    return {
+        "type": "function",
+        "function": {
+            "name": "_structured_tool_call",
+            "description": "Extract structured data",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "data": basemodel_to_param_schema(data_model),
+                },
+            },
+        },
+    }
+
+
+# The maximum number of `cache_control` breakpoints per request
+MAX_CACHE_BREAKPOINTS = 4
+
+
+def add_cache_breakpoints(request: "SubmitInputArgs", n: int) -> None:
+    """
+    Add (up to `n`) prompt caching breakpoints to a request: on the system
+    prompt, the last tool definition, and the last message (in that order).
+
+    The request's blocks are copied before they're marked, since they may be
+    shared (e.g., the cached params of turns and tools).
+    """
+    control: "CacheControlEphemeralParam" = {"type": "ephemeral"}
+
+    system = request.get("system")
+    if n > 0 and system:
+        if isinstance(system, str):
+            request["system"] = [
+                {"type": "text", "text": system, "cache_control": control}
+            ]
+            n -= 1
+        else:
+            blocks = list(system)
+            if "cache_control" not in blocks[-1]:
+                blocks[-1] = {**blocks[-1], "cache_control": control}
+                request["system"] = blocks
+                n -= 1
+
+    tools = request.get("tools")
+    if n > 0 and tools:
+        tools = list(tools)
+        if "cache_control" not in tools[-1]:
+            tools[-1] = {**tools[-1], "cache_control": control}  # type: ignore
+            request["tools"] = tools
+            n -= 1
+
+    messages = request.get("messages")
+    if n > 0 and messages:
+        messages = list(messages)
+        content = messages[-1]["content"]
+        if isinstance(content, str):
+            blocks: list = [{"type": "text", "text": content}]
+        else:
+            blocks = list(content)
+        if blocks and "cache_control" not in blocks[-1]:
+            blocks[-1] = {**blocks[-1], "cache_control": control}
+            messages[-1] = {**messages[-1], "content": blocks}
+            request["messages"] = messages
+
+
+def count_cache_breakpoints(x: object) -> int:
+    """
+    The number of `cache_control` breakpoints in (a part of) a request.
+    """
+    if isinstance(x, dict):
+        n = 1 if x.get("cache_control") else 0
+        return n + sum(count_cache_breakpoints(v) for v in x.values())
+    if isinstance(x, (list, tuple)):
+        return sum(count_cache_breakpoints(v) for v in x)
+    return 0
+
+
+class MessageAccumulator:
+    """
+    Accumulates streamed events (i.e., `RawMessageStreamEvent`s) into a
+    `Message`.
+
+    Text and tool input (JSON) deltas are buffered in a list of fragments per
+    content block, and only joined once the block is complete (i.e., on
+    `content_block_stop` or `message_stop`), so the work done per event doesn't
+    grow with the length of the response.
+    """
+
+    def __init__(self):
+        self._message: Message | None = None
+        self._fragments: dict[int, list[str]] = {}
+
+    @property
+    def message(self) -> Message:
+        if self._message is None:
+            raise ValueError("Expected a `message_start` event before any other.")
+        return self._message
+
+    def add(self, chunk: RawMessageStreamEvent) -> None:
+        if chunk.type == "message_start":
+            self._message = chunk.message
+            return
+
+        completion = self.message
+        if chunk.type == "content_block_start":
+            completion.content.append(chunk.content_block)
+        elif chunk.type == "content_block_delta":
+            if chunk.delta.type == "text_delta":
+                fragment = chunk.delta.text
+            elif chunk.delta.type == "input_json_delta":
+                fragment = chunk.delta.partial_json
+            else:
+                return
+            if chunk.index not in self._fragments:
+                self._fragments[chunk.index] = []
+            self._fragments[chunk.index].append(fragment)
+        elif chunk.type == "content_block_stop":
+            self._flush(chunk.index)
+        elif chunk.type == "message_delta":
+            completion.stop_reason = chunk.delta.stop_reason
+            completion.stop_sequence = chunk.delta.stop_sequence
+            completion.usage.output_tokens = chunk.usage.output_tokens
+        elif chunk.type == "message_stop":
+            for index in list(self._fragments):
+                self._flush(index)
+
+    def result(self) -> Message:
+        for index in list(self._fragments):
+            self._flush(index)
+        return self.message
+
+    def _flush(self, index: int) -> None:
+        fragments = self._fragments.pop(index, None)
+        this_content = self.message.content[index]
+        if this_content.type == "text":
+            if fragments:
+                this_content.text += "".join(fragments)
+        elif this_content.type == "tool_use":
+            if fragments is not None:
+                this_content.input = "".join(fragments)
+            if isinstance(this_content.input, str):
+                try:
+                    this_content.input = json.loads(this_content.input or "{}")
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON input: {e}")
+
+
 def ChatBedrockAnthropic(
     *,
     model: Optional[str] = None,
@@ -499,6 +721,7 @@ def ChatBedrockAnthropic(
     base_url: Optional[str] = None,
     system_prompt: Optional[str] = None,
     turns: Optional[list[Turn]] = None,
+    prompt_caching: bool = False,
     kwargs: Optional["ChatBedrockClientArgs"] = None,
 ) -> Chat["SubmitInputArgs", Message]:
     """
@@ -571,6 +794,9 @@ def ChatBedrockAnthropic(
         message in the list should be a dictionary with at least `role` (usually
         `system`, `user`, or `assistant`, but `tool` is also possible). Normally
         there is also a `content` field, which is a string.
+    prompt_caching
+        Whether to cache the (stable) start of each request (for models that
+        support prompt caching). See [](`~chatlas.ChatAnthropic`) for details.
     kwargs
         Additional arguments to pass to the `anthropic.AnthropicBedrock()`
         client constructor.
@@ -595,6 +821,7 @@ def ChatBedrockAnthropic(
             aws_profile=aws_profile,
             aws_session_token=aws_session_token,
             base_url=base_url,
+            prompt_caching=prompt_caching,
             kwargs=kwargs,
         ),
         turns=normalize_turns(
@@ -605,6 +832,8 @@ def ChatBedrockAnthropic(
 
 
 class AnthropicBedrockProvider(AnthropicProvider):
+    _credentials = ("aws_access_key", "aws_profile", "aws_region")
+
     def __init__(
         self,
         *,
@@ -616,6 +845,7 @@ class AnthropicBedrockProvider(AnthropicProvider):
         aws_session_token: str | None,
         max_tokens: int,
         base_url: str | None,
+        prompt_caching: bool = False,
         kwargs: Optional["ChatBedrockClientArgs"] = None,
     ):
         try:
@@ -628,6 +858,7 @@ class AnthropicBedrockProvider(AnthropicProvider):
 
         self._model = model
         self._max_tokens = max_tokens
+        self._prompt_caching = prompt_caching
 
         kwargs_full: "ChatBedrockClientArgs" = {
             "aws_secret_key": aws_secret_key,
@@ -639,5 +870,6 @@ class AnthropicBedrockProvider(AnthropicProvider):
             **(kwargs or {}),
         }
 
-        self._client = AnthropicBedrock(**kwargs_full)  # type: ignore
-        self._async_client = AsyncAnthropicBedrock(**kwargs_full)  # type: ignore
+        self._clients = SharedClients(  # type: ignore
+            AnthropicBedrock, AsyncAnthropicBedrock, kwargs_full
+        )
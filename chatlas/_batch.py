@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence, Union, overload
+
+from ._content import Content
+
+if TYPE_CHECKING:
+    from ._chat import Chat
+
+__all__ = (
+    "ChatBatchResponse",
+    "ChatBatchResult",
+)
+
+BatchPrompt = Union[str, Content, Sequence[Union[Content, str]]]
+
+
+@dataclass
+class ChatBatchResult:
+    """
+    The result of submitting one prompt of a batch.
+
+    Attributes
+    ----------
+    index
+        The position of the prompt in the batch.
+    chat
+        The copy of the chat that the prompt was submitted to. Its turns
+        include the prompt and the response (when successful).
+    content
+        The text content of the response, or `None` if the request failed (or
+        was a data extraction).
+    data
+        The extracted data (for `.extract_data_many()`), or `None` if the
+        extraction failed.
+    error
+        The exception raised while generating the response, or `None` if it
+        succeeded.
+    tokens
+        The number of input and output tokens used (respectively).
+    """
+
+    index: int
+    chat: "Chat"
+    content: Optional[str] = None
+    data: Optional[dict[str, Any]] = None
+    error: Optional[Exception] = None
+    tokens: tuple[int, int] = (0, 0)
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the response was generated successfully.
+        """
+        return self.error is None
+
+
+class ChatBatchResponse(Sequence[ChatBatchResult]):
+    """
+    The results of a batch of prompts (in the order they were submitted).
+
+    This is a sequence of [](`~chatlas.types.ChatBatchResult`) objects, one for
+    each prompt.
+    """
+
+    def __init__(self, results: list[ChatBatchResult]):
+        self.results = results
+
+    @overload
+    def __getitem__(self, index: int) -> ChatBatchResult: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[ChatBatchResult]: ...
+
+    def __getitem__(self, index):
+        return self.results[index]
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __repr__(self) -> str:
+        n_errors = len(self.errors())
+        return f"<ChatBatchResponse results={len(self)} errors={n_errors}>"
+
+    def contents(self) -> list[Optional[str]]:
+        """
+        The text content of each response (`None` for failed requests).
+        """
+        return [x.content for x in self.results]
+
+    def data(self) -> list[Optional[dict[str, Any]]]:
+        """
+        The extracted data of each input (`None` for failed extractions).
+        """
+        return [x.data for x in self.results]
+
+    def errors(self) -> list[ChatBatchResult]:
+        """
+        The results of the requests that failed.
+        """
+        return [x for x in self.results if not x.ok]
+
+    def tokens(self) -> tuple[int, int]:
+        """
+        The total number of input and output tokens used by the batch.
+        """
+        input_ = sum(x.tokens[0] for x in self.results)
+        output = sum(x.tokens[1] for x in self.results)
+        return input_, output
+
+
+def batch_args(prompt: BatchPrompt) -> list[Content | str]:
+    if isinstance(prompt, (str, Content)):
+        return [prompt]
+    return list(prompt)
+
+
+def batch_result(
+    index: int,
+    chat: Chat,
+    n_turns: int,
+    content: Optional[str] = None,
+    data: Optional[dict[str, Any]] = None,
+    error: Optional[Exception] = None,
+) -> ChatBatchResult:
+    # Tokens are only recorded on the assistant turns added by this prompt
+    tokens = [x.tokens for x in chat._turns[n_turns:] if x.tokens]
+    total = (sum(x[0] for x in tokens), sum(x[1] for x in tokens))
+    return ChatBatchResult(index, chat, content, data, error, total)
+
+
+class BatchProgress:
+    """
+    Report progress (i.e., the number of completed prompts and the total) to a
+    callback, one call at a time.
+    """
+
+    def __init__(self, total: int, callback: Optional[Callable[[int, int], None]]):
+        self.total = total
+        self.done = 0
+        self._callback = callback
+        self._lock = threading.Lock()
+
+    def advance(self) -> None:
+        with self._lock:
+            self.done += 1
+            if self._callback is not None:
+                self._callback(self.done, self.total)
@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional, TypeVar, Union
+
+from pydantic import BaseModel
+
+from ._turn import Turn
+
+if TYPE_CHECKING:
+    from ._provider import Provider
+
+__all__ = (
+    "CachedResponse",
+    "LRUCache",
+    "ResponseCache",
+    "SQLiteCache",
+)
+
+
+@dataclass
+class CachedResponse:
+    """
+    A (cached) response to a chat request.
+
+    Parameters
+    ----------
+    turn
+        The assistant turn that was produced by the request.
+    chunks
+        The text chunks that were streamed (if the response was streamed).
+    """
+
+    turn: Turn
+    chunks: Optional[list[str]] = None
+
+    def replay(self, stream: bool) -> list[str]:
+        """
+        The text chunks to yield when replaying the response.
+        """
+        if stream and self.chunks is not None:
+            return self.chunks
+        return [self.turn.text] if self.turn.text else []
+
+
+class ResponseCache(ABC):
+    """
+    A cache of responses to chat requests.
+
+    A cache may be attached to a [](`~chatlas.Chat`) via
+    [](`~chatlas.Chat.set_cache`), in which case requests that are identical to
+    a previous one (i.e., same provider, model, messages, tools, data model, and
+    submit arguments) are answered from the cache rather than the provider.
+    Implement this class to provide your own storage backend.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        Get the response for a key, or `None` if it isn't in the cache (or has
+        expired).
+        """
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: CachedResponse) -> None:
+        """
+        Store the response for a key.
+        """
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Remove all the responses from the cache.
+        """
+        ...
+
+
+class LRUCache(ResponseCache):
+    """
+    An in-memory, least recently used, response cache.
+
+    Parameters
+    ----------
+    max_size
+        The maximum number of responses to keep. When exceeded, the least
+        recently used responses are evicted.
+    ttl
+        The number of seconds after which a response expires. If `None` (the
+        default), responses never expire.
+    """
+
+    def __init__(self, max_size: int = 128, ttl: Optional[float] = None):
+        if max_size < 1:
+            raise ValueError("`max_size` must be at least 1.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Maps keys to (expiry time, response)
+        self._entries: OrderedDict[str, tuple[float, CachedResponse]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy_response(entry[1])
+
+    def set(self, key: str, value: CachedResponse) -> None:
+        expires = time.time() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, copy_response(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(ResponseCache):
+    """
+    An on-disk response cache (backed by a SQLite database).
+
+    Responses are pickled, so only use a database that you trust.
+
+    Parameters
+    ----------
+    path
+        The path to the database file (which is created if necessary).
+    ttl
+        The number of seconds after which a response expires. If `None` (the
+        default), responses never expire.
+    max_size
+        The maximum total size (in bytes) of the stored responses. When
+        exceeded, the least recently used responses are evicted. If `None`
+        (the default), there is no limit.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl: Optional[float] = None,
+        max_size: Optional[int] = None,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+        import sqlite3
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires REAL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires = row
+            if expires is not None and expires <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return pickle.loads(value)
+
+    def set(self, key: str, value: CachedResponse) -> None:
+        data = pickle_response(value)
+        now = time.time()
+        expires = now + self.ttl if self.ttl is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), expires, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+        if self.max_size is None:
+            return
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_size:
+            return
+        # Evict the least recently used responses until we're under budget
+        evict: list[tuple[str]] = []
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed")
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            evict.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        """
+        Close the connection to the database.
+        """
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (n,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return n
+
+
+def request_hash(provider: Provider, request: Any) -> str:
+    """
+    A stable hash of a (provider-specific) request.
+
+    Parameters
+    ----------
+    provider
+        The provider that would perform the request.
+    request
+        Everything (i.e., model, messages, tools, etc.) that determines the
+        response to the request.
+
+    Raises
+    ------
+    TypeError
+        If the request has a value that can't be represented the same way in
+        every process (i.e., other than JSON values, pydantic models and
+        classes, sets, bytes, enums, and objects with a `.to_dict()`).
+    """
+    cls = type(provider)
+    data = {"provider": f"{cls.__module__}.{cls.__qualname__}", "request": request}
+    dump = json.dumps(data, sort_keys=True, default=_jsonable, ensure_ascii=False)
+    return hashlib.sha256(dump.encode("utf-8")).hexdigest()
+
+
+# Arguments that only affect how a response is delivered, not what it is (a
+# cached response can be replayed either way)
+STREAM_ARGS = ("stream", "stream_options")
+
+
+def request_key(
+    provider: Provider, request: Mapping[str, Any], **extra: Any
+) -> Optional[str]:
+    """
+    The hash of a (provider-specific) request, whether or not it's streamed,
+    along with any `extra` configuration (e.g., base URL) that determines its
+    response. Returns `None` (i.e., the response isn't cached) if the request
+    has a value that can't be hashed stably (e.g., an arbitrary object).
+    """
+    request = {k: v for k, v in request.items() if k not in STREAM_ARGS}
+    try:
+        return request_hash(provider, {**extra, **request})
+    except TypeError:
+        return None
+
+
+RequestT = TypeVar("RequestT")
+
+# The last request that was built for a cache key, so that the call that
+# follows can send it, rather than build it again
+_kept_request: ContextVar[Optional[tuple[Any, tuple[Any, ...], Any]]] = ContextVar(
+    "chatlas_kept_request", default=None
+)
+
+
+def keep_request(provider: Provider, args: tuple[Any, ...], request: Any) -> None:
+    """
+    Keep a request (built from `args`) for `reuse_request()`.
+    """
+    _kept_request.set((provider, args, request))
+
+
+def reuse_request(
+    provider: Provider, args: tuple[Any, ...], build: Callable[..., RequestT]
+) -> RequestT:
+    """
+    Get the request that was kept for the same provider and (identical)
+    `args`, or otherwise build it with `build(*args)`.
+    """
+    kept = _kept_request.get()
+    if kept is not None:
+        _kept_request.set(None)
+        kept_provider, kept_args, request = kept
+        # (Compared by identity, since the args are the very same objects when
+        # the request follows its cache key)
+        if (
+            kept_provider is provider
+            and len(kept_args) == len(args)
+            and all(x is y for x, y in zip(kept_args, args))
+        ):
+            return request
+    return build(*args)
+
+
+def _jsonable(x: Any) -> Any:
+    if isinstance(x, BaseModel):
+        return x.model_dump()
+    if isinstance(x, (set, frozenset)):
+        return sorted(x, key=repr)
+    if isinstance(x, bytes):
+        return x.hex()
+    if isinstance(x, type) and issubclass(x, BaseModel):
+        return x.model_json_schema()
+    if isinstance(x, Enum):
+        return x.value
+    # E.g., the (proto-plus) messages of Gemini requests, whose to_dict() is a
+    # class method that takes the message
+    to_dict = getattr(type(x), "to_dict", None)
+    if callable(to_dict):
+        return to_dict(x)
+    # (Not repr(x), which, by default, includes the object's address, and so
+    # differs between processes)
+    raise TypeError(f"Can't hash a {type(x).__name__} for a cache key.")
+
+
+def copy_response(x: CachedResponse) -> CachedResponse:
+    # Chats hold on to (and mutate the provider param caches of) their turns,
+    # so never share a turn between the cache and a chat
+    turn = copy.copy(x.turn)
+    turn.contents = list(turn.contents)
+    turn._params_cache = {}
+    chunks = None if x.chunks is None else list(x.chunks)
+    return CachedResponse(turn, chunks)
+
+
+def pickle_response(x: CachedResponse) -> bytes:
+    x = copy_response(x)
+    try:
+        return pickle.dumps(x)
+    except Exception:
+        # Not all completion objects (which are provider-specific) can be
+        # pickled, but they aren't needed to replay the response
+        x.turn.completion = None
+        return pickle.dumps(x)
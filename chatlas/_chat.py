@@ -1,10 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import copy
+import functools
+import itertools
+import json
 import os
-from contextlib import contextmanager
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from threading import Thread
 from typing import (
+    TYPE_CHECKING,
     Any,
     AsyncGenerator,
     AsyncIterator,
@@ -17,12 +28,22 @@ from typing import (
     Optional,
     Sequence,
     TypeVar,
+    Union,
 )
 from uuid import uuid4
 
 from pydantic import BaseModel
-from rich.live import Live
 
+from ._batch import (
+    BatchProgress,
+    BatchPrompt,
+    ChatBatchResponse,
+    ChatBatchResult,
+    batch_args,
+    batch_result,
+)
+from ._cache import CachedResponse, ResponseCache
+from ._compact import SUMMARY_PROMPT, Compactor
 from ._content import (
     Content,
     ContentJson,
@@ -31,10 +52,29 @@ from ._content import (
     ContentToolResult,
 )
 from ._provider import Provider
-from ._tools import Tool
+from ._ratelimit import rate_limiter
+from ._serialize import read_turns, turns_from_dict, turns_to_dict, write_turns
+from ._stats import ResponseStats, RoundStats
+from ._tokens import TokenEncoding, Tokenizer, default_tokenizer, estimate_tokens
+from ._tools import Tool, cached_schema
+from ._tracing import (
+    child_spans,
+    open_span,
+    propagate,
+    set_attributes,
+    span,
+    usage_attributes,
+)
+from ._trim import ContextTrimmer
 from ._turn import Turn, user_turn
 from ._typing_extensions import TypedDict
-from ._utils import html_escape
+from ._usage import TokenUsage, UsageLedger, record_usage
+from ._utils import MISSING, MISSING_TYPE, html_escape, wrap_async
+
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+    from rich.console import RenderableType
+    from rich.segment import SegmentLines
 
 
 class AnyTypeDict(TypedDict, total=False):
@@ -87,7 +127,19 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
             "rich_markdown": {},
             "rich_console": {},
             "css_styles": {},
+            "refresh_interval": 0.1,
+        }
+        self._tool_options: ToolOptions = {
+            "max_concurrency": None,
+            "use_threads": False,
+            "eager": False,
         }
+        self._cache: Optional[ResponseCache] = None
+        self._trimmer: Optional[ContextTrimmer] = None
+        self._compactor: Optional[Compactor] = None
+        self._usage = UsageLedger()
+        self._tokenizer: Optional[Tokenizer] = None
+        self._stats_callback: Optional[Callable[[ResponseStats], None]] = None
 
     def turns(
         self,
@@ -148,6 +200,10 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
                 "Consider removing this turn and setting the `.system_prompt` separately "
                 "if you want to change the system prompt."
             )
+        # The turns may have been modified since they were last sent, so
+        # don't trust any previously converted provider params
+        for turn in turns:
+            turn._reset_params_cache()
         self._turns = list(turns)
 
     @property
@@ -162,7 +218,7 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
     @system_prompt.setter
     def system_prompt(self, value: str | None):
         if self._turns and self._turns[0].role == "system":
-            self._turns.pop(0)
+            self._turns.pop(0)._reset_params_cache()
         if value is not None:
             self._turns.insert(0, Turn("system", value))
 
@@ -178,6 +234,24 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
         """
         return [turn.tokens for turn in self._turns]
 
+    def token_usage(self) -> list[TokenUsage] | None:
+        """
+        Report on the token usage of this chat.
+
+        Unlike [](`~chatlas.token_usage`), which reports on the whole session,
+        this only includes the requests made by this chat (including those of
+        its batches, e.g., `.chat_batch()` and `.extract_data_many()`).
+        Responses from a cache (see `.set_cache()`) aren't included.
+
+        Returns
+        -------
+        list[TokenUsage] | None
+            A list of dictionaries, one per provider (name), base URL, and
+            model (see [](`~chatlas.types.TokenUsage`)). If this chat hasn't
+            made any requests, then None is returned.
+        """
+        return self._usage.token_usage()
+
     def app(
         self,
         *,
@@ -327,6 +401,7 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
             get the text content of the response.
         """
         turn = user_turn(*args)
+        stats = ResponseStats()
 
         response = ChatResponse(
             self._chat_impl(
@@ -334,7 +409,9 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
                 echo=echo,
                 stream=stream,
                 kwargs=kwargs,
-            )
+                stats=stats,
+            ),
+            stats=stats,
         )
 
         for _ in response:
@@ -373,6 +450,7 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
             get the text content of the response.
         """
         turn = user_turn(*args)
+        stats = ResponseStats()
 
         response = ChatResponseAsync(
             self._chat_impl_async(
@@ -380,7 +458,9 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
                 echo=echo,
                 stream=stream,
                 kwargs=kwargs,
+                stats=stats,
             ),
+            stats=stats,
         )
 
         async for _ in response:
@@ -388,6 +468,198 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
 
         return response
 
+    def chat_batch(
+        self,
+        prompts: Sequence[BatchPrompt],
+        *,
+        max_concurrency: int = 10,
+        stream: bool = False,
+        kwargs: Optional[SubmitInputArgsT] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> ChatBatchResponse:
+        """
+        Generate responses to many (independent) prompts.
+
+        Each prompt is submitted to a copy of the chat (i.e., with the current
+        turns, system prompt, and tools), so the prompts don't see each other,
+        and the chat itself is left unchanged. Prompts are submitted from a
+        pool of (at most `max_concurrency`) threads, so this is best suited to
+        synchronous tools (or none at all). See `.chat_batch_async()` for an
+        asynchronous version.
+
+        Parameters
+        ----------
+        prompts
+            The prompts to submit. Each prompt is either a string (or
+            [](`~chatlas.types.Content`)) or a list of them.
+        max_concurrency
+            The maximum number of prompts to submit at the same time.
+        stream
+            Whether to stream the responses.
+        kwargs
+            Additional keyword arguments to pass to the method used for
+            requesting the responses.
+        on_progress
+            A function that is called (with the number of completed prompts and
+            the total number of prompts) every time a prompt completes. Calls
+            are made one at a time, but from the pool's threads.
+
+        Returns
+        -------
+        ChatBatchResponse
+            The results for each prompt (in the order of `prompts`). A failed
+            request doesn't stop the rest of the batch; instead, the error is
+            recorded in its result.
+        """
+
+        def submit(chat: Chat, prompt: BatchPrompt) -> dict[str, Any]:
+            response = chat.chat(
+                *batch_args(prompt),
+                echo="none",
+                stream=stream,
+                kwargs=kwargs,
+            )
+            return {"content": response.content}
+
+        return self._batch(prompts, submit, max_concurrency, on_progress)
+
+    async def chat_batch_async(
+        self,
+        prompts: Sequence[BatchPrompt],
+        *,
+        max_concurrency: int = 10,
+        stream: bool = False,
+        kwargs: Optional[SubmitInputArgsT] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> ChatBatchResponse:
+        """
+        Generate responses to many (independent) prompts asynchronously.
+
+        Each prompt is submitted to a copy of the chat (i.e., with the current
+        turns, system prompt, and tools), so the prompts don't see each other,
+        and the chat itself is left unchanged.
+
+        Parameters
+        ----------
+        prompts
+            The prompts to submit. Each prompt is either a string (or
+            [](`~chatlas.types.Content`)) or a list of them.
+        max_concurrency
+            The maximum number of prompts to submit at the same time.
+        stream
+            Whether to stream the responses.
+        kwargs
+            Additional keyword arguments to pass to the method used for
+            requesting the responses.
+        on_progress
+            A function that is called (with the number of completed prompts and
+            the total number of prompts) every time a prompt completes.
+
+        Returns
+        -------
+        ChatBatchResponse
+            The results for each prompt (in the order of `prompts`). A failed
+            request doesn't stop the rest of the batch; instead, the error is
+            recorded in its result.
+        """
+
+        async def submit(chat: Chat, prompt: BatchPrompt) -> dict[str, Any]:
+            response = await chat.chat_async(
+                *batch_args(prompt),
+                echo="none",
+                stream=stream,
+                kwargs=kwargs,
+            )
+            return {"content": response.content}
+
+        return await self._batch_async(prompts, submit, max_concurrency, on_progress)
+
+    def _batch(
+        self,
+        prompts: Sequence[BatchPrompt],
+        submit: Callable[[Chat, BatchPrompt], dict[str, Any]],
+        max_concurrency: int,
+        on_progress: Optional[Callable[[int, int], None]],
+    ) -> ChatBatchResponse:
+        """
+        Submit each prompt to a copy of the chat (from a pool of threads).
+        """
+        if max_concurrency < 1:
+            raise ValueError("`max_concurrency` must be a positive integer.")
+
+        progress = BatchProgress(len(prompts), on_progress)
+        # (Prompts are submitted in (copies of) the caller's context, e.g., so
+        # they're measured by its `track_usage()` scopes)
+        context = contextvars.copy_context()
+
+        def run(index: int, prompt: BatchPrompt) -> ChatBatchResult:
+            chat = self._clone()
+            n_turns = len(chat._turns)
+            try:
+                fields = context.copy().run(submit, chat, prompt)
+                result = batch_result(index, chat, n_turns, **fields)
+            except Exception as e:
+                result = batch_result(index, chat, n_turns, error=e)
+            progress.advance()
+            return result
+
+        with ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="chatlas-batch",
+        ) as executor:
+            results = list(executor.map(run, range(len(prompts)), prompts))
+
+        return ChatBatchResponse(results)
+
+    async def _batch_async(
+        self,
+        prompts: Sequence[BatchPrompt],
+        submit: Callable[[Chat, BatchPrompt], Awaitable[dict[str, Any]]],
+        max_concurrency: int,
+        on_progress: Optional[Callable[[int, int], None]],
+    ) -> ChatBatchResponse:
+        """
+        Submit each prompt to a copy of the chat (as concurrent tasks).
+        """
+        if max_concurrency < 1:
+            raise ValueError("`max_concurrency` must be a positive integer.")
+
+        progress = BatchProgress(len(prompts), on_progress)
+        limiter = asyncio.Semaphore(max_concurrency)
+
+        async def run(index: int, prompt: BatchPrompt) -> ChatBatchResult:
+            chat = self._clone()
+            n_turns = len(chat._turns)
+            async with limiter:
+                try:
+                    fields = await submit(chat, prompt)
+                    result = batch_result(index, chat, n_turns, **fields)
+                except Exception as e:
+                    result = batch_result(index, chat, n_turns, error=e)
+            progress.advance()
+            return result
+
+        results = await asyncio.gather(
+            *(run(i, prompt) for i, prompt in enumerate(prompts))
+        )
+
+        return ChatBatchResponse(list(results))
+
+    def _clone(self) -> Chat:
+        """
+        A copy of the chat that can be submitted to independently.
+        """
+        chat = copy.copy(self)
+        chat._turns = list(self._turns)
+        chat.tools = dict(self.tools)
+        if self._trimmer is not None:
+            trimmer = self._trimmer
+            chat._trimmer = ContextTrimmer(trimmer.total, trimmer.reserve)
+        if self._compactor is not None:
+            # (Clones are thrown away, along with any summary they'd make)
+            chat._compactor = self._compactor.copy(frozen=True)
+        return chat
+
     def stream(
         self,
         *args: Content | str,
@@ -415,13 +687,16 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
             consume the response.
         """
         turn = user_turn(*args)
+        stats = ResponseStats()
         return ChatResponse(
             self._chat_impl(
                 turn,
                 stream=True,
                 echo=echo,
                 kwargs=kwargs,
+                stats=stats,
             ),
+            stats=stats,
         )
 
     async def stream_async(
@@ -451,13 +726,16 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
             consume the response.
         """
         turn = user_turn(*args)
+        stats = ResponseStats()
         return ChatResponseAsync(
             self._chat_impl_async(
                 turn,
                 stream=True,
                 echo=echo,
                 kwargs=kwargs,
+                stats=stats,
             ),
+            stats=stats,
         )
 
     def extract_data(
@@ -487,7 +765,8 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
             The extracted data.
         """
 
-        with self._display_context() as display:
+        stats = ResponseStats()
+        with self._display_context(echo) as display:
             response = ChatResponse(
                 self._submit_turns(
                     user_turn(*args),
@@ -495,11 +774,14 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
                     echo=echo,
                     display=display,
                     stream=stream,
-                )
+                    stats=stats,
+                ),
+                stats=stats,
             )
 
         for _ in response:
             pass
+        self._finish_stats(stats)
 
         turn = self.last_turn()
         assert turn is not None
@@ -545,7 +827,8 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
             The extracted data.
         """
 
-        with self._display_context() as display:
+        stats = ResponseStats()
+        with self._display_context(echo) as display:
             response = ChatResponseAsync(
                 self._submit_turns_async(
                     user_turn(*args),
@@ -553,11 +836,14 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
                     echo=echo,
                     display=display,
                     stream=stream,
-                )
+                    stats=stats,
+                ),
+                stats=stats,
             )
 
         async for _ in response:
             pass
+        self._finish_stats(stats)
 
         turn = self.last_turn()
         assert turn is not None
@@ -575,11 +861,103 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
         json = res[0]
         return json.value
 
+    def extract_data_many(
+        self,
+        prompts: Sequence[BatchPrompt],
+        *,
+        data_model: type[BaseModel],
+        max_concurrency: int = 10,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> ChatBatchResponse:
+        """
+        Extract structured data from many prompts.
+
+        Unlike calling `.extract_data()` in a loop, the extractions run
+        concurrently (from a pool of threads), and each one is submitted to a
+        copy of the chat, so they're independent of each other and the chat's
+        turns don't grow. See `.extract_data_many_async()` for an asynchronous
+        version.
+
+        Parameters
+        ----------
+        prompts
+            The prompts to extract data from. Each prompt is either a string (or
+            [](`~chatlas.types.Content`)) or a list of them.
+        data_model
+            A Pydantic model describing the structure of the data to extract.
+        max_concurrency
+            The maximum number of extractions to run at the same time.
+        on_progress
+            A function that is called (with the number of completed extractions
+            and the total number of prompts) every time an extraction completes.
+            Calls are made one at a time, but from the pool's threads.
+
+        Returns
+        -------
+        ChatBatchResponse
+            The results for each prompt (in the order of `prompts`). The
+            extracted data is available via `.data()` (or the `data` of each
+            result), and a failed extraction records its error rather than
+            stopping the rest.
+        """
+
+        def submit(chat: Chat, prompt: BatchPrompt) -> dict[str, Any]:
+            data = chat.extract_data(*batch_args(prompt), data_model=data_model)
+            return {"data": data}
+
+        return self._batch(prompts, submit, max_concurrency, on_progress)
+
+    async def extract_data_many_async(
+        self,
+        prompts: Sequence[BatchPrompt],
+        *,
+        data_model: type[BaseModel],
+        max_concurrency: int = 10,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> ChatBatchResponse:
+        """
+        Extract structured data from many prompts asynchronously.
+
+        Unlike calling `.extract_data_async()` in a loop, the extractions run
+        concurrently, and each one is submitted to a copy of the chat, so
+        they're independent of each other and the chat's turns don't grow.
+
+        Parameters
+        ----------
+        prompts
+            The prompts to extract data from. Each prompt is either a string (or
+            [](`~chatlas.types.Content`)) or a list of them.
+        data_model
+            A Pydantic model describing the structure of the data to extract.
+        max_concurrency
+            The maximum number of extractions to run at the same time.
+        on_progress
+            A function that is called (with the number of completed extractions
+            and the total number of prompts) every time an extraction completes.
+
+        Returns
+        -------
+        ChatBatchResponse
+            The results for each prompt (in the order of `prompts`). The
+            extracted data is available via `.data()` (or the `data` of each
+            result), and a failed extraction records its error rather than
+            stopping the rest.
+        """
+
+        async def submit(chat: Chat, prompt: BatchPrompt) -> dict[str, Any]:
+            data = await chat.extract_data_async(
+                *batch_args(prompt), data_model=data_model
+            )
+            return {"data": data}
+
+        return await self._batch_async(prompts, submit, max_concurrency, on_progress)
+
     def register_tool(
         self,
         func: Callable[..., Any] | Callable[..., Awaitable[Any]],
         *,
         model: Optional[type[BaseModel]] = None,
+        max_concurrency: Optional[int] = None,
     ):
         """
         Register a tool (function) with the chat.
@@ -654,8 +1032,12 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
             The primary reason why you might want to provide a model in
             Note that the name and docstring of the model takes precedence over the
             name and docstring of the function.
+        max_concurrency
+            The maximum number of calls to this tool that may run at the same
+            time when the model requests several of them in one turn. If `None`
+            (the default), there is no tool-specific limit.
         """
-        tool = Tool(func, model=model)
+        tool = Tool(func, model=model, max_concurrency=max_concurrency)
         self.tools[tool.name] = tool
 
     def export(
@@ -757,6 +1139,106 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
 
         return filename
 
+    def to_dict(self, *, completions: bool = False) -> dict[str, Any]:
+        """
+        Convert the chat's turns (including the system prompt) into a
+        dictionary, e.g., to save and restore a conversation.
+
+        Parameters
+        ----------
+        completions
+            Whether to include the (provider-specific) completion object of each
+            turn, as a dictionary. By default, completions are dropped, since
+            they're large, and usually not needed to continue a conversation.
+
+        Returns
+        -------
+        dict[str, Any]
+            A (JSON-serializable) dictionary, which can be restored with
+            `.from_dict()`.
+
+        Note
+        ----
+        The data of inline images is stored once (in the dictionary's
+        `"images"`), no matter how many turns refer to it. Tool results that
+        JSON can't represent are stored as strings (i.e., as they're sent to the
+        model).
+        """
+        return turns_to_dict(self._turns, completions=completions)
+
+    def from_dict(self, data: dict[str, Any]) -> Chat:
+        """
+        Restore the turns (including the system prompt) of a chat from a
+        dictionary created by `.to_dict()`.
+
+        Parameters
+        ----------
+        data
+            A dictionary created by `.to_dict()`.
+
+        Returns
+        -------
+        Chat
+            The chat itself (with its turns replaced).
+
+        Examples
+        --------
+        ```python
+        from chatlas import ChatOpenAI
+
+        chat = ChatOpenAI()
+        chat.chat("What is the capital of France?")
+        data = chat.to_dict()
+
+        # Later (e.g., in another request)
+        chat = ChatOpenAI().from_dict(data)
+        chat.chat("And of Germany?")
+        ```
+        """
+        self._turns = turns_from_dict(data)
+        return self
+
+    def save(self, path: str | Path, *, completions: bool = False) -> Path:
+        """
+        Save the chat's turns (including the system prompt) to a file.
+
+        Parameters
+        ----------
+        path
+            The file to save to. If it has a `.msgpack` (or `.mpk`) extension,
+            the turns are written with MessagePack (which requires the `msgpack`
+            package), and otherwise as JSON lines (a header, then a line per
+            turn).
+        completions
+            Whether to include the (provider-specific) completion object of each
+            turn (see `.to_dict()`).
+
+        Returns
+        -------
+        Path
+            The path to the saved file, which can be restored with `.load()`.
+        """
+        path = Path(path)
+        write_turns(path, self.to_dict(completions=completions))
+        return path
+
+    def load(self, path: str | Path) -> Chat:
+        """
+        Restore the turns (including the system prompt) of a chat from a file
+        created by `.save()`.
+
+        Parameters
+        ----------
+        path
+            The file to load.
+
+        Returns
+        -------
+        Chat
+            The chat itself (with its turns replaced).
+        """
+        return self.from_dict(read_turns(Path(path)))
+
     @staticmethod
     def _html_template(contents: str) -> str:
         version = "1.2.1"
@@ -786,20 +1268,33 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
         echo: Literal["text", "all", "none"],
         stream: bool,
         kwargs: Optional[SubmitInputArgsT] = None,
+        stats: Optional[ResponseStats] = None,
     ) -> Generator[str, None, None]:
         user_turn_result: Turn | None = user_turn
 
-        with self._display_context() as display:
+        with self._display_context(echo) as display:
             while user_turn_result is not None:
+                invoke = self._tool_invoker()
+                started: dict[str, Future[ContentToolResult]] = {}
+
+                def start_tool(x: ContentToolRequest):
+                    started[x.id] = tool_executor().submit(propagate(invoke), x)
+
                 for chunk in self._submit_turns(
                     user_turn_result,
                     echo=echo,
                     display=display,
                     stream=stream,
                     kwargs=kwargs,
+                    on_tool_request=start_tool if self._tool_options["eager"] else None,
+                    stats=stats,
                 ):
                     yield chunk
-                user_turn_result = self._invoke_tools()
+                # (Show the whole response before waiting on its tools)
+                display.flush()
+                user_turn_result = self._invoke_tools(invoke, started)
+
+        self._finish_stats(stats)
 
     async def _chat_impl_async(
         self,
@@ -807,222 +1302,494 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
         echo: Literal["text", "all", "none"],
         stream: bool,
         kwargs: Optional[SubmitInputArgsT] = None,
+        stats: Optional[ResponseStats] = None,
     ) -> AsyncGenerator[str, None]:
         user_turn_result: Turn | None = user_turn
 
-        with self._display_context() as display:
+        with self._display_context(echo) as display:
             while user_turn_result is not None:
+                invoke = self._tool_invoker_async()
+                started: dict[str, asyncio.Future[ContentToolResult]] = {}
+
+                def start_tool(x: ContentToolRequest):
+                    started[x.id] = asyncio.ensure_future(invoke(x))
+
                 async for chunk in self._submit_turns_async(
                     user_turn_result,
                     echo=echo,
                     display=display,
                     stream=stream,
                     kwargs=kwargs,
+                    on_tool_request=start_tool if self._tool_options["eager"] else None,
+                    stats=stats,
                 ):
                     yield chunk
-                user_turn_result = await self._invoke_tools_async()
+                # (Show the whole response before waiting on its tools)
+                display.flush()
+                user_turn_result = await self._invoke_tools_async(invoke, started)
+
+        self._finish_stats(stats)
+
+    def _finish_stats(self, stats: Optional[ResponseStats]) -> None:
+        if stats is None:
+            return
+        stats.finish()
+        if self._stats_callback is not None:
+            self._stats_callback(stats)
 
     def _submit_turns(
         self,
         user_turn: Turn,
         echo: Literal["text", "all", "none"],
-        display: LiveMarkdownDisplay | IPyMarkdownDisplay,
+        display: MarkdownDisplay,
         stream: bool,
         data_model: type[BaseModel] | None = None,
         kwargs: Optional[SubmitInputArgsT] = None,
+        on_tool_request: Optional[Callable[[ContentToolRequest], None]] = None,
+        stats: Optional[ResponseStats] = None,
     ) -> Generator[str, None, None]:
         if any(x._is_async for x in self.tools.values()):
             raise ValueError("Cannot use async tools in a synchronous chat")
 
-        emit = emitter(echo, display)
+        timing = stats.begin_round() if stats is not None else RoundStats.begin()
 
-        if echo == "all":
-            emit_user_contents(user_turn, emit)
+        with open_span("chatlas.submit", provider=self.provider) as submit_span:
+            emit = emitter(echo, display)
 
-        if stream:
-            response = self.provider.chat_perform(
-                stream=True,
-                turns=[*self._turns, user_turn],
-                tools=self.tools,
-                data_model=data_model,
-                kwargs=kwargs,
+            if echo == "all":
+                emit_user_contents(user_turn, emit)
+
+            turns = self._request_turns(user_turn)
+            cache = self._cache
+            key = (
+                None
+                if cache is None
+                else self._cache_key(turns, data_model, kwargs, stream)
+            )
+            cached = cache.get(key) if cache is not None and key else None
+            chunks: list[str] | None = None
+            limiter = rate_limiter(self.provider)
+            estimate = (
+                estimate_tokens(turns, self._tokenizer) if limiter.limits_tokens else 0
             )
 
-            result = None
-            for chunk in response:
-                text = self.provider.stream_text(chunk)
-                if text:
+            if cached is not None:
+                turn = cached.turn
+                timing.cached = True
+                for text in cached.replay(stream):
+                    timing.chunk(text)
                     emit(text)
                     yield text
-                result = self.provider.stream_merge_chunks(result, chunk)
-
-            turn = self.provider.stream_turn(
-                result,
-                has_data_model=data_model is not None,
-                stream=response,
-            )
 
-            if echo == "all":
-                emit_other_contents(turn, emit)
+                if echo == "all":
+                    emit_other_contents(turn, emit)
+
+            elif stream:
+                with child_spans(submit_span):
+                    response = limiter.call(
+                        timing.wrap(
+                            lambda: self.provider.chat_perform(
+                                stream=True,
+                                turns=turns,
+                                tools=self.tools,
+                                data_model=data_model,
+                                kwargs=kwargs,
+                            )
+                        ),
+                        tokens=estimate,
+                    )
 
-        else:
-            response = self.provider.chat_perform(
-                stream=False,
-                turns=[*self._turns, user_turn],
-                tools=self.tools,
-                data_model=data_model,
-                kwargs=kwargs,
-            )
+                with open_span("chatlas.stream", parent=submit_span) as stream_span:
+                    chunks = []
+                    result = None
+                    for chunk in response:
+                        text = self.provider.stream_text(chunk)
+                        timing.chunk(text)
+                        if text:
+                            emit(text)
+                            yield text
+                            chunks.append(text)
+                        result = self.provider.stream_merge_chunks(result, chunk)
+                        if on_tool_request is not None:
+                            # (So that the spans of eager tools are children
+                            # of the stream's)
+                            with child_spans(stream_span):
+                                for x in self.provider.stream_tool_requests(
+                                    result, chunk
+                                ):
+                                    on_tool_request(x)
+
+                    turn = self.provider.stream_turn(
+                        result,
+                        has_data_model=data_model is not None,
+                        stream=response,
+                    )
+                    set_attributes(stream_span, {"chatlas.chunks": timing.chunks})
 
-            turn = self.provider.value_turn(
-                response, has_data_model=data_model is not None
-            )
-            if turn.text:
-                emit(turn.text)
-                yield turn.text
+                if echo == "all":
+                    emit_other_contents(turn, emit)
 
-            if echo == "all":
-                emit_other_contents(turn, emit)
+            else:
+                with child_spans(submit_span):
+                    response = limiter.call(
+                        timing.wrap(
+                            lambda: self.provider.chat_perform(
+                                stream=False,
+                                turns=turns,
+                                tools=self.tools,
+                                data_model=data_model,
+                                kwargs=kwargs,
+                            )
+                        ),
+                        tokens=estimate,
+                    )
 
-        self._turns.extend([user_turn, turn])
+                turn = self.provider.value_turn(
+                    response, has_data_model=data_model is not None
+                )
+                timing.chunk(turn.text)
+                if turn.text:
+                    emit(turn.text)
+                    yield turn.text
+
+                if echo == "all":
+                    emit_other_contents(turn, emit)
+
+            timing.finish(turn.tokens)
+            set_attributes(submit_span, usage_attributes(turn.tokens, timing.cached))
+            if cached is None:
+                limiter.record_usage(estimate, turn.tokens)
+                record_usage(self.provider, turn.tokens, timing.latency, self._usage)
+                if cache is not None and key:
+                    cache.set(key, CachedResponse(turn, chunks))
+
+            self._turns.extend([user_turn, turn])
+            if self._compactor is not None:
+                self._compactor.update(self._turns, self._tokenizer)
 
     async def _submit_turns_async(
         self,
         user_turn: Turn,
         echo: Literal["text", "all", "none"],
-        display: LiveMarkdownDisplay | IPyMarkdownDisplay,
+        display: MarkdownDisplay,
         stream: bool,
         data_model: type[BaseModel] | None = None,
         kwargs: Optional[SubmitInputArgsT] = None,
+        on_tool_request: Optional[Callable[[ContentToolRequest], None]] = None,
+        stats: Optional[ResponseStats] = None,
     ) -> AsyncGenerator[str, None]:
-        emit = emitter(echo, display)
-
-        if echo == "all":
-            emit_user_contents(user_turn, emit)
+        timing = stats.begin_round() if stats is not None else RoundStats.begin()
+        with open_span("chatlas.submit", provider=self.provider) as submit_span:
+            emit = emitter(echo, display)
 
-        if stream:
-            response = await self.provider.chat_perform_async(
-                stream=True,
-                turns=[*self._turns, user_turn],
-                tools=self.tools,
-                data_model=data_model,
-                kwargs=kwargs,
+            if echo == "all":
+                emit_user_contents(user_turn, emit)
+
+            turns = self._request_turns(user_turn)
+            cache = self._cache
+            key = (
+                None
+                if cache is None
+                else self._cache_key(turns, data_model, kwargs, stream)
+            )
+            cached = cache.get(key) if cache is not None and key else None
+            chunks: list[str] | None = None
+            limiter = rate_limiter(self.provider)
+            estimate = (
+                estimate_tokens(turns, self._tokenizer) if limiter.limits_tokens else 0
             )
 
-            result = None
-            async for chunk in response:
-                text = self.provider.stream_text(chunk)
-                if text:
+            if cached is not None:
+                turn = cached.turn
+                timing.cached = True
+                for text in cached.replay(stream):
+                    timing.chunk(text)
                     emit(text)
                     yield text
-                result = self.provider.stream_merge_chunks(result, chunk)
 
-            turn = await self.provider.stream_turn_async(
-                result,
-                has_data_model=data_model is not None,
-                stream=response,
-            )
-
-            if echo == "all":
-                emit_other_contents(turn, emit)
+                if echo == "all":
+                    emit_other_contents(turn, emit)
+
+            elif stream:
+                with child_spans(submit_span):
+                    response = await limiter.call_async(
+                        timing.wrap_async(
+                            lambda: self.provider.chat_perform_async(
+                                stream=True,
+                                turns=turns,
+                                tools=self.tools,
+                                data_model=data_model,
+                                kwargs=kwargs,
+                            )
+                        ),
+                        tokens=estimate,
+                    )
 
-        else:
-            response = await self.provider.chat_perform_async(
-                stream=False,
-                turns=[*self._turns, user_turn],
-                tools=self.tools,
-                data_model=data_model,
-                kwargs=kwargs,
-            )
+                with open_span("chatlas.stream", parent=submit_span) as stream_span:
+                    chunks = []
+                    result = None
+                    async for chunk in response:
+                        text = self.provider.stream_text(chunk)
+                        timing.chunk(text)
+                        if text:
+                            emit(text)
+                            yield text
+                            chunks.append(text)
+                        result = self.provider.stream_merge_chunks(result, chunk)
+                        if on_tool_request is not None:
+                            # (So that the spans of eager tools are children
+                            # of the stream's)
+                            with child_spans(stream_span):
+                                for x in self.provider.stream_tool_requests(
+                                    result, chunk
+                                ):
+                                    on_tool_request(x)
+
+                    turn = await self.provider.stream_turn_async(
+                        result,
+                        has_data_model=data_model is not None,
+                        stream=response,
+                    )
+                    set_attributes(stream_span, {"chatlas.chunks": timing.chunks})
 
-            turn = self.provider.value_turn(
-                response, has_data_model=data_model is not None
-            )
-            if turn.text:
-                emit(turn.text)
-                yield turn.text
+                if echo == "all":
+                    emit_other_contents(turn, emit)
 
-            if echo == "all":
-                emit_other_contents(turn, emit)
+            else:
+                with child_spans(submit_span):
+                    response = await limiter.call_async(
+                        timing.wrap_async(
+                            lambda: self.provider.chat_perform_async(
+                                stream=False,
+                                turns=turns,
+                                tools=self.tools,
+                                data_model=data_model,
+                                kwargs=kwargs,
+                            )
+                        ),
+                        tokens=estimate,
+                    )
 
-        self._turns.extend([user_turn, turn])
+                turn = self.provider.value_turn(
+                    response, has_data_model=data_model is not None
+                )
+                timing.chunk(turn.text)
+                if turn.text:
+                    emit(turn.text)
+                    yield turn.text
+
+                if echo == "all":
+                    emit_other_contents(turn, emit)
+
+            timing.finish(turn.tokens)
+            set_attributes(submit_span, usage_attributes(turn.tokens, timing.cached))
+            if cached is None:
+                limiter.record_usage(estimate, turn.tokens)
+                record_usage(self.provider, turn.tokens, timing.latency, self._usage)
+                if cache is not None and key:
+                    cache.set(key, CachedResponse(turn, chunks))
+
+            self._turns.extend([user_turn, turn])
+            if self._compactor is not None:
+                await self._compactor.update_async(self._turns, self._tokenizer)
+
+    def _request_turns(self, user_turn: Optional[Turn] = None) -> list[Turn]:
+        """
+        The turns to send with a request (i.e., compacted, and trimmed to the
+        token limits).
+        """
+        turns = [*self._turns, user_turn] if user_turn else list(self._turns)
+        if self._compactor is not None:
+            turns = self._compactor.compact(turns)
+        if self._trimmer is None:
+            return turns
+        return self._trimmer.trim(turns, self._tokenizer)
+
+    def _cache_key(
+        self,
+        turns: list[Turn],
+        data_model: type[BaseModel] | None,
+        kwargs: Optional[SubmitInputArgsT],
+        stream: bool,
+    ) -> str | None:
+        return self.provider.cache_key(
+            turns=turns,
+            tools=self.tools,
+            data_model=data_model,
+            kwargs=kwargs,
+            stream=stream,
+        )
 
-    def _invoke_tools(self) -> Turn | None:
+    def _invoke_tools(
+        self,
+        invoke: Optional[Callable[[ContentToolRequest], ContentToolResult]] = None,
+        started: Optional[dict[str, Future[ContentToolResult]]] = None,
+    ) -> Turn | None:
         turn = self.last_turn()
         if turn is None:
             return None
 
-        results: list[ContentToolResult] = []
-        for x in turn.contents:
-            if isinstance(x, ContentToolRequest):
-                tool_def = self.tools.get(x.name, None)
-                func = tool_def.func if tool_def is not None else None
-                results.append(self._invoke_tool(func, x.arguments, x.id))
-
-        if not results:
+        requests = [x for x in turn.contents if isinstance(x, ContentToolRequest)]
+        if not requests:
             return None
 
-        return Turn("user", results)
+        invoke = invoke or self._tool_invoker()
+        started = started or {}
+
+        if not started and not self._tool_options["use_threads"]:
+            return Turn("user", [invoke(x) for x in requests])
 
-    async def _invoke_tools_async(self) -> Turn | None:
+        # Dispatch the tool calls that haven't already been started (while the
+        # response was streaming) to the shared thread pool
+        executor = tool_executor()
+        futures = [
+            started[x.id] if x.id in started else executor.submit(propagate(invoke), x)
+            for x in requests
+        ]
+        return Turn("user", [f.result() for f in futures])
+
+    async def _invoke_tools_async(
+        self,
+        invoke: Optional[
+            Callable[[ContentToolRequest], Awaitable[ContentToolResult]]
+        ] = None,
+        started: Optional[dict[str, asyncio.Future[ContentToolResult]]] = None,
+    ) -> Turn | None:
         turn = self.last_turn()
         if turn is None:
             return None
 
-        results: list[ContentToolResult] = []
-        for x in turn.contents:
-            if isinstance(x, ContentToolRequest):
-                tool_def = self.tools.get(x.name, None)
-                func = tool_def.func if tool_def is not None else None
-                results.append(await self._invoke_tool_async(func, x.arguments, x.id))
-
-        if not results:
+        requests = [x for x in turn.contents if isinstance(x, ContentToolRequest)]
+        if not requests:
             return None
 
+        invoke = invoke or self._tool_invoker_async()
+        started = started or {}
+
+        # Run all the requested tool calls concurrently (except for those that
+        # were already started while the response was streaming). Note that
+        # gather() returns results in the same order as the requests
+        results = await asyncio.gather(
+            *[started[x.id] if x.id in started else invoke(x) for x in requests]
+        )
+
         return Turn("user", results)
 
+    def _tool_invoker(self) -> Callable[[ContentToolRequest], ContentToolResult]:
+        """
+        Create a function for invoking the tool requests of one round of the
+        tool loop, which respects the chat-level and tool-level concurrency
+        limits (when called from multiple threads).
+        """
+        chat_limit = thread_limiter(self._tool_options["max_concurrency"])
+        tool_limits = {
+            name: thread_limiter(tool.max_concurrency)
+            for name, tool in self.tools.items()
+        }
+
+        def invoke(x: ContentToolRequest) -> ContentToolResult:
+            with chat_limit, tool_limits.get(x.name, nullcontext()):
+                return self._invoke_tool(
+                    self._tool_func(x), x.arguments, x.id, name=x.name
+                )
+
+        return invoke
+
+    def _tool_invoker_async(
+        self,
+    ) -> Callable[[ContentToolRequest], Awaitable[ContentToolResult]]:
+        """
+        Create a function for invoking the tool requests of one round of the
+        (async) tool loop, which respects the chat-level and tool-level
+        concurrency limits.
+        """
+        chat_limit = task_limiter(self._tool_options["max_concurrency"])
+        tool_limits = {
+            name: task_limiter(tool.max_concurrency)
+            for name, tool in self.tools.items()
+        }
+
+        async def invoke(x: ContentToolRequest) -> ContentToolResult:
+            func = self._tool_func_async(x)
+            async with chat_limit, tool_limits.get(x.name, NoLimit()):
+                return await self._invoke_tool_async(
+                    func, x.arguments, x.id, name=x.name
+                )
+
+        return invoke
+
+    def _tool_func(self, request: ContentToolRequest) -> Callable[..., Any] | None:
+        tool_def = self.tools.get(request.name, None)
+        return tool_def.func if tool_def is not None else None
+
+    def _tool_func_async(
+        self, request: ContentToolRequest
+    ) -> Callable[..., Awaitable[Any]] | None:
+        tool_def = self.tools.get(request.name, None)
+        if tool_def is None:
+            return None
+        if tool_def._is_async or not self._tool_options["use_threads"]:
+            return wrap_async(tool_def.func)
+        return wrap_threaded(tool_def.func)
+
     @staticmethod
     def _invoke_tool(
         func: Callable[..., Any] | None,
         arguments: object,
         id_: str,
+        name: Optional[str] = None,
     ) -> ContentToolResult:
-        if func is None:
-            return ContentToolResult(id_, None, "Unknown tool")
-
-        try:
-            if isinstance(arguments, dict):
-                result = func(**arguments)
-            else:
-                result = func(arguments)
+        attributes = {"gen_ai.tool.name": name, "gen_ai.tool.call.id": id_}
+        with span("chatlas.tool", attributes) as tool_span:
+            if func is None:
+                set_attributes(tool_span, {"error.type": "UnknownTool"})
+                return ContentToolResult(id_, None, "Unknown tool")
+
+            try:
+                if isinstance(arguments, dict):
+                    result = func(**arguments)
+                else:
+                    result = func(arguments)
 
-            return ContentToolResult(id_, result, None)
-        except Exception as e:
-            return ContentToolResult(id_, None, str(e))
+                return ContentToolResult(id_, result, None)
+            except Exception as e:
+                set_attributes(tool_span, {"error.type": type(e).__qualname__})
+                return ContentToolResult(id_, None, str(e))
 
     @staticmethod
     async def _invoke_tool_async(
         func: Callable[..., Awaitable[Any]] | None,
         arguments: object,
         id_: str,
+        name: Optional[str] = None,
     ) -> ContentToolResult:
-        if func is None:
-            return ContentToolResult(id_, None, "Unknown tool")
-
-        try:
-            if isinstance(arguments, dict):
-                result = await func(**arguments)
-            else:
-                result = await func(arguments)
+        attributes = {"gen_ai.tool.name": name, "gen_ai.tool.call.id": id_}
+        with span("chatlas.tool", attributes) as tool_span:
+            if func is None:
+                set_attributes(tool_span, {"error.type": "UnknownTool"})
+                return ContentToolResult(id_, None, "Unknown tool")
+
+            try:
+                if isinstance(arguments, dict):
+                    result = await func(**arguments)
+                else:
+                    result = await func(arguments)
 
-            return ContentToolResult(id_, result, None)
-        except Exception as e:
-            return ContentToolResult(id_, None, str(e))
+                return ContentToolResult(id_, result, None)
+            except Exception as e:
+                set_attributes(tool_span, {"error.type": type(e).__qualname__})
+                return ContentToolResult(id_, None, str(e))
 
     @contextmanager
     def _display_context(
         self,
-    ) -> Generator[LiveMarkdownDisplay | IPyMarkdownDisplay, None, None]:
+        echo: Literal["text", "all", "none"],
+    ) -> Generator[MarkdownDisplay, None, None]:
+        # Nothing gets displayed, so don't bother with a console (or notebook)
+        if echo == "none":
+            yield NullDisplay()
+            return
+
         opts = self._echo_options
         display = LiveMarkdownDisplay(opts)
 
@@ -1047,6 +1814,7 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
         rich_markdown: Optional[dict[str, Any]] = None,
         rich_console: Optional[dict[str, Any]] = None,
         css_styles: Optional[dict[str, str]] = None,
+        refresh_interval: float = 0.1,
     ):
         """
         Set echo styling options for the chat.
@@ -1062,13 +1830,325 @@ class Chat(Generic[SubmitInputArgsT, CompletionT]):
         css_styles
             A dictionary of CSS styles to apply to `IPython.display.Markdown()`.
             This is only relevant when outputing to the browser.
+        refresh_interval
+            The minimum number of seconds between updates of the (streaming)
+            display. Content that arrives in between is coalesced into the next
+            update, and the display is always brought up to date once the
+            response is complete. Use `0` to update the display on every chunk.
         """
+        if refresh_interval < 0:
+            raise ValueError("`refresh_interval` must be non-negative.")
+
         self._echo_options: EchoOptions = {
             "rich_markdown": rich_markdown or {},
             "rich_console": rich_console or {},
             "css_styles": css_styles or {},
+            "refresh_interval": refresh_interval,
         }
 
+    def set_tool_options(
+        self,
+        *,
+        max_concurrency: Optional[int] | MISSING_TYPE = MISSING,
+        use_threads: bool | MISSING_TYPE = MISSING,
+        eager: bool | MISSING_TYPE = MISSING,
+    ):
+        """
+        Set options for how tools (functions) get invoked.
+
+        Options that aren't given keep their current values (which, by
+        default, are `max_concurrency=None`, `use_threads=False`, and
+        `eager=False`).
+
+        Parameters
+        ----------
+        max_concurrency
+            The maximum number of tool calls that may run at the same time when
+            the model requests several tool calls in one turn. This applies to
+            `.chat_async()` and friends, and to `.chat()` and friends when tools
+            run in threads (see `use_threads` and `eager`). If `None`, all the
+            requested tool calls run concurrently. Use `1` to run them one at a
+            time. Note that tool-specific limits (i.e., `max_concurrency` in
+            `.register_tool()`) are also respected.
+        use_threads
+            Whether to run synchronous tools in a (process-wide) thread pool.
+            This allows the tool calls requested in one turn to run in
+            parallel in `.chat()` and friends (and prevents them from blocking
+            the event loop in `.chat_async()` and friends), which is useful for
+            tools that spend most of their time waiting on I/O. Results are
+            always returned in the order they were requested.
+        eager
+            Whether to start invoking each tool as soon as its request has
+            finished streaming, rather than waiting for the whole response to
+            arrive. This only has an effect when streaming, and with providers
+            that report tool requests as they complete (currently, Anthropic).
+            In `.chat()` and friends, tools started this way run in the shared
+            thread pool.
+        """
+        options = self._tool_options.copy()
+        if not isinstance(max_concurrency, MISSING_TYPE):
+            if max_concurrency is not None and max_concurrency < 1:
+                raise ValueError(
+                    "`max_concurrency` must be a positive integer or None."
+                )
+            options["max_concurrency"] = max_concurrency
+        if not isinstance(use_threads, MISSING_TYPE):
+            options["use_threads"] = use_threads
+        if not isinstance(eager, MISSING_TYPE):
+            options["eager"] = eager
+        self._tool_options = options
+
+    def set_cache(self, cache: Optional[ResponseCache]):
+        """
+        Set a cache for the responses of the chat.
+
+        When a cache is set, a request that's identical to a previous one
+        (i.e., same provider, model, conversation, tools, data model, and
+        submit arguments) is answered from the cache instead of the provider.
+        Cached responses that were streamed are replayed as streams.
+
+        Parameters
+        ----------
+        cache
+            A [](`~chatlas.ResponseCache`) (e.g., [](`~chatlas.LRUCache`) or
+            [](`~chatlas.SQLiteCache`)), which may be shared between chats, or
+            `None` to stop caching responses.
+
+        Examples
+        --------
+        ```python
+        from chatlas import ChatOpenAI, SQLiteCache
+
+        chat = ChatOpenAI()
+        chat.set_cache(SQLiteCache("responses.db", ttl=24 * 60 * 60))
+        ```
+        """
+        self._cache = cache
+
+    def set_rate_limits(
+        self,
+        *,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        """
+        Set rate limits (and retry behavior) for requests to the provider.
+
+        Rate limits are shared by every chat that uses the same provider with
+        the same credentials (e.g., API key), so setting them on one such chat
+        applies them to all of them (including chats created by
+        `.chat_batch()`).
+
+        Parameters
+        ----------
+        requests_per_minute
+            The maximum number of requests per minute. If `None` (the default),
+            requests aren't limited.
+        tokens_per_minute
+            The maximum number of (input and output) tokens per minute. Before
+            a request is made, its input tokens are (roughly) estimated, and
+            the estimate is corrected once the actual usage is known. If `None`
+            (the default), tokens aren't limited.
+        max_retries
+            The maximum number of times a request is retried when it fails with
+            a rate limit (429), overload, or server error. When the provider
+            says how long to wait (via `retry-after` or rate limit reset
+            headers), all the chats that share the rate limits wait that long;
+            otherwise, retries are delayed with jittered exponential backoff.
+            Defaults to 0, since the provider's SDK (if any) already retries
+            such requests (e.g., the OpenAI and Anthropic SDKs retry twice), and
+            retries here are in addition to those. To retry here instead, pass
+            `max_retries=0` to the chat's SDK client (e.g.,
+            `ChatOpenAI(kwargs={"max_retries": 0})`).
+        backoff_base
+            The (maximum) delay, in seconds, before the first retry. The delay
+            doubles with each subsequent retry.
+        backoff_max
+            The maximum delay, in seconds, between retries.
+        """
+        rate_limiter(self.provider).configure(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=max_retries,
+            backoff_base=backoff_base,
+            backoff_max=backoff_max,
+        )
+
+    def set_token_limits(self, total: Optional[int], reserve: int = 0):
+        """
+        Limit the number of (input) tokens sent with each request.
+
+        When the conversation outgrows the budget (`total - reserve` tokens),
+        the oldest turns are left out of requests (they remain in the chat's
+        `.turns()`, though). The system prompt is always sent, and tool
+        requests are never sent without their results (or vice versa).
+
+        Parameters
+        ----------
+        total
+            The maximum number of tokens for the request and its response
+            (e.g., the model's context window). If `None`, requests aren't
+            trimmed.
+        reserve
+            The number of tokens to reserve for the response.
+
+        Note
+        ----
+        The number of tokens in a turn is counted locally (see
+        `.set_tokenizer()`), unless it's an assistant turn whose number of
+        output tokens was reported by the provider. Local counts are estimates
+        (e.g., of the tokens used by images), so leave some headroom in the
+        limits.
+        """
+        if total is None:
+            self._trimmer = None
+        else:
+            self._trimmer = ContextTrimmer(total, reserve)
+
+    def set_compaction(
+        self,
+        threshold: Optional[int],
+        *,
+        keep: Optional[int] = None,
+        summarizer: Optional[Chat] = None,
+        prompt: str = SUMMARY_PROMPT,
+        background: bool = True,
+    ):
+        """
+        Compact long conversations by summarizing their oldest turns.
+
+        When the conversation (as it's sent) outgrows `threshold` tokens, its
+        oldest turns are summarized, and requests send the summary in their
+        place. The chat's `.turns()` (and `.export()`) still have all of the
+        original turns, though. As the conversation keeps growing, the summary
+        is updated (i.e., it summarizes the previous summary along with the
+        turns that follow it).
+
+        Parameters
+        ----------
+        threshold
+            The number of tokens that the conversation can grow to before it's
+            compacted. If `None`, the conversation isn't compacted.
+        keep
+            The (approximate) number of tokens of the latest turns to keep as
+            they are. Defaults to half of the `threshold`. The latest user input
+            (and its response) is always kept.
+        summarizer
+            The chat that generates the summaries (e.g., one with a cheaper or
+            faster model). Its own turns are left alone. Defaults to a chat
+            with this chat's provider.
+        prompt
+            The instructions for generating a summary.
+        background
+            Whether to generate summaries in a background thread, after a
+            response. If `True`, requests don't wait for the summary (they're
+            sent without it until it's ready). If `False`, the summary is
+            generated before the response is returned.
+
+        Examples
+        --------
+        ```python
+        from chatlas import ChatAnthropic, ChatOpenAI
+
+        chat = ChatAnthropic()
+        chat.set_compaction(50_000, summarizer=ChatOpenAI(model="gpt-4o-mini"))
+        ```
+
+        Note
+        ----
+        Tokens are counted locally (see `.set_tokenizer()`). Tool requests are
+        never summarized without their results (or vice versa). If token limits
+        are also set (see `.set_token_limits()`), requests are trimmed after
+        they're compacted.
+        """
+        if threshold is None:
+            self._compactor = None
+            return
+        self._compactor = Compactor(
+            summarizer or Chat(self.provider),
+            threshold=threshold,
+            keep=threshold // 2 if keep is None else keep,
+            prompt=prompt,
+            background=background,
+        )
+
+    def set_stats_callback(self, callback: Optional[Callable[[ResponseStats], None]]):
+        """
+        Set a function to call with the timings of each response.
+
+        Parameters
+        ----------
+        callback
+            A function that's called with the [](`~chatlas.types.ResponseStats`)
+            of each response (from `.chat()`, `.stream()`, `.extract_data()`,
+            etc.) once it's complete, e.g., to export time-to-first-token to a
+            metrics system. If `None`, no function is called.
+
+        Note
+        ----
+        The stats of a response are also available as its `.stats` (e.g.,
+        `chat.chat("Hello").stats`).
+        """
+        self._stats_callback = callback
+
+    def set_tokenizer(self, tokenizer: Optional[TokenEncoding]):
+        """
+        Set the tokenizer used to count tokens locally.
+
+        Tokens are counted (before a request is sent) by `.count_tokens()`,
+        `.set_token_limits()`, and `.set_rate_limits(tokens_per_minute=...)`.
+        Since the model's own tokenizer usually isn't available, these counts
+        are estimates.
+
+        Parameters
+        ----------
+        tokenizer
+            The name of a tiktoken encoding (e.g., `"o200k_base"`), a
+            `tiktoken.Encoding` (e.g., `tiktoken.encoding_for_model("gpt-4o")`),
+            a `tokenizers.Tokenizer`, or a function that returns the number of
+            tokens in a string. If `None` (the default), tokens are estimated
+            at roughly 4 characters per token.
+
+        Note
+        ----
+        Loading a tiktoken encoding requires the `tiktoken` package, and the
+        first time, downloads the encoding's vocabulary (unless it's cached,
+        e.g., in the `TIKTOKEN_CACHE_DIR` directory). So that this never
+        happens in the middle of a request, an encoding given by name is
+        loaded right away (which raises an error if it can't be).
+        """
+        self._tokenizer = None if tokenizer is None else Tokenizer(tokenizer)
+
+    def count_tokens(self, *args: Content | str) -> int:
+        """
+        Estimate the number of input tokens of a request.
+
+        Parameters
+        ----------
+        args
+            The user input(s) of the request. If none are given, count the
+            tokens of the chat's turns (including the system prompt).
+
+        Returns
+        -------
+        int
+            The (estimated) number of input tokens, including those of the
+            registered tools' definitions. If the conversation is compacted, or
+            token limits are set, this counts only the turns that would be sent.
+        """
+        tokenizer = self._tokenizer or default_tokenizer()
+        turns = self._request_turns(user_turn(*args) if args else None)
+        n_tools = sum(
+            tokenizer.count(
+                cached_schema(tool, "json", lambda: json.dumps(tool.schema))
+            )
+            for tool in self.tools.values()
+        )
+        return estimate_tokens(turns, tokenizer) + n_tools
+
     def __str__(self):
         turns = self.turns(include_system_prompt=False)
         res = ""
@@ -1101,6 +2181,9 @@ class ChatResponse:
     ----------
     content
         The content of the chat response.
+    stats
+        The timings (e.g., time to first token) and sizes of the response
+        (filled in as it's consumed).
 
     Properties
     ----------
@@ -1110,9 +2193,14 @@ class ChatResponse:
         still be retrieved (via the `content` attribute).
     """
 
-    def __init__(self, generator: Generator[str, None]):
+    def __init__(
+        self,
+        generator: Generator[str, None],
+        stats: Optional[ResponseStats] = None,
+    ):
         self._generator = generator
         self.content: str = ""
+        self.stats: ResponseStats = stats or ResponseStats()
 
     def __iter__(self) -> Iterator[str]:
         return self
@@ -1153,6 +2241,9 @@ class ChatResponseAsync:
     ----------
     content
         The content of the chat response.
+    stats
+        The timings (e.g., time to first token) and sizes of the response
+        (filled in as it's consumed).
 
     Properties
     ----------
@@ -1162,9 +2253,14 @@ class ChatResponseAsync:
         still be retrieved (via the `content` attribute).
     """
 
-    def __init__(self, generator: AsyncGenerator[str, None]):
+    def __init__(
+        self,
+        generator: AsyncGenerator[str, None],
+        stats: Optional[ResponseStats] = None,
+    ):
         self._generator = generator
         self.content: str = ""
+        self.stats: ResponseStats = stats or ResponseStats()
 
     def __aiter__(self) -> AsyncIterator[str]:
         return self
@@ -1185,6 +2281,62 @@ class ChatResponseAsync:
         return self._generator.ag_frame is None
 
 
+# ----------------------------------------------------------------------------
+# Helpers for invoking tools
+# ----------------------------------------------------------------------------
+
+_tool_executor: ThreadPoolExecutor | None = None
+_tool_executor_lock = threading.Lock()
+
+
+def tool_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool shared by every chat for running (sync) tools.
+    """
+    global _tool_executor  # noqa: PLW0603
+    with _tool_executor_lock:
+        if _tool_executor is None:
+            _tool_executor = ThreadPoolExecutor(thread_name_prefix="chatlas-tool")
+        return _tool_executor
+
+
+def thread_limiter(n: Optional[int]) -> threading.Semaphore | nullcontext:
+    return threading.Semaphore(n) if n is not None else nullcontext()
+
+
+def task_limiter(n: Optional[int]) -> asyncio.Semaphore | NoLimit:
+    return asyncio.Semaphore(n) if n is not None else NoLimit()
+
+
+class NoLimit:
+    """
+    An async context manager that does nothing (`contextlib.nullcontext()`
+    only supports `async with` as of Python 3.10).
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return None
+
+
+def wrap_threaded(fn: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    """
+    Wrap a synchronous function into an async function that runs it in the
+    shared tool thread pool.
+    """
+
+    @functools.wraps(fn)
+    async def fn_async(*args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            tool_executor(), propagate(functools.partial(fn, *args, **kwargs))
+        )
+
+    return fn_async
+
+
 # ----------------------------------------------------------------------------
 # Helpers for emitting content
 # ----------------------------------------------------------------------------
@@ -1192,7 +2344,7 @@ class ChatResponseAsync:
 
 def emitter(
     echo: Literal["text", "all", "none"],
-    display: LiveMarkdownDisplay | IPyMarkdownDisplay,
+    display: MarkdownDisplay,
 ) -> Callable[[Content | str], None]:
     if echo == "none":
         return lambda _: None
@@ -1242,53 +2394,170 @@ def emit_other_contents(
 
 
 class LiveMarkdownDisplay:
+    """
+    Display (streaming) markdown in the console.
+
+    To keep the cost of each update from growing with the length of the
+    response, markdown blocks are committed to the console's scrollback as soon
+    as they're finished (i.e., once the next top-level block has started), so
+    that only the trailing (unfinished) block is re-parsed and
+    re-rendered. Also, rather than re-rendering on every update, the display is
+    refreshed (at most) once every `refresh_interval` seconds, and fully
+    rendered one last time on exit.
+    """
+
     def __init__(self, echo_options: EchoOptions):
         from rich.console import Console
+        from rich.live import Live
+
+        # The (trailing) content that hasn't been committed to the scrollback
+        self._pending: str = ""
+        # The last rendering of the pending content (and the content it's for)
+        self._rendered: SegmentLines | None = None
+        self._rendered_content: str = ""
+        # Whether any block has been committed to the scrollback yet
+        self._committed: bool = False
+        self._markdown_options = echo_options["rich_markdown"]
+
+        self._console = Console(**echo_options["rich_console"])
+
+        # With no interval, refresh on every update (rather than on a timer)
+        interval = echo_options["refresh_interval"]
+        self._auto_refresh = interval > 0
 
-        self.content: str = ""
         self.live = Live(
-            auto_refresh=False,
+            auto_refresh=self._auto_refresh,
+            refresh_per_second=1 / interval if self._auto_refresh else 4,
             vertical_overflow="visible",
-            console=Console(
-                **echo_options["rich_console"],
-            ),
+            console=self._console,
+            get_renderable=self._render,
         )
-        self._markdown_options = echo_options["rich_markdown"]
 
     def update(self, content: str):
+        pending = self._pending + content
+
+        # Only a new line can complete a block
+        end = markdown_blocks_end(pending) if "\n" in content else 0
+        self._pending = pending[end:]
+        finished = pending[:end]
+        if finished.strip():
+            self._console.print(self._render_lines(finished))
+            self._committed = True
+
+        if not self._auto_refresh:
+            self.live.refresh()
+
+    def flush(self):
+        self.live.refresh()
+
+    def _render(self) -> RenderableType:
+        pending = self._pending
+        if self._rendered is None or pending != self._rendered_content:
+            self._rendered = self._render_lines(pending)
+            self._rendered_content = pending
+        return self._rendered
+
+    def _render_lines(self, content: str) -> SegmentLines:
         from rich.markdown import Markdown
+        from rich.segment import SegmentLines
 
-        self.content += content
-        self.live.update(
-            Markdown(
-                self.content,
-                **self._markdown_options,
-            ),
-            refresh=True,
-        )
+        markdown = Markdown(content, **self._markdown_options)
+        lines = self._console.render_lines(markdown, pad=False)
+        # Separate blocks by a blank line, as a full render would (unless the
+        # block, e.g. a list, already starts with an empty line)
+        if self._committed and lines and "".join(s.text for s in lines[0]):
+            lines.insert(0, [])
+        return SegmentLines(lines, new_lines=True)
 
     def __enter__(self):
         self.live.__enter__()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.content = ""
-        return self.live.__exit__(exc_type, exc_value, traceback)
+        # Exiting the live context does one final render of what's pending
+        res = self.live.__exit__(exc_type, exc_value, traceback)
+        self._pending = ""
+        self._rendered = None
+        self._rendered_content = ""
+        self._committed = False
+        return res
+
+
+def markdown_blocks_end(content: str) -> int:
+    """
+    Find the position right before the last top-level markdown block of the
+    content. Everything before this position is a sequence of finished blocks,
+    since a top-level block is only finished once the next one has started
+    (e.g., a blank line doesn't finish a list, whose next item may follow, or
+    an indented code block). Returns 0 if there is no such position.
+    """
+    tokens = markdown_parser().parse(content)
+    # (The top-level blocks are the tokens of level 0 that open a block, or
+    # are one, like a fence; their map is the range of lines they span)
+    starts = [x.map[0] for x in tokens if x.level == 0 and x.nesting >= 0 and x.map]
+    if len(starts) < 2:
+        return 0
+    # The position of the start of that line. (Lines are broken like markdown-it
+    # does, i.e., by "\r\n", "\r", or "\n", but not by other line boundaries,
+    # like U+2028, as str.splitlines() would)
+    breaks = MARKDOWN_LINE_BREAK.finditer(content)
+    return next(itertools.islice(breaks, starts[-1] - 1, None)).end()
+
+
+MARKDOWN_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+
+@functools.lru_cache(maxsize=None)
+def markdown_parser() -> MarkdownIt:
+    from markdown_it import MarkdownIt
+
+    # (The same parser that rich.markdown.Markdown uses)
+    return MarkdownIt().enable("strikethrough").enable("table")
 
 
 class IPyMarkdownDisplay:
+    """
+    Display (streaming) markdown in a notebook.
+
+    Since every update sends the entire markdown content to the frontend,
+    updates are coalesced: the display is updated (at most) once every
+    `refresh_interval` seconds, unless more than `max_pending_chars`
+    characters of new content have arrived since the last update. Whatever is
+    left is flushed before tools are invoked, and on exit.
+    """
+
+    max_pending_chars: int = 16384
+
     def __init__(self, echo_options: EchoOptions):
         self.content: str = ""
         self._css_styles = echo_options["css_styles"]
+        self._refresh_interval = echo_options["refresh_interval"]
+        # The number of characters that have yet to be sent to the frontend
+        self._pending_chars: int = 0
+        self._last_flush: float = 0
 
     def update(self, content: str):
+        self.content += content
+        self._pending_chars += len(content)
+        if (
+            self._pending_chars >= self.max_pending_chars
+            or time.monotonic() - self._last_flush >= self._refresh_interval
+        ):
+            self._flush()
+
+    def flush(self):
+        if self._pending_chars:
+            self._flush()
+
+    def _flush(self):
         from IPython.display import Markdown, update_display
 
-        self.content += content
         update_display(
             Markdown(self.content),
             display_id=self._ipy_display_id,
         )
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
 
     def _init_display(self) -> str:
         try:
@@ -1316,13 +2585,43 @@ class IPyMarkdownDisplay:
 
     def __enter__(self):
         self._ipy_display_id = self._init_display()
+        self._last_flush = time.monotonic()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
         self._ipy_display_id = None
 
 
+class NullDisplay:
+    """
+    A display that displays nothing (used when `echo="none"`).
+    """
+
+    def update(self, content: str):
+        pass
+
+    def flush(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+MarkdownDisplay = Union[LiveMarkdownDisplay, IPyMarkdownDisplay, NullDisplay]
+
+
 class EchoOptions(TypedDict):
     rich_markdown: dict[str, Any]
     rich_console: dict[str, Any]
     css_styles: dict[str, str]
+    refresh_interval: float
+
+
+class ToolOptions(TypedDict):
+    max_concurrency: Optional[int]
+    use_threads: bool
+    eager: bool
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Generic, Mapping, Optional, TypeVar
+
+ClientT = TypeVar("ClientT")
+AsyncClientT = TypeVar("AsyncClientT")
+
+# Keep (at least) this many of the most recently used clients alive, even when
+# no provider refers to them (e.g., between the requests of a server that
+# creates a chat per request)
+RECENT_CLIENTS = 16
+
+
+class ClientRegistry:
+    """
+    The SDK clients shared by providers with the same configuration.
+
+    Creating an SDK client is relatively expensive (e.g., it sets up an HTTP
+    connection pool and SSL context), so a client is shared by every provider
+    with the same configuration. Clients are only referred to weakly (and by
+    the `RECENT_CLIENTS` most recently used), so a client is dropped once the
+    providers that use it are gone, rather than kept for the life of the
+    process.
+    """
+
+    def __init__(self, recent: int = RECENT_CLIENTS):
+        self._clients: weakref.WeakValueDictionary[tuple[type, str], Any] = (
+            weakref.WeakValueDictionary()
+        )
+        self._recent: OrderedDict[tuple[type, str], Any] = OrderedDict()
+        self._max_recent = recent
+
+    def get(
+        self, client_class: type[ClientT], kwargs: Mapping[str, Any], key: str
+    ) -> ClientT:
+        full_key = (client_class, key)
+        with _clients_lock:
+            client = self._clients.get(full_key)
+            if client is None:
+                client = self._clients[full_key] = client_class(**kwargs)
+            self._recent[full_key] = client
+            self._recent.move_to_end(full_key)
+            while len(self._recent) > self._max_recent:
+                self._recent.popitem(last=False)
+        return client
+
+
+_clients = ClientRegistry()
+# Async clients are bound to the event loop that they're used in
+_async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientRegistry] = (
+    weakref.WeakKeyDictionary()
+)
+_async_clients_unbound = ClientRegistry()
+_clients_lock = threading.Lock()
+
+
+def async_registry() -> ClientRegistry:
+    """
+    The registry of async clients for the running event loop (if any).
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _async_clients_unbound
+    with _clients_lock:
+        registry = _async_clients.get(loop)
+        if registry is None:
+            # (A good time to drop the clients of loops that have been closed,
+            # which can't be used anymore, but may still be referred to)
+            for closed in [x for x in _async_clients if x.is_closed()]:
+                del _async_clients[closed]
+            registry = _async_clients[loop] = ClientRegistry()
+    return registry
+
+
+class SharedClients(Generic[ClientT, AsyncClientT]):
+    """
+    The (process-wide shared) sync and async SDK clients for one client
+    configuration.
+
+    The sync client is created (or looked up) right away, so that invalid
+    arguments (e.g., a missing API key) are reported when the provider is
+    created. The async client is created once it's needed, for each event loop
+    that it's used in.
+
+    Parameters
+    ----------
+    client_class
+        The class of the sync client (e.g., `openai.OpenAI`).
+    async_client_class
+        The class of the async client (e.g., `openai.AsyncOpenAI`).
+    kwargs
+        The arguments to create the clients with.
+    """
+
+    def __init__(
+        self,
+        client_class: type[ClientT],
+        async_client_class: type[AsyncClientT],
+        kwargs: Mapping[str, Any],
+    ):
+        self._async_client_class = async_client_class
+        self._kwargs = dict(kwargs)
+        self.key = client_key(self._kwargs)
+        self.client: ClientT = _clients.get(client_class, self._kwargs, self.key)
+        # (The async clients in use, which keeps them alive while they are)
+        self._async_clients: weakref.WeakKeyDictionary[ClientRegistry, AsyncClientT] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._base_url: Optional[str] = None
+
+    @property
+    def async_client(self) -> AsyncClientT:
+        registry = async_registry()
+        client = self._async_clients.get(registry)
+        if client is None:
+            client = registry.get(self._async_client_class, self._kwargs, self.key)
+            self._async_clients[registry] = client
+        return client
+
+    @property
+    def base_url(self) -> str:
+        if self._base_url is None:
+            self._base_url = str(getattr(self.client, "base_url"))
+        return self._base_url
+
+
+def client_key(kwargs: Mapping[str, Any]) -> str:
+    """
+    A key identifying client arguments (e.g., base URL, credentials, options).
+    Objects that can't be represented as JSON (e.g., a custom HTTP client) are
+    identified by identity.
+    """
+
+    def identify(x: Any) -> str:
+        return f"<{type(x).__module__}.{type(x).__qualname__} at {id(x):#x}>"
+
+    dump = json.dumps(kwargs, sort_keys=True, default=identify)
+    return hashlib.sha256(dump.encode("utf-8")).hexdigest()
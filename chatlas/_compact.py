@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import json
+import warnings
+from concurrent.futures import Future
+from dataclasses import dataclass
+from threading import Thread
+from typing import TYPE_CHECKING, Optional
+
+from ._content import (
+    ContentImage,
+    ContentJson,
+    ContentText,
+    ContentToolRequest,
+    ContentToolResult,
+)
+from ._tokens import estimate_tokens, turn_tokens
+from ._turn import Turn
+
+if TYPE_CHECKING:
+    from ._chat import Chat
+    from ._tokens import Tokenizer
+
+SUMMARY_PROMPT = """
+Summarize the conversation below, so that it can be continued without it. Keep
+the facts, decisions, names, numbers, and open questions that later messages
+may rely on, and leave out pleasantries. Reply with the summary only.
+""".strip()
+
+
+@dataclass(frozen=True)
+class Compaction:
+    """
+    The oldest turns of a conversation (after the system prompt), and the turn
+    that replaces them in requests: the summary of the turns, followed by the
+    contents of the last of them (a user turn).
+    """
+
+    turns: tuple[Turn, ...]
+    head: Turn
+
+
+class Compactor:
+    """
+    Compact a conversation by replacing its oldest turns (in requests) with a
+    summary of them, once the conversation outgrows a token threshold.
+
+    The summary is generated by another chat (e.g., with a cheaper model), in
+    a background (daemon) thread, so the next request doesn't wait for it (nor
+    does the interpreter wait for it to exit). Until it's ready, requests are
+    sent as they were. Compaction is incremental: the next summary summarizes
+    the previous one along with the turns that follow it.
+    """
+
+    def __init__(
+        self,
+        summarizer: Chat,
+        threshold: int,
+        keep: int,
+        prompt: str = SUMMARY_PROMPT,
+        background: bool = True,
+    ):
+        if keep >= threshold:
+            raise ValueError(
+                f"Invalid compaction: threshold={threshold}, keep={keep}. "
+                "The threshold must be greater than the number of tokens to keep."
+            )
+        self.summarizer = summarizer
+        self.threshold = threshold
+        self.keep = keep
+        self.prompt = prompt
+        self.background = background
+        self.compaction: Optional[Compaction] = None
+        # Whether to never summarize (only use the current summary)
+        self.frozen = False
+        self._future: Optional[Future[Compaction]] = None
+
+    def copy(self, frozen: bool = False) -> Compactor:
+        """
+        A copy with the same settings and summary (but not its pending one). A
+        `frozen` copy never summarizes, e.g., for a throwaway copy of a chat,
+        whose summaries would be discarded.
+        """
+        res = Compactor(
+            self.summarizer, self.threshold, self.keep, self.prompt, self.background
+        )
+        res.compaction = self.compaction
+        res.frozen = frozen or self.frozen
+        return res
+
+    def compact(self, turns: list[Turn]) -> list[Turn]:
+        """
+        The turns to send, with the summarized turns replaced by their summary
+        (if they're still the start of the conversation).
+        """
+        compaction = self.compaction
+        if compaction is None:
+            return turns
+        n_system = 1 if turns and turns[0].role == "system" else 0
+        end = n_system + len(compaction.turns)
+        if len(turns) < end or any(
+            x is not y for x, y in zip(turns[n_system:end], compaction.turns)
+        ):
+            return turns
+        return [*turns[:n_system], compaction.head, *turns[end:]]
+
+    def update(self, turns: list[Turn], tokenizer: Optional[Tokenizer] = None):
+        """
+        Start summarizing the oldest turns (after a response), if the
+        conversation has outgrown the threshold.
+        """
+        todo = self._todo(turns, tokenizer)
+        if todo is None:
+            return
+        if self.background:
+            self._start(*todo)
+        else:
+            self.compaction = self._summarize(*todo)
+
+    async def update_async(
+        self, turns: list[Turn], tokenizer: Optional[Tokenizer] = None
+    ):
+        """
+        Like `.update()`, but summarizes (when not in the background) without
+        blocking the event loop.
+        """
+        todo = self._todo(turns, tokenizer)
+        if todo is None:
+            return
+        if self.background:
+            self._start(*todo)
+        else:
+            self.compaction = await self._summarize_async(*todo)
+
+    def _todo(
+        self, turns: list[Turn], tokenizer: Optional[Tokenizer]
+    ) -> Optional[tuple[list[Turn], tuple[Turn, ...]]]:
+        # The turns to summarize (and the ones that the summary replaces), if
+        # it's time to summarize
+        if self.frozen:
+            return None
+
+        future = self._future
+        if future is not None:
+            if not future.done():
+                return None
+            self._future = None
+            if future.exception() is not None:
+                warnings.warn(
+                    f"Failed to summarize the conversation: {future.exception()}",
+                    stacklevel=4,
+                )
+
+        compacted = self.compact(turns)
+        if estimate_tokens(compacted, tokenizer) <= self.threshold:
+            return None
+
+        cut = self._cut(compacted, tokenizer)
+        if cut is None:
+            return None
+
+        n_system = 1 if turns and turns[0].role == "system" else 0
+        n_compacted = len(turns) - len(compacted)
+        summarized = tuple(turns[n_system : cut + n_compacted + 1])
+        return compacted[n_system:cut], summarized
+
+    def _start(self, span: list[Turn], summarized: tuple[Turn, ...]) -> None:
+        # (Summaries are rare, so each gets its own daemon thread, rather than
+        # a pool whose threads would be kept around, and waited for on exit)
+        future: Future[Compaction] = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(self._summarize(span, summarized))
+            except BaseException as e:
+                future.set_exception(e)
+
+        future.add_done_callback(self._done)
+        self._future = future
+        Thread(target=run, name="chatlas-compact", daemon=True).start()
+
+    def wait(self) -> None:
+        """
+        Wait for a pending summary (if any).
+        """
+        if self._future is not None:
+            self._future.result()
+
+    def _done(self, future: Future[Compaction]) -> None:
+        if future.exception() is None:
+            self.compaction = future.result()
+
+    def _cut(self, turns: list[Turn], tokenizer: Optional[Tokenizer]) -> int | None:
+        # The first (non-tool result) user turn whose following turns fit in
+        # `keep` tokens, or else the last one (so the latest exchange is kept).
+        # The turns before it (other than the system prompt) get summarized.
+        n_system = 1 if turns and turns[0].role == "system" else 0
+        cut = None
+        n_tokens = 0
+        for i in range(len(turns) - 1, n_system, -1):
+            n_tokens += turn_tokens(turns[i], tokenizer)
+            if not is_user_input(turns[i]):
+                continue
+            if cut is not None and n_tokens > self.keep:
+                break
+            cut = i
+        return cut
+
+    def _summarize(self, span: list[Turn], summarized: tuple[Turn, ...]) -> Compaction:
+        chat = self._summary_chat()
+        response = chat.chat(self._summary_prompt(span), echo="none", stream=False)
+        return self._compaction(response.get_content(), summarized)
+
+    async def _summarize_async(
+        self, span: list[Turn], summarized: tuple[Turn, ...]
+    ) -> Compaction:
+        chat = self._summary_chat()
+        response = await chat.chat_async(
+            self._summary_prompt(span), echo="none", stream=False
+        )
+        return self._compaction(await response.get_content(), summarized)
+
+    def _summary_chat(self) -> Chat:
+        chat = self.summarizer._clone()
+        chat._compactor = None
+        # (Keep the summarizer's system prompt, but not its conversation)
+        chat.set_turns([])
+        chat.system_prompt = self.summarizer.system_prompt
+        return chat
+
+    def _summary_prompt(self, span: list[Turn]) -> str:
+        transcript = "\n\n".join(turn_transcript(x) for x in span)
+        return f"{self.prompt}\n\n<conversation>\n{transcript}\n</conversation>"
+
+    @staticmethod
+    def _compaction(summary: str, summarized: tuple[Turn, ...]) -> Compaction:
+        content = ContentText("Summary of the earlier conversation:\n\n" + summary)
+        head = Turn("user", [content, *summarized[-1].contents])
+        return Compaction(summarized, head)
+
+
+def is_user_input(turn: Turn) -> bool:
+    return turn.role == "user" and not any(
+        isinstance(x, ContentToolResult) for x in turn.contents
+    )
+
+
+def turn_transcript(turn: Turn) -> str:
+    contents = []
+    for x in turn.contents:
+        if isinstance(x, ContentText):
+            contents.append(x.text)
+        elif isinstance(x, ContentImage):
+            contents.append("[image]")
+        elif isinstance(x, ContentToolRequest):
+            arguments = json.dumps(x.arguments, default=str)
+            contents.append(f"[called tool `{x.name}` with {arguments}]")
+        elif isinstance(x, ContentToolResult):
+            contents.append(f"[tool result: {x.get_final_value()}]")
+        elif isinstance(x, ContentJson):
+            contents.append(json.dumps(x.value))
+    return f"{turn.role.capitalize()}: " + "\n".join(contents)
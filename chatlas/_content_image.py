@@ -4,7 +4,8 @@ import base64
 import io
 import os
 import re
-from typing import Literal, Union, cast
+import struct
+from typing import Literal, Optional, Union, cast
 
 from ._content import ContentImageInline, ContentImageRemote, ImageContentTypes
 
@@ -253,3 +254,60 @@ def content_image_plot(
         return ContentImageInline("image/png", base64_data)
     finally:
         fig.set_size_inches(*size)
+
+
+def image_size(data: bytes) -> Optional[tuple[int, int]]:
+    """
+    Get the (width, height) of a PNG, JPEG, GIF, or WebP image from its header
+    (or `None` if it can't be determined).
+    """
+    try:
+        if data[:8] == b"\x89PNG\r\n\x1a\n":
+            return cast(tuple[int, int], struct.unpack(">II", data[16:24]))
+        if data[:6] in (b"GIF87a", b"GIF89a"):
+            return cast(tuple[int, int], struct.unpack("<HH", data[6:10]))
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return _webp_size(data)
+        if data[:2] == b"\xff\xd8":
+            return _jpeg_size(data)
+    except struct.error:
+        pass
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def _jpeg_size(data: bytes) -> Optional[tuple[int, int]]:
+    # Walk the segments until reaching a start of frame (SOFn) marker
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        if 0xD0 <= marker <= 0xD9 or marker == 0x01:
+            # Markers without a length
+            i += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[i + 5 : i + 9])
+            return width, height
+        (length,) = struct.unpack(">H", data[i + 2 : i + 4])
+        i += 2 + length
+    return None
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import json
+import os
 from typing import TYPE_CHECKING, Any, Literal, Optional, overload
 
 from pydantic import BaseModel
 
+from ._cache import keep_request, request_key, reuse_request
 from ._chat import Chat
 from ._content import (
     Content,
@@ -16,8 +18,11 @@ from ._content import (
     ContentToolResult,
 )
 from ._provider import Provider
-from ._tools import Tool, basemodel_to_param_schema
+from ._ratelimit import credential_key
+from ._tools import Tool, basemodel_to_param_schema, cached_schema
+from ._tracing import span
 from ._turn import Turn, normalize_turns
+from ._usage import Tokens
 from ._utils import inform_model_default
 
 if TYPE_CHECKING:
@@ -201,6 +206,9 @@ class GoogleProvider(
         }
 
         self._client = GenerativeModel(**kwargs_full)
+        self._rate_limit_key = credential_key(
+            self, api_key or os.getenv("GOOGLE_API_KEY")
+        )
 
     @overload
     def chat_perform(
@@ -232,8 +240,14 @@ class GoogleProvider(
         data_model: Optional[type[BaseModel]] = None,
         kwargs: Optional["SubmitInputArgs"] = None,
     ):
-        kwargs = self._chat_perform_args(stream, turns, tools, data_model, kwargs)
-        return self._client.generate_content(**kwargs)
+        with span("chatlas.request.build"):
+            kwargs = reuse_request(
+                self,
+                (stream, turns, tools, data_model, kwargs),
+                self._chat_perform_args,
+            )
+        with span("chatlas.request", provider=self):
+            return self._client.generate_content(**kwargs)
 
     @overload
     async def chat_perform_async(
@@ -265,8 +279,14 @@ class GoogleProvider(
         data_model: Optional[type[BaseModel]] = None,
         kwargs: Optional["SubmitInputArgs"] = None,
     ):
-        kwargs = self._chat_perform_args(stream, turns, tools, data_model, kwargs)
-        return await self._client.generate_content_async(**kwargs)
+        with span("chatlas.request.build"):
+            kwargs = reuse_request(
+                self,
+                (stream, turns, tools, data_model, kwargs),
+                self._chat_perform_args,
+            )
+        with span("chatlas.request", provider=self):
+            return await self._client.generate_content_async(**kwargs)
 
     def _chat_perform_args(
         self,
@@ -285,10 +305,9 @@ class GoogleProvider(
 
         if data_model:
             config = kwargs_full.get("generation_config", {})
-            params = basemodel_to_param_schema(data_model)
-
-            if "additionalProperties" in params:
-                del params["additionalProperties"]
+            params = cached_schema(
+                data_model, "google", lambda: self._response_schema(data_model)
+            )
 
             mime_type = "application/json"
             if isinstance(config, dict):
@@ -302,6 +321,28 @@ class GoogleProvider(
 
         return kwargs_full
 
+    def cache_key(self, *, turns, tools, data_model=None, kwargs=None, stream=False):
+        args = (stream, turns, tools, data_model, kwargs)
+        request = self._chat_perform_args(*args)
+        keep_request(self, args, request)
+        # The model, system instructions, etc. are part of the client
+        client = self._client
+        return request_key(
+            self,
+            request,
+            model=client.model_name,
+            system_instruction=client._system_instruction,
+            generation_config=client._generation_config,
+            safety_settings=client._safety_settings,
+            tool_config=client._tool_config,
+        )
+
+    def rate_limit_key(self):
+        return self._rate_limit_key
+
+    def usage_key(self):
+        return "Google", "", self._client.model_name.removeprefix("models/")
+
     def stream_text(self, chunk) -> Optional[str]:
         if chunk.parts:
             return chunk.text
@@ -337,17 +378,24 @@ class GoogleProvider(
         for turn in turns:
             if turn.role == "system":
                 continue  # System messages are handled separately
-            elif turn.role == "user":
-                parts = [self._as_part_type(c) for c in turn.contents]
-                contents.append({"role": turn.role, "parts": parts})
-            elif turn.role == "assistant":
-                parts = [self._as_part_type(c) for c in turn.contents]
-                contents.append({"role": "model", "parts": parts})
-            else:
-                raise ValueError(f"Unknown role {turn.role}")
+            contents.append(
+                turn._cached_params(GoogleProvider, self._turn_as_content_dict)
+            )
         return contents
 
-    def _as_part_type(self, content: Content) -> "PartType":
+    @staticmethod
+    def _turn_as_content_dict(turn: Turn) -> "ContentDict":
+        if turn.role == "user":
+            role = "user"
+        elif turn.role == "assistant":
+            role = "model"
+        else:
+            raise ValueError(f"Unknown role {turn.role}")
+        parts = [GoogleProvider._as_part_type(c) for c in turn.contents]
+        return {"role": role, "parts": parts}
+
+    @staticmethod
+    def _as_part_type(content: Content) -> "PartType":
         from google.generativeai.types.content_types import protos
 
         if isinstance(content, ContentText):
@@ -416,9 +464,10 @@ class GoogleProvider(
                 )
 
         usage = message.usage_metadata
-        tokens = (
+        tokens = Tokens(
             usage.prompt_token_count,
             usage.candidates_token_count,
+            cache_read=usage.cached_content_token_count,
         )
 
         finish = message.candidates[0].finish_reason
@@ -431,26 +480,34 @@ class GoogleProvider(
             completion=message,
         )
 
-    def _gemini_tools(self, tools: list[Tool]) -> list["FunctionDeclaration"]:
-        from google.generativeai.types.content_types import FunctionDeclaration
+    @staticmethod
+    def _response_schema(data_model: type[BaseModel]) -> dict[str, object]:
+        params = basemodel_to_param_schema(data_model)
+        if "additionalProperties" in params:
+            del params["additionalProperties"]
+        return params
 
-        res: list["FunctionDeclaration"] = []
-        for tool in tools:
-            fn = tool.schema["function"]
-            params = None
-            if "parameters" in fn and fn["parameters"]["properties"]:
-                params = {
-                    "type": "object",
-                    "properties": fn["parameters"]["properties"],
-                    "required": fn["parameters"]["required"],
-                }
+    def _gemini_tools(self, tools: list[Tool]) -> list["FunctionDeclaration"]:
+        return [
+            cached_schema(tool, "google", lambda: self._gemini_tool(tool))
+            for tool in tools
+        ]
 
-            res.append(
-                FunctionDeclaration(
-                    name=fn["name"],
-                    description=fn.get("description", ""),
-                    parameters=params,
-                )
-            )
+    @staticmethod
+    def _gemini_tool(tool: Tool) -> "FunctionDeclaration":
+        from google.generativeai.types.content_types import FunctionDeclaration
 
-        return res
+        fn = tool.schema["function"]
+        params = None
+        if "parameters" in fn and fn["parameters"]["properties"]:
+            params = {
+                "type": "object",
+                "properties": fn["parameters"]["properties"],
+                "required": fn["parameters"]["required"],
+            }
+
+        return FunctionDeclaration(
+            name=fn["name"],
+            description=fn.get("description", ""),
+            parameters=params,
+        )
@@ -101,3 +101,27 @@ def merge_lists(
                 else:
                     merged.append(e)
     return merged
+
+
+def merge_value(merged: dict[str, Any], key: str, value: Any) -> None:
+    """Merge a single key/value pair into a dictionary (in place).
+
+    This has the same semantics as `merged = merge_dicts(merged, {key: value})`,
+    but avoids copying `merged`, which makes it suitable for accumulating many
+    (small) updates.
+
+    Args:
+        merged: The dictionary to merge into.
+        key: The key to merge.
+        value: The value to merge.
+    """
+    if value is None:
+        if key not in merged:
+            merged[key] = None
+        return
+
+    left_v = merged.get(key, None)
+    if left_v is None:
+        merged[key] = value
+    elif left_v != value:
+        merged[key] = merge_dicts({key: left_v}, {key: value})[key]
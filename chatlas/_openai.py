@@ -6,7 +6,9 @@ from typing import TYPE_CHECKING, Any, Literal, Optional, cast, overload
 
 from pydantic import BaseModel
 
+from ._cache import keep_request, request_key, reuse_request
 from ._chat import Chat
+from ._clients import SharedClients
 from ._content import (
     Content,
     ContentImageInline,
@@ -16,14 +18,17 @@ from ._content import (
     ContentToolRequest,
     ContentToolResult,
 )
-from ._merge import merge_dicts
+from ._merge import merge_value
 from ._provider import Provider
-from ._tokens import tokens_log
-from ._tools import Tool, basemodel_to_param_schema
+from ._ratelimit import credential_key
+from ._tools import Tool, basemodel_to_param_schema, cached_schema
+from ._tracing import span
 from ._turn import Turn, normalize_turns
+from ._usage import Tokens
 from ._utils import MISSING, MISSING_TYPE, inform_model_default, is_testing
 
 if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
     from openai.types.chat import (
         ChatCompletion,
         ChatCompletionChunk,
@@ -36,6 +41,7 @@ if TYPE_CHECKING:
         ChatCompletionContentPartParam,
     )
     from openai.types.chat_model import ChatModel
+    from openai.types.shared_params import ResponseFormatJSONSchema
 
     from .types.openai import ChatAzureClientArgs, ChatClientArgs, SubmitInputArgs
 else:
@@ -181,7 +187,12 @@ def ChatOpenAI(
     )
 
 
-class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletionDict]):
+class OpenAIProvider(
+    Provider[ChatCompletion, ChatCompletionChunk, "ChatCompletionAccumulator"]
+):
+    # The client attributes that identify the account requests are made with
+    _credentials: tuple[str, ...] = ("api_key", "organization", "project")
+
     def __init__(
         self,
         *,
@@ -209,8 +220,17 @@ class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletio
         }
 
         # TODO: worth bringing in AsyncOpenAI types?
-        self._client = OpenAI(**kwargs_full)  # type: ignore
-        self._async_client = AsyncOpenAI(**kwargs_full)
+        self._clients: SharedClients[OpenAI, AsyncOpenAI] = SharedClients(
+            OpenAI, AsyncOpenAI, kwargs_full
+        )
+
+    @property
+    def _client(self) -> "OpenAI":
+        return self._clients.client
+
+    @property
+    def _async_client(self) -> "AsyncOpenAI":
+        return self._clients.async_client
 
     @overload
     def chat_perform(
@@ -243,8 +263,14 @@ class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletio
         data_model: Optional[type[BaseModel]] = None,
         kwargs: Optional["SubmitInputArgs"] = None,
     ):
-        kwargs = self._chat_perform_args(stream, turns, tools, data_model, kwargs)
-        return self._client.chat.completions.create(**kwargs)  # type: ignore
+        with span("chatlas.request.build"):
+            kwargs = reuse_request(
+                self,
+                (stream, turns, tools, data_model, kwargs),
+                self._chat_perform_args,
+            )
+        with span("chatlas.request", provider=self):
+            return self._client.chat.completions.create(**kwargs)  # type: ignore
 
     @overload
     async def chat_perform_async(
@@ -277,8 +303,14 @@ class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletio
         data_model: Optional[type[BaseModel]] = None,
         kwargs: Optional["SubmitInputArgs"] = None,
     ):
-        kwargs = self._chat_perform_args(stream, turns, tools, data_model, kwargs)
-        return await self._async_client.chat.completions.create(**kwargs)  # type: ignore
+        with span("chatlas.request.build"):
+            kwargs = reuse_request(
+                self,
+                (stream, turns, tools, data_model, kwargs),
+                self._chat_perform_args,
+            )
+        with span("chatlas.request", provider=self):
+            return await self._async_client.chat.completions.create(**kwargs)  # type: ignore
 
     def _chat_perform_args(
         self,
@@ -302,18 +334,9 @@ class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletio
             kwargs_full["tools"] = tool_schemas
 
         if data_model is not None:
-            params = basemodel_to_param_schema(data_model)
-            params = cast(dict, params)
-            params["additionalProperties"] = False
-            kwargs_full["response_format"] = {
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "structured_data",
-                    "description": params.get("description", ""),
-                    "schema": params,
-                    "strict": True,
-                },
-            }
+            kwargs_full["response_format"] = cached_schema(
+                data_model, "openai", lambda: self._response_format(data_model)
+            )
             # Apparently OpenAI gets confused if you include
             # both response_format and tools
             if "tools" in kwargs_full:
@@ -324,23 +347,57 @@ class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletio
 
         return kwargs_full
 
+    @staticmethod
+    def _response_format(data_model: type[BaseModel]) -> "ResponseFormatJSONSchema":
+        params = basemodel_to_param_schema(data_model)
+        params = cast(dict, params)
+        params["additionalProperties"] = False
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "structured_data",
+                "description": params.get("description", ""),
+                "schema": params,
+                "strict": True,
+            },
+        }
+
+    def cache_key(self, *, turns, tools, data_model=None, kwargs=None, stream=False):
+        args = (stream, turns, tools, data_model, kwargs)
+        request = self._chat_perform_args(*args)
+        keep_request(self, args, request)
+        # The same model may be served by different (e.g., compatible) APIs
+        return request_key(self, request, base_url=self._clients.base_url)
+
+    def rate_limit_key(self):
+        # (Providers with the same credentials share limits, whatever their
+        # other client options, e.g., timeouts)
+        clients = self._clients
+        credentials = [getattr(clients.client, x, None) for x in self._credentials]
+        return credential_key(self, clients.base_url, *credentials)
+
+    def usage_key(self):
+        name, _, model = super().usage_key()
+        return name, self._clients.base_url, model
+
     def stream_text(self, chunk):
         if not chunk.choices:
             return None
         return chunk.choices[0].delta.content
 
     def stream_merge_chunks(self, completion, chunk):
-        chunkd = chunk.model_dump()
         if completion is None:
-            return chunkd
-        return merge_dicts(completion, chunkd)
+            completion = ChatCompletionAccumulator()
+        completion.add(chunk)
+        return completion
 
     def stream_turn(self, completion, has_data_model, stream) -> Turn:
         from openai.types.chat import ChatCompletion
 
-        delta = completion["choices"][0].pop("delta")  # type: ignore
-        completion["choices"][0]["message"] = delta  # type: ignore
-        completion = ChatCompletion.construct(**completion)
+        completiond = completion.result()
+        delta = completiond["choices"][0].pop("delta")
+        completiond["choices"][0]["message"] = delta
+        completion = ChatCompletion.construct(**completiond)
         return self._as_turn(completion, has_data_model)
 
     async def stream_turn_async(self, completion, has_data_model, stream):
@@ -351,6 +408,17 @@ class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletio
 
     @staticmethod
     def _as_message_param(turns: list[Turn]) -> list["ChatCompletionMessageParam"]:
+        res: list["ChatCompletionMessageParam"] = []
+        for turn in turns:
+            res.extend(
+                turn._cached_params(
+                    OpenAIProvider, OpenAIProvider._turn_as_message_params
+                )
+            )
+        return res
+
+    @staticmethod
+    def _turn_as_message_params(turn: Turn) -> list["ChatCompletionMessageParam"]:
         from openai.types.chat import (
             ChatCompletionAssistantMessageParam,
             ChatCompletionMessageToolCallParam,
@@ -360,91 +428,88 @@ class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletio
         )
 
         res: list["ChatCompletionMessageParam"] = []
-        for turn in turns:
-            if turn.role == "system":
-                res.append(
-                    ChatCompletionSystemMessageParam(content=turn.text, role="system")
-                )
-            elif turn.role == "assistant":
-                content_parts: list["ContentArrayOfContentPart"] = []
-                tool_calls: list["ChatCompletionMessageToolCallParam"] = []
-                for x in turn.contents:
-                    if isinstance(x, ContentText):
-                        content_parts.append({"type": "text", "text": x.text})
-                    elif isinstance(x, ContentJson):
-                        content_parts.append({"type": "text", "text": ""})
-                    elif isinstance(x, ContentToolRequest):
-                        tool_calls.append(
-                            {
-                                "id": x.id,
-                                "function": {
-                                    "name": x.name,
-                                    "arguments": json.dumps(x.arguments),
-                                },
-                                "type": "function",
-                            }
-                        )
-                    else:
-                        raise ValueError(
-                            f"Don't know how to handle content type {type(x)} for role='assistant'."
-                        )
+        if turn.role == "system":
+            res.append(
+                ChatCompletionSystemMessageParam(content=turn.text, role="system")
+            )
+        elif turn.role == "assistant":
+            content_parts: list["ContentArrayOfContentPart"] = []
+            tool_calls: list["ChatCompletionMessageToolCallParam"] = []
+            for x in turn.contents:
+                if isinstance(x, ContentText):
+                    content_parts.append({"type": "text", "text": x.text})
+                elif isinstance(x, ContentJson):
+                    content_parts.append({"type": "text", "text": ""})
+                elif isinstance(x, ContentToolRequest):
+                    tool_calls.append(
+                        {
+                            "id": x.id,
+                            "function": {
+                                "name": x.name,
+                                "arguments": json.dumps(x.arguments),
+                            },
+                            "type": "function",
+                        }
+                    )
+                else:
+                    raise ValueError(
+                        f"Don't know how to handle content type {type(x)} for role='assistant'."
+                    )
 
-                # Some OpenAI-compatible models (e.g., Groq) don't work nicely with empty content
-                args = {
-                    "role": "assistant",
-                    "content": content_parts,
-                    "tool_calls": tool_calls,
-                }
-                if not content_parts:
-                    del args["content"]
-                if not tool_calls:
-                    del args["tool_calls"]
-
-                res.append(ChatCompletionAssistantMessageParam(**args))
-
-            elif turn.role == "user":
-                contents: list["ChatCompletionContentPartParam"] = []
-                tool_results: list["ChatCompletionToolMessageParam"] = []
-                for x in turn.contents:
-                    if isinstance(x, ContentText):
-                        contents.append({"type": "text", "text": x.text})
-                    elif isinstance(x, ContentJson):
-                        contents.append({"type": "text", "text": ""})
-                    elif isinstance(x, ContentImageRemote):
-                        contents.append(
-                            {"type": "image_url", "image_url": {"url": x.url}}
-                        )
-                    elif isinstance(x, ContentImageInline):
-                        contents.append(
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{x.content_type};base64,{x.data}"
-                                },
-                            }
-                        )
-                    elif isinstance(x, ContentToolResult):
-                        tool_results.append(
-                            ChatCompletionToolMessageParam(
-                                # TODO: a tool could return an image!?!
-                                content=x.get_final_value(),
-                                tool_call_id=x.id,
-                                role="tool",
-                            )
-                        )
-                    else:
-                        raise ValueError(
-                            f"Don't know how to handle content type {type(x)} for role='user'."
+            # Some OpenAI-compatible models (e.g., Groq) don't work nicely with empty content
+            args = {
+                "role": "assistant",
+                "content": content_parts,
+                "tool_calls": tool_calls,
+            }
+            if not content_parts:
+                del args["content"]
+            if not tool_calls:
+                del args["tool_calls"]
+
+            res.append(ChatCompletionAssistantMessageParam(**args))
+
+        elif turn.role == "user":
+            contents: list["ChatCompletionContentPartParam"] = []
+            tool_results: list["ChatCompletionToolMessageParam"] = []
+            for x in turn.contents:
+                if isinstance(x, ContentText):
+                    contents.append({"type": "text", "text": x.text})
+                elif isinstance(x, ContentJson):
+                    contents.append({"type": "text", "text": ""})
+                elif isinstance(x, ContentImageRemote):
+                    contents.append({"type": "image_url", "image_url": {"url": x.url}})
+                elif isinstance(x, ContentImageInline):
+                    contents.append(
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{x.content_type};base64,{x.data}"
+                            },
+                        }
+                    )
+                elif isinstance(x, ContentToolResult):
+                    tool_results.append(
+                        ChatCompletionToolMessageParam(
+                            # TODO: a tool could return an image!?!
+                            content=x.get_final_value(),
+                            tool_call_id=x.id,
+                            role="tool",
                         )
-
-                if contents:
-                    res.append(
-                        ChatCompletionUserMessageParam(content=contents, role="user")
                     )
-                res.extend(tool_results)
+                else:
+                    raise ValueError(
+                        f"Don't know how to handle content type {type(x)} for role='user'."
+                    )
 
-            else:
-                raise ValueError(f"Unknown role: {turn.role}")
+            if contents:
+                res.append(
+                    ChatCompletionUserMessageParam(content=contents, role="user")
+                )
+            res.extend(tool_results)
+
+        else:
+            raise ValueError(f"Unknown role: {turn.role}")
 
         return res
 
@@ -492,15 +557,18 @@ class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletio
         if usage is None:
             tokens = (0, 0)
         else:
-            tokens = usage.prompt_tokens, usage.completion_tokens
+            details = usage.prompt_tokens_details
+            tokens = Tokens(
+                usage.prompt_tokens,
+                usage.completion_tokens,
+                cache_read=(details and details.cached_tokens) or 0,
+            )
 
         # For some reason ChatGroq() includes tokens under completion.x_groq
         if usage is None and hasattr(completion, "x_groq"):
             usage = completion.x_groq["usage"]  # type: ignore
             tokens = usage["prompt_tokens"], usage["completion_tokens"]
 
-        tokens_log(self, tokens)
-
         return Turn(
             "assistant",
             contents,
@@ -510,6 +578,140 @@ class OpenAIProvider(Provider[ChatCompletion, ChatCompletionChunk, ChatCompletio
         )
 
 
+class ChatCompletionAccumulator:
+    """
+    Accumulates streamed `ChatCompletionChunk`s into a `ChatCompletion` dict.
+
+    The result is the same as merging the `.model_dump()` of every chunk with
+    `merge_dicts()`, but the work done per chunk doesn't grow with the length
+    of the response: text (and tool call argument) fragments are buffered in
+    lists and joined once at the end, and choices/tool calls are looked up by
+    their index.
+    """
+
+    def __init__(self):
+        self._fields: dict[str, Any] = {}
+        self._choices: dict[int, _ChoiceAccumulator] = {}
+
+    def add(self, chunk: "ChatCompletionChunk") -> None:
+        for key, value in chunk:
+            if key == "choices":
+                for choice in value:
+                    if choice.index not in self._choices:
+                        self._choices[choice.index] = _ChoiceAccumulator()
+                    self._choices[choice.index].add(choice)
+            else:
+                merge_value(self._fields, key, _dump(value))
+
+    def result(self) -> ChatCompletionDict:
+        return {
+            **self._fields,
+            "choices": [x.result() for x in self._choices.values()],
+        }
+
+
+class _ChoiceAccumulator:
+    def __init__(self):
+        self._fields: dict[str, Any] = {}
+        self._delta: dict[str, Any] = {}
+        self._text: dict[str, list[str]] = {}
+        self._tool_calls: Optional[dict[int, _ToolCallAccumulator]] = None
+        self._logprobs: Optional[dict[str, Optional[list[Any]]]] = None
+
+    def add(self, choice: Any) -> None:
+        for key, value in choice:
+            if key == "delta":
+                self._add_delta(value)
+            elif key == "logprobs":
+                self._add_logprobs(value)
+            else:
+                merge_value(self._fields, key, _dump(value))
+
+    def _add_delta(self, delta: Any) -> None:
+        for key, value in delta:
+            if key == "tool_calls" and value is not None:
+                if self._tool_calls is None:
+                    self._tool_calls = {}
+                for call in value:
+                    if call.index not in self._tool_calls:
+                        self._tool_calls[call.index] = _ToolCallAccumulator()
+                    self._tool_calls[call.index].add(call)
+            elif isinstance(value, str) and key != "role":
+                self._text.setdefault(key, []).append(value)
+            else:
+                merge_value(self._delta, key, _dump(value))
+
+    def _add_logprobs(self, logprobs: Any) -> None:
+        if logprobs is None:
+            if self._logprobs is None:
+                self._fields.setdefault("logprobs", None)
+            return
+        if self._logprobs is None:
+            self._logprobs = {}
+        for key, value in logprobs:
+            if value is None:
+                self._logprobs.setdefault(key, None)
+                continue
+            items = self._logprobs.get(key)
+            if items is None:
+                items = self._logprobs[key] = []
+            items.extend(_dump(x) for x in value)
+
+    def result(self) -> dict[str, Any]:
+        delta = dict(self._delta)
+        for key, fragments in self._text.items():
+            delta[key] = "".join(fragments)
+        if self._tool_calls is not None:
+            delta["tool_calls"] = [x.result() for x in self._tool_calls.values()]
+
+        res = {**self._fields, "delta": delta}
+        if self._logprobs is not None:
+            res["logprobs"] = dict(self._logprobs)
+        return res
+
+
+class _ToolCallAccumulator:
+    def __init__(self):
+        self._fields: dict[str, Any] = {}
+        self._function: Optional[dict[str, Any]] = None
+        self._arguments: list[str] = []
+
+    def add(self, call: Any) -> None:
+        is_first = not self._fields
+        for key, value in call:
+            if key == "function" and value is not None:
+                if self._function is None:
+                    self._function = {}
+                for fkey, fvalue in value:
+                    if fkey == "arguments" and fvalue is not None:
+                        self._arguments.append(fvalue)
+                    else:
+                        merge_value(self._function, fkey, _dump(fvalue))
+            # Like merge_lists(), only respect the 'type' of the first delta
+            elif key == "type" and not is_first:
+                continue
+            else:
+                merge_value(self._fields, key, _dump(value))
+
+    def result(self) -> dict[str, Any]:
+        res = dict(self._fields)
+        if self._function is not None:
+            # (Like the SDK's tool calls, always with arguments, if only "")
+            res["function"] = {
+                **self._function,
+                "arguments": "".join(self._arguments),
+            }
+        else:
+            res.setdefault("function", None)
+        return res
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return value
+
+
 def ChatAzureOpenAI(
     *,
     endpoint: str,
@@ -637,8 +839,7 @@ class OpenAIAzureProvider(OpenAIProvider):
             **(kwargs or {}),
         }
 
-        self._client = AzureOpenAI(**kwargs_full)  # type: ignore
-        self._async_client = AsyncAzureOpenAI(**kwargs_full)  # type: ignore
+        self._clients = SharedClients(AzureOpenAI, AsyncAzureOpenAI, kwargs_full)
 
 
 class InvalidJSONParameterWarning(RuntimeWarning):
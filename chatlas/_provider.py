@@ -14,6 +14,7 @@ from typing import (
 
 from pydantic import BaseModel
 
+from ._content import ContentToolRequest
 from ._tools import Tool
 from ._turn import Turn
 
@@ -119,6 +120,22 @@ class Provider(
         chunk: ChatCompletionChunkT,
     ) -> ChatCompletionDictT: ...
 
+    def stream_tool_requests(
+        self,
+        completion: ChatCompletionDictT,
+        chunk: ChatCompletionChunkT,
+    ) -> list[ContentToolRequest]:
+        """
+        Get the tool requests that have been fully streamed as of this chunk.
+
+        This is called after `.stream_merge_chunks()` (with the merged
+        `completion`) and allows tools to start running before the response
+        has finished streaming. Providers that can't tell when a tool request
+        is complete may leave the default, which never reports any requests
+        (so tools are invoked once the stream is done).
+        """
+        return []
+
     @abstractmethod
     def stream_turn(
         self,
@@ -141,3 +158,45 @@ class Provider(
         completion: ChatCompletionT,
         has_data_model: bool,
     ) -> Turn: ...
+
+    def cache_key(
+        self,
+        *,
+        turns: list[Turn],
+        tools: dict[str, Tool],
+        data_model: Optional[type[BaseModel]],
+        kwargs: Any,
+        stream: bool = False,
+    ) -> Optional[str]:
+        """
+        Get a key that identifies the response to a request.
+
+        Requests with the same key are expected to produce equivalent
+        responses, so the key should account for everything sent to the model
+        (e.g., via `chatlas._cache.request_hash()`), except for whether the
+        response is streamed (`stream`). Providers that return `None` (the
+        default) never have their responses cached.
+        """
+        return None
+
+    def rate_limit_key(self) -> Optional[str]:
+        """
+        Get a key that identifies the credentials used for requests.
+
+        Providers with the same key share rate limits (i.e., request and token
+        budgets, and pauses requested by the server). Providers that return
+        `None` (the default) get rate limits of their own.
+        """
+        return None
+
+    def usage_key(self) -> tuple[str, str, str]:
+        """
+        Get the provider (name), base URL, and model that the usage of
+        requests (i.e., tokens, requests, and latency) is accounted to.
+
+        By default, the name is the provider's class name (without "Provider"),
+        the base URL is empty, and the model is the provider's `_model` (if
+        any).
+        """
+        name = type(self).__name__.replace("Provider", "")
+        return name, "", str(getattr(self, "_model", ""))
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Mapping, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from ._provider import Provider
+
+T = TypeVar("T")
+
+# HTTP status codes worth retrying (529 is Anthropic's "overloaded")
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """
+    A token bucket that holds (at most) `capacity` tokens and is refilled at a
+    rate of `capacity` tokens per `period` seconds.
+
+    Reservations are always granted, but may put the bucket in debt, in which
+    case the caller must wait for the debt to be paid off before proceeding.
+    This keeps waiting callers in (roughly) first-come, first-served order.
+    """
+
+    def __init__(self, capacity: float, period: float = 60):
+        if capacity <= 0:
+            raise ValueError("The capacity of a token bucket must be positive.")
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def reserve(self, amount: float, now: Optional[float] = None) -> float:
+        """
+        Take `amount` tokens from the bucket, and return the number of seconds
+        to wait before they may be used.
+        """
+        self.refill(now)
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def refill(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        elapsed = max(0.0, now - self._updated)
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """
+    Schedule the requests made with one set of credentials (for one provider).
+
+    Requests are delayed to stay within the requests-per-minute and
+    tokens-per-minute budgets (if any), and retried with jittered exponential
+    backoff when they fail with a rate limit, overload, or server error (up to
+    `max_retries` times, which is 0 by default, since the providers' SDKs
+    retry on their own). When the server says how long to wait (i.e., via a
+    `retry-after` or rate limit reset header), all of the requests that share
+    the limiter wait that long.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.configure(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=max_retries,
+            backoff_base=backoff_base,
+            backoff_max=backoff_max,
+        )
+
+    def configure(
+        self,
+        *,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ) -> None:
+        if max_retries < 0:
+            raise ValueError("`max_retries` must be a non-negative integer.")
+        with self._lock:
+            self._requests = (
+                TokenBucket(requests_per_minute) if requests_per_minute else None
+            )
+            self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+            self.max_retries = max_retries
+            self.backoff_base = backoff_base
+            self.backoff_max = backoff_max
+
+    @property
+    def limits_tokens(self) -> bool:
+        return self._tokens is not None
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve the budget for a request (of an estimated number of `tokens`),
+        and return the number of seconds to wait before making it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._paused_until - now
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens is not None and tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+        return max(0.0, wait)
+
+    def record_usage(self, estimate: int, tokens: Optional[tuple[int, int]]) -> None:
+        """
+        Correct the token budget once the actual usage of a request is known.
+        """
+        if self._tokens is None or tokens is None:
+            return
+        with self._lock:
+            self._tokens.reserve(sum(tokens) - estimate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold off all requests for (at least) the given number of seconds.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        The number of seconds to wait before retrying a request that failed
+        with `error` (on its `attempt`th retry), or `None` to not retry it.
+        """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = retry_after(error)
+        if delay is not None:
+            # The server knows best, and its advice applies to everyone (so
+            # the wait happens when the budget for the retry is reserved)
+            self.pause(delay)
+            return 0.0
+        # "Full jitter" keeps concurrent retries from arriving in lockstep
+        cap = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return random.uniform(0, cap)
+
+    def call(self, perform: Callable[[], T], tokens: int = 0) -> T:
+        attempt = 0
+        while True:
+            wait = self.reserve(tokens)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return perform()
+            except Exception as e:
+                delay = self.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            attempt += 1
+            if delay > 0:
+                time.sleep(delay)
+
+    async def call_async(
+        self, perform: Callable[[], Awaitable[T]], tokens: int = 0
+    ) -> T:
+        attempt = 0
+        while True:
+            wait = self.reserve(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await perform()
+            except Exception as e:
+                delay = self.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            attempt += 1
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+
+# ----------------------------------------------------------------------------
+# Rate limiters shared by providers (with the same credentials)
+# ----------------------------------------------------------------------------
+
+_limiters: dict[str, RateLimiter] = {}
+_provider_limiters: weakref.WeakKeyDictionary[Provider, RateLimiter] = (
+    weakref.WeakKeyDictionary()
+)
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter(provider: Provider) -> RateLimiter:
+    """
+    Get the rate limiter for a provider, which is shared with every other
+    provider that has the same `.rate_limit_key()`.
+    """
+    key = provider.rate_limit_key()
+    with _limiters_lock:
+        if key is None:
+            limiter = _provider_limiters.get(provider)
+            if limiter is None:
+                limiter = _provider_limiters[provider] = RateLimiter()
+        else:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = _limiters[key] = RateLimiter()
+    return limiter
+
+
+def credential_key(provider: Provider, *parts: Any) -> str:
+    """
+    A key identifying a provider (class) and its credentials, without
+    revealing them.
+    """
+    cls = type(provider)
+    digest = hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:16]
+    return f"{cls.__module__}.{cls.__qualname__}:{digest}"
+
+
+# ----------------------------------------------------------------------------
+# Helpers for inspecting (provider SDK) errors
+# ----------------------------------------------------------------------------
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        # E.g., google.api_core exceptions
+        status = getattr(error, "code", None)
+    return isinstance(status, int) and status in RETRY_STATUS_CODES
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Get the number of seconds the server asked us to wait before retrying (if
+    it did so).
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+    return parse_retry_headers(headers)
+
+
+def parse_retry_headers(headers: Mapping[str, str]) -> Optional[float]:
+    headers = {k.lower(): v for k, v in headers.items()}
+
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+
+    if "retry-after" in headers:
+        value = headers["retry-after"]
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            date = parsedate_to_datetime(value)
+            return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+
+    # Otherwise, wait for the exhausted limit(s) to reset
+    resets: list[float] = []
+    for name, value in headers.items():
+        # OpenAI, e.g., x-ratelimit-remaining-requests: 0
+        if name.startswith("x-ratelimit-remaining-") and value.strip() == "0":
+            reset = headers.get(name.replace("-remaining-", "-reset-"))
+            seconds = parse_duration(reset) if reset else None
+        # Anthropic, e.g., anthropic-ratelimit-requests-remaining: 0
+        elif (
+            name.startswith("anthropic-ratelimit-")
+            and name.endswith("-remaining")
+            and value.strip() == "0"
+        ):
+            reset = headers.get(name[: -len("-remaining")] + "-reset")
+            seconds = parse_timestamp(reset) if reset else None
+        else:
+            continue
+        if seconds is not None:
+            resets.append(seconds)
+
+    return max(resets) if resets else None
+
+
+def parse_duration(x: str) -> Optional[float]:
+    """
+    Parse a duration like "1s", "6m0s", "20ms", or "1h2m3.5s" into seconds.
+    """
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", x)
+    if not parts or "".join(n + u for n, u in parts) != x.strip():
+        return None
+    return sum(float(n) * units[u] for n, u in parts)
+
+
+def parse_timestamp(x: str) -> Optional[float]:
+    """
+    Parse an RFC 3339 timestamp into the number of seconds from now.
+    """
+    try:
+        date = datetime.fromisoformat(x.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+from ._content import (
+    Content,
+    ContentImageInline,
+    ContentImageRemote,
+    ContentJson,
+    ContentText,
+    ContentToolRequest,
+    ContentToolResult,
+)
+from ._turn import Turn
+from ._usage import Tokens
+
+# The version of the format of serialized turns (see `turns_to_dict()`)
+VERSION = 1
+
+MSGPACK_SUFFIXES = (".msgpack", ".mpk")
+
+
+def turns_to_dict(turns: Sequence[Turn], completions: bool = False) -> dict[str, Any]:
+    """
+    Convert turns into a (JSON-serializable) dictionary.
+
+    Text content is written as a plain string, other content as a dictionary
+    with a `"type"`. The data of inline images is written once, to the
+    `"images"` table, and contents refer to it by its hash. Completions are
+    dropped, unless `completions` is `True`, in which case they're written as
+    (JSON) dictionaries.
+    """
+    images: dict[str, str] = {}
+    res: dict[str, Any] = {
+        "version": VERSION,
+        "turns": [turn_to_dict(x, images, completions) for x in turns],
+    }
+    if images:
+        res["images"] = images
+    return res
+
+
+def turns_from_dict(data: dict[str, Any]) -> list[Turn]:
+    """
+    Convert a dictionary from `turns_to_dict()` back into turns.
+    """
+    version = data.get("version")
+    if version != VERSION:
+        raise ValueError(
+            f"Can't load turns of version {version!r} (expected {VERSION})."
+        )
+    images = data.get("images") or {}
+    return [turn_from_dict(x, images) for x in data["turns"]]
+
+
+def turn_to_dict(
+    turn: Turn, images: dict[str, str], completions: bool = False
+) -> dict[str, Any]:
+    res: dict[str, Any] = {
+        "role": turn.role,
+        "contents": [content_to_dict(x, images) for x in turn.contents],
+    }
+    tokens = turn.tokens
+    if tokens:
+        res["tokens"] = list(tokens)
+        if isinstance(tokens, Tokens) and (tokens.cache_read or tokens.cache_write):
+            res["tokens"] += [tokens.cache_read, tokens.cache_write]
+    if turn.finish_reason is not None:
+        res["finish_reason"] = turn.finish_reason
+    if completions and turn.completion is not None:
+        completion = compact_completion(turn.completion)
+        if completion is not None:
+            res["completion"] = completion
+    return res
+
+
+def turn_from_dict(data: dict[str, Any], images: dict[str, str]) -> Turn:
+    tokens = data.get("tokens")
+    return Turn(
+        data["role"],
+        [
+            ContentText(x) if type(x) is str else content_from_dict(x, images)
+            for x in data["contents"]
+        ],
+        tokens=Tokens(*tokens) if tokens else None,
+        finish_reason=data.get("finish_reason"),
+        completion=data.get("completion"),
+    )
+
+
+def content_to_dict(x: Content, images: dict[str, str]) -> str | dict[str, Any]:
+    # (Checked in order of how common the content is)
+    if isinstance(x, ContentText):
+        return x.text
+    if isinstance(x, ContentToolRequest):
+        return {
+            "type": "tool_request",
+            "id": x.id,
+            "name": x.name,
+            "arguments": jsonable(x.arguments),
+        }
+    if isinstance(x, ContentToolResult):
+        res: dict[str, Any] = {"type": "tool_result", "id": x.id}
+        if x.value is not None:
+            res["value"] = jsonable(x.value)
+        if x.error is not None:
+            res["error"] = x.error
+        return res
+    if isinstance(x, ContentImageInline):
+        res = {"type": "image_inline", "content_type": x.content_type}
+        if x.data is not None:
+            ref = hashlib.sha256(x.data.encode("utf-8")).hexdigest()[:16]
+            images[ref] = x.data
+            res["ref"] = ref
+        return res
+    if isinstance(x, ContentImageRemote):
+        return {"type": "image_remote", "url": x.url, "detail": x.detail}
+    if isinstance(x, ContentJson):
+        return {"type": "json", "value": x.value}
+    raise TypeError(f"Can't serialize content of type {type(x).__name__}.")
+
+
+def content_from_dict(x: dict[str, Any], images: dict[str, str]) -> Content:
+    decode = CONTENT_DECODERS.get(x.get("type", ""))
+    if decode is None:
+        raise ValueError(f"Unknown content type: {x.get('type')!r}.")
+    return decode(x, images)
+
+
+CONTENT_DECODERS: dict[str, Callable[[dict[str, Any], dict[str, str]], Content]] = {
+    "text": lambda x, _: ContentText(x["text"]),
+    "tool_request": lambda x, _: ContentToolRequest(
+        x["id"], x["name"], x.get("arguments")
+    ),
+    "tool_result": lambda x, _: ContentToolResult(
+        x["id"], x.get("value"), x.get("error")
+    ),
+    "image_inline": lambda x, images: ContentImageInline(
+        x["content_type"], images[x["ref"]] if "ref" in x else None
+    ),
+    "image_remote": lambda x, _: ContentImageRemote(x["url"], x.get("detail", "auto")),
+    "json": lambda x, _: ContentJson(x["value"]),
+}
+
+
+def jsonable(x: Any) -> Any:
+    """
+    A JSON-serializable version of a value (e.g., of a tool result). Values
+    that JSON can't represent are written as strings, i.e., as they're sent to
+    the model.
+    """
+    if x is None or isinstance(x, (str, int, float, bool)):
+        return x
+    try:
+        return json.loads(json.dumps(x, default=str))
+    except (TypeError, ValueError):
+        return str(x)
+
+
+def compact_completion(x: Any) -> Optional[dict[str, Any]]:
+    """
+    A (JSON) dictionary of a provider's completion object, or `None` if it
+    can't be converted.
+    """
+    try:
+        if hasattr(x, "model_dump"):
+            return x.model_dump(mode="json", exclude_none=True)
+        if hasattr(x, "to_dict"):
+            return jsonable(x.to_dict())
+    except Exception:
+        pass
+    return x if isinstance(x, dict) else None
+
+
+def write_turns(path: Path, data: dict[str, Any]) -> None:
+    if path.suffix in MSGPACK_SUFFIXES:
+        msgpack = import_msgpack()
+        path.write_bytes(msgpack.packb(data))
+        return
+
+    # JSONL: a header (with the version and images), then a line per turn
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    header = {k: v for k, v in data.items() if k != "turns"}
+    with path.open("w", encoding="utf-8") as f:
+        f.write(dumps(header) + "\n")
+        for turn in data["turns"]:
+            f.write(dumps(turn) + "\n")
+
+
+def read_turns(path: Path) -> dict[str, Any]:
+    if path.suffix in MSGPACK_SUFFIXES:
+        msgpack = import_msgpack()
+        return msgpack.unpackb(path.read_bytes())
+
+    header, _, turns = path.read_text(encoding="utf-8").partition("\n")
+    if not header:
+        raise ValueError(f"{path} is empty.")
+    data = json.loads(header)
+    # (JSON escapes newlines within strings, so the (non-blank) lines of turns
+    # can be parsed at once, as an array, which is faster than line by line)
+    # (Only "\n" separates lines: other line boundaries, like U+2028, are
+    # written unescaped within strings)
+    lines = [x for x in turns.split("\n") if x.strip()]
+    data["turns"] = json.loads(f"[{','.join(lines)}]")
+    return data
+
+
+def import_msgpack() -> Any:
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError(
+            "Saving and loading `.msgpack` files requires the `msgpack` package. "
+            "Install it with `pip install msgpack`."
+        )
+    return msgpack
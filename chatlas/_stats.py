@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+__all__ = (
+    "ResponseStats",
+    "RoundStats",
+)
+
+T = TypeVar("T")
+
+
+@dataclass
+class RoundStats:
+    """
+    The timings and sizes of a round of a response (i.e., a request and its
+    response; a response has a round per iteration of the tool calling loop).
+
+    Times are in seconds since the response started (see
+    [](`~chatlas.types.ResponseStats`)), and are `None` if the event didn't
+    happen (e.g., a response without text has no `first_text`).
+    """
+
+    start: float
+    """When the round started (e.g., after the previous round's tools ran)."""
+    request_start: Optional[float] = None
+    """When (the last attempt at) sending the request started."""
+    headers: Optional[float] = None
+    """When the response's headers were received (for a response that isn't
+    streamed, when the whole response was)."""
+    first_chunk: Optional[float] = None
+    """When the first chunk of the response was received."""
+    first_text: Optional[float] = None
+    """When the first text of the response was received."""
+    last_text: Optional[float] = None
+    """When the last text of the response was received."""
+    end: Optional[float] = None
+    """When the response was complete."""
+    chunks: int = 0
+    """The number of chunks received (a response that isn't streamed is one
+    chunk)."""
+    text_chunks: int = 0
+    """The number of chunks with text."""
+    bytes: int = 0
+    """The size of the response's text (in bytes, UTF-8 encoded)."""
+    tokens: Optional[tuple[int, int]] = None
+    """The (input, output) tokens of the request and response."""
+    cached: bool = False
+    """Whether the response came from a response cache (see
+    [](`~chatlas.Chat`)'s `.set_cache()`)."""
+
+    _origin: float = field(default=0.0, repr=False, compare=False)
+
+    @classmethod
+    def begin(cls, origin: Optional[float] = None) -> RoundStats:
+        now = time.perf_counter()
+        origin = now if origin is None else origin
+        return cls(start=now - origin, _origin=origin)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """
+        The time from sending the request to receiving all of the response.
+        """
+        if self.request_start is None or self.end is None:
+            return None
+        return self.end - self.request_start
+
+    def wrap(self, send: Callable[[], T]) -> Callable[[], T]:
+        """
+        Time a function that sends the request.
+        """
+
+        def wrapper() -> T:
+            self.request_start = self._now()
+            res = send()
+            self.headers = self._now()
+            return res
+
+        return wrapper
+
+    def wrap_async(
+        self, send: Callable[[], Awaitable[T]]
+    ) -> Callable[[], Awaitable[T]]:
+        """
+        Time an (async) function that sends the request.
+        """
+
+        async def wrapper() -> T:
+            self.request_start = self._now()
+            res = await send()
+            self.headers = self._now()
+            return res
+
+        return wrapper
+
+    def chunk(self, text: Optional[str] = None) -> None:
+        """
+        Record a received chunk (and its text).
+        """
+        now = self._now()
+        if self.first_chunk is None:
+            self.first_chunk = now
+        self.chunks += 1
+        if text:
+            if self.first_text is None:
+                self.first_text = now
+            self.last_text = now
+            self.text_chunks += 1
+            self.bytes += len(text.encode("utf-8"))
+
+    def finish(self, tokens: Optional[tuple[int, int]]) -> None:
+        self.end = self._now()
+        self.tokens = tokens
+
+    def _now(self) -> float:
+        return time.perf_counter() - self._origin
+
+
+@dataclass
+class ResponseStats:
+    """
+    The timings and sizes of a response from a chat.
+
+    Times are in seconds since the response started (i.e., since `.chat()`,
+    `.stream()`, etc. was called).
+    """
+
+    started_at: float = field(default_factory=time.time)
+    """When the response started (as a Unix timestamp)."""
+    rounds: list[RoundStats] = field(default_factory=list)
+    """The rounds of the response (a request and its response, per iteration
+    of the tool calling loop)."""
+    end: Optional[float] = None
+    """When the response (including its tool calls) was complete."""
+
+    _origin: float = field(default_factory=time.perf_counter, repr=False)
+
+    def begin_round(self) -> RoundStats:
+        res = RoundStats.begin(self._origin)
+        self.rounds.append(res)
+        return res
+
+    def finish(self) -> None:
+        self.end = time.perf_counter() - self._origin
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """
+        The time until the first text of the response was received.
+        """
+        return next(
+            (x.first_text for x in self.rounds if x.first_text is not None), None
+        )
+
+    @property
+    def inter_token_latency(self) -> Optional[float]:
+        """
+        The average time between the chunks of text of the response (i.e.,
+        after the first one).
+        """
+        gaps = [
+            (x.last_text - x.first_text, x.text_chunks - 1)
+            for x in self.rounds
+            if x.first_text is not None and x.last_text is not None
+        ]
+        n = sum(n for _, n in gaps)
+        if n == 0:
+            return None
+        return sum(t for t, _ in gaps) / n
+
+    @property
+    def chunks(self) -> int:
+        """
+        The number of chunks received (in every round).
+        """
+        return sum(x.chunks for x in self.rounds)
+
+    @property
+    def bytes(self) -> int:
+        """
+        The size of the response's text (in bytes, UTF-8 encoded).
+        """
+        return sum(x.bytes for x in self.rounds)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        The stats as a (JSON-serializable) dictionary, e.g., for exporting to a
+        metrics system.
+        """
+        return {
+            "started_at": self.started_at,
+            "end": self.end,
+            "time_to_first_token": self.time_to_first_token,
+            "inter_token_latency": self.inter_token_latency,
+            "chunks": self.chunks,
+            "bytes": self.bytes,
+            "rounds": [
+                {
+                    "start": x.start,
+                    "request_start": x.request_start,
+                    "headers": x.headers,
+                    "first_chunk": x.first_chunk,
+                    "first_text": x.first_text,
+                    "last_text": x.last_text,
+                    "end": x.end,
+                    "chunks": x.chunks,
+                    "text_chunks": x.text_chunks,
+                    "bytes": x.bytes,
+                    "tokens": list(x.tokens) if x.tokens else None,
+                    "cached": x.cached,
+                }
+                for x in self.rounds
+            ],
+        }
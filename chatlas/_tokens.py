@@ -1,81 +1,262 @@
 from __future__ import annotations
 
-import copy
-from threading import Lock
-from typing import TYPE_CHECKING
+import base64
+import binascii
+import functools
+import json
+import math
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Optional,
+    Protocol,
+    Union,
+    runtime_checkable,
+)
 
-from ._typing_extensions import TypedDict
+from ._content import (
+    Content,
+    ContentImageInline,
+    ContentImageRemote,
+    ContentText,
+    ContentToolRequest,
+    ContentToolResult,
+)
+from ._content_image import image_size
+from ._usage import TokenUsage, record_usage, session_usage
 
 if TYPE_CHECKING:
     from ._provider import Provider
+    from ._turn import Turn
 
 
-class TokenUsage(TypedDict):
+def tokens_log(
+    provider: "Provider",
+    tokens: tuple[int, int],
+    latency: Optional[float] = None,
+) -> None:
     """
-    Token usage for a given provider (name).
+    Log the usage of a request (i.e., its tokens, and latency in seconds).
     """
+    record_usage(provider, tokens, latency)
 
-    name: str
-    input: int
-    output: int
+
+def tokens_reset() -> None:
+    """
+    Reset the token usage counter
+    """
+    session_usage.reset()
+
+
+def token_usage() -> list[TokenUsage] | None:
+    """
+    Report on token usage in the current session
+
+    Call this function to find out the cumulative number of tokens that you
+    have sent and received in the current session.
+
+    Returns
+    -------
+    list[TokenUsage] | None
+        A list of dictionaries, one per provider (name), base URL, and model,
+        with the following keys: "name", "base_url", "model", "requests",
+        "input", "output", "cache_read" and "cache_write" (the input tokens
+        read from, and written to, the provider's prompt cache), and "latency"
+        (a histogram of the requests' latency). If no tokens have been logged,
+        then None is returned.
+
+    Note
+    ----
+    To measure the usage of a single chat, see [](`~chatlas.Chat`)'s
+    `.token_usage()`, and for that of a block of code, see
+    [](`~chatlas.track_usage`).
+    """
+    return session_usage.token_usage()
+
+
+# ----------------------------------------------------------------------------
+# Estimating the number of tokens in turns (before they're sent)
+# ----------------------------------------------------------------------------
+
+
+# A duck type for tiktoken.Encoding
+@runtime_checkable
+class TiktokenEncoding(Protocol):
+    def encode_ordinary(self, text: str) -> list[int]: ...
 
 
-class ThreadSafeTokenCounter:
-    def __init__(self):
-        self._lock = Lock()
-        self._tokens: dict[str, TokenUsage] = {}
+# A duck type for tokenizers.Encoding
+class TokenizersEncoding(Protocol):
+    @property
+    def ids(self) -> list[int]: ...
 
-    def log_tokens(self, name: str, input_tokens: int, output_tokens: int) -> None:
-        with self._lock:
-            if name not in self._tokens:
-                self._tokens[name] = {
-                    "name": name,
-                    "input": input_tokens,
-                    "output": output_tokens,
-                }
-            else:
-                self._tokens[name]["input"] += input_tokens
-                self._tokens[name]["output"] += output_tokens
 
-    def get_usage(self) -> list[TokenUsage] | None:
-        with self._lock:
-            if not self._tokens:
-                return None
-            # Create a deep copy to avoid external modifications
-            return copy.deepcopy(list(self._tokens.values()))
+# A duck type for tokenizers.Tokenizer
+@runtime_checkable
+class TokenizersTokenizer(Protocol):
+    def encode(
+        self,
+        sequence: Any,
+        pair: Any = None,
+        is_pretokenized: bool = False,
+        add_special_tokens: bool = True,
+    ) -> TokenizersEncoding: ...
 
 
-# Global instance
-_token_counter = ThreadSafeTokenCounter()
+TokenEncoding = Union[str, TiktokenEncoding, TokenizersTokenizer, Callable[[str], int]]
+"""
+A tokenizer: the name of a tiktoken encoding (e.g., `"o200k_base"`), a
+`tiktoken.Encoding`, a `tokenizers.Tokenizer`, or a function that returns the
+number of tokens in a string.
+"""
 
+# The number of tokens each turn (i.e., message) adds to a request, beyond
+# those of its contents (e.g., for its role)
+TURN_OVERHEAD = 3
 
-def tokens_log(provider: "Provider", tokens: tuple[int, int]) -> None:
+
+class Tokenizer:
     """
-    Log token usage for a provider in a thread-safe manner.
+    Counts the number of tokens in text, with a tokenizer (or, if `encoding`
+    is `None`, a ~4 characters per token estimate).
     """
-    name = provider.__class__.__name__.replace("Provider", "")
-    _token_counter.log_tokens(name, tokens[0], tokens[1])
 
+    def __init__(self, encoding: Optional[TokenEncoding] = None):
+        if isinstance(encoding, str):
+            encoding = tiktoken_encoding(encoding)
+        self.encoding = encoding
 
-def tokens_reset() -> None:
+    def count(self, text: str) -> int:
+        encoding = self.encoding
+        if encoding is None:
+            return (len(text) + 3) // 4
+        if isinstance(encoding, TiktokenEncoding):
+            # (Special tokens in the text are just text)
+            return len(encoding.encode_ordinary(text))
+        if isinstance(encoding, TokenizersTokenizer):
+            return len(encoding.encode(text, add_special_tokens=False).ids)
+        return encoding(text)
+
+
+@functools.lru_cache(maxsize=None)
+def default_tokenizer() -> Tokenizer:
     """
-    Reset the token usage counter
+    The tokenizer used when none is specified: a (fast) heuristic. (A real
+    tokenizer, like tiktoken's, is opt-in, since loading one may download its
+    vocabulary.)
     """
-    global _token_counter  # noqa: PLW0603
-    _token_counter = ThreadSafeTokenCounter()
+    return Tokenizer()
 
 
-def token_usage() -> list[TokenUsage] | None:
+def tiktoken_encoding(name: str) -> TiktokenEncoding:
     """
-    Report on token usage in the current session
+    Load a tiktoken encoding (which, the first time, downloads its vocabulary,
+    unless it's cached, e.g., in the `TIKTOKEN_CACHE_DIR` directory).
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        raise ImportError(
+            "Counting tokens with a tiktoken encoding requires the `tiktoken` "
+            "package. Install it with `pip install tiktoken`."
+        )
+    return tiktoken.get_encoding(name)
 
-    Call this function to find out the cumulative number of tokens that you
-    have sent and received in the current session.
 
-    Returns
-    -------
-    list[TokenUsage] | None
-        A list of dictionaries with the following keys: "name", "input", and "output".
-        If no tokens have been logged, then None is returned.
+def content_tokens(content: Content, tokenizer: Tokenizer) -> int:
+    """
+    The (estimated) number of tokens in a content, which is cached on the
+    content.
+    """
+    counts: Optional[dict[Tokenizer, int]] = getattr(content, "_token_counts", None)
+    if counts is None:
+        counts = {}
+        # (Not a dataclass field, so it doesn't affect equality)
+        object.__setattr__(content, "_token_counts", counts)
+    if tokenizer not in counts:
+        counts[tokenizer] = _content_tokens(content, tokenizer)
+    return counts[tokenizer]
+
+
+def _content_tokens(content: Content, tokenizer: Tokenizer) -> int:
+    if isinstance(content, ContentText):
+        return tokenizer.count(content.text)
+    if isinstance(content, ContentImageInline):
+        size = None
+        if content.data:
+            size = image_size(image_header(content.data))
+        return image_tokens(*size) if size else IMAGE_MAX_TOKENS
+    if isinstance(content, ContentImageRemote):
+        # The image's size is unknown (without downloading it)
+        return IMAGE_MAX_TOKENS
+    if isinstance(content, ContentToolRequest):
+        arguments = json.dumps(content.arguments, default=str)
+        return tokenizer.count(content.name) + tokenizer.count(arguments)
+    if isinstance(content, ContentToolResult):
+        return tokenizer.count(content.get_final_value())
+    return tokenizer.count(str(content))
+
+
+# Images are scaled down to fit within these limits (before being tokenized),
+# and then cost about a token per 750 pixels (at least, for Anthropic; OpenAI's
+# costs are lower for the same image)
+IMAGE_MAX_EDGE = 1568
+IMAGE_MAX_PIXELS = 1_150_000
+IMAGE_PIXELS_PER_TOKEN = 750
+IMAGE_MAX_TOKENS = math.ceil(IMAGE_MAX_PIXELS / IMAGE_PIXELS_PER_TOKEN)
+
+
+# The size of an image is read from (at most) this many of its first bytes
+IMAGE_HEADER_BYTES = 48 * 1024
+
+
+def image_header(data: str) -> bytes:
+    """
+    Decode the start of a base64-encoded image (i.e., its header), rather than
+    all of it. Returns no bytes if the data isn't valid base64.
+    """
+    # (4 base64 characters encode 3 bytes)
+    prefix = data[: IMAGE_HEADER_BYTES // 3 * 4]
+    try:
+        return base64.b64decode(prefix)
+    except binascii.Error:
+        return b""
+
+
+def image_tokens(width: int, height: int) -> int:
+    """
+    The (estimated) number of tokens in an image of the given size.
+    """
+    if width <= 0 or height <= 0:
+        return 0
+    pixels = width * height
+    scale = min(1.0, IMAGE_MAX_EDGE / max(width, height))
+    scale = min(scale, math.sqrt(IMAGE_MAX_PIXELS / pixels))
+    return max(1, math.ceil(pixels * scale**2 / IMAGE_PIXELS_PER_TOKEN))
+
+
+def turn_tokens(turn: Turn, tokenizer: Optional[Tokenizer] = None) -> int:
+    """
+    The (estimated) number of tokens in a turn, which is cached on the turn.
+
+    For assistant turns, this is the number of output tokens reported by the
+    provider (when known).
+    """
+    tokenizer = tokenizer or default_tokenizer()
+    counts = turn._token_counts
+    if tokenizer not in counts:
+        if turn.role == "assistant" and turn.tokens:
+            counts[tokenizer] = turn.tokens[1]
+        else:
+            counts[tokenizer] = TURN_OVERHEAD + sum(
+                content_tokens(x, tokenizer) for x in turn.contents
+            )
+    return counts[tokenizer]
+
+
+def estimate_tokens(turns: list[Turn], tokenizer: Optional[Tokenizer] = None) -> int:
+    """
+    The (estimated) number of input tokens needed for the given turns.
     """
-    return _token_counter.get_usage()
+    return sum(turn_tokens(x, tokenizer) for x in turns)
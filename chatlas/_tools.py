@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import copy
 import inspect
 import warnings
-from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+import weakref
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, TypeVar, Union
 
 from pydantic import BaseModel, Field, create_model
 
@@ -13,6 +15,8 @@ __all__ = ("Tool",)
 if TYPE_CHECKING:
     from openai.types.chat import ChatCompletionToolParam
 
+T = TypeVar("T")
+
 
 class Tool:
     """
@@ -31,6 +35,10 @@ class Tool:
         The primary reason why you might want to provide a model in
         Note that the name and docstring of the model takes precedence over the
         name and docstring of the function.
+    max_concurrency
+        The maximum number of calls to this tool that may run at the same time
+        when the model requests several of them in one turn. If `None` (the
+        default), there is no tool-specific limit.
     """
 
     func: Callable[..., Any] | Callable[..., Awaitable[Any]]
@@ -40,11 +48,18 @@ class Tool:
         func: Callable[..., Any] | Callable[..., Awaitable[Any]],
         *,
         model: Optional[type[BaseModel]] = None,
+        max_concurrency: Optional[int] = None,
     ):
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("`max_concurrency` must be a positive integer or None.")
+
         self.func = func
+        self.max_concurrency = max_concurrency
         self._is_async = _utils.is_async_callable(func)
         self.schema = func_to_schema(func, model)
         self.name = self.schema["function"]["name"]
+        # Translations of the schema (e.g., for a particular provider)
+        self._schemas: dict[str, Any] = {}
 
 
 def func_to_schema(
@@ -101,34 +116,136 @@ def func_to_basemodel(func: Callable) -> type[BaseModel]:
     return create_model(func.__name__, **fields)
 
 
+# Schemas derived from (data) models, e.g., their parameter schema and its
+# translations for particular providers
+_model_schemas: weakref.WeakKeyDictionary[type[BaseModel], dict[str, Any]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def cached_schema(
+    owner: Union[Tool, type[BaseModel]], kind: str, build: Callable[[], T]
+) -> T:
+    """
+    Get a schema derived from a tool or (data) model, which is built (by
+    `build()`) the first time a schema of that `kind` is requested.
+
+    Since the result is reused by every request, it must not be modified.
+    """
+    if isinstance(owner, Tool):
+        schemas = owner._schemas
+    else:
+        schemas = _model_schemas.get(owner)
+        if schemas is None:
+            schemas = _model_schemas.setdefault(owner, {})
+    if kind not in schemas:
+        schemas[kind] = build()
+    return schemas[kind]
+
+
 def basemodel_to_param_schema(model: type[BaseModel]) -> dict[str, object]:
-    try:
-        import openai
-    except ImportError:
-        raise ImportError(
-            "The openai package is required for this functionality. "
-            "Please install it with `pip install openai`."
-        )
+    # Callers are free to modify the result, so hand out a copy
+    return copy.deepcopy(model_param_schema(model))
 
-    # Lean on openai's ability to translate BaseModel.model_json_schema()
-    # to a valid tool schema (this wouldn't be impossible to do ourselves,
-    # but it's fair amount of logic to substitute `$refs`, etc.)
-    tool = openai.pydantic_function_tool(model)
 
-    fn = tool["function"]
-    if "parameters" not in fn:
-        raise ValueError("Expected `parameters` in function definition.")
+def model_param_schema(model: type[BaseModel]) -> dict[str, object]:
+    """
+    The (cached, so unmodifiable) parameter schema of a model.
+    """
+    return cached_schema(model, "params", lambda: _basemodel_to_param_schema(model))
+
 
-    params = fn["parameters"]
+def _basemodel_to_param_schema(model: type[BaseModel]) -> dict[str, object]:
+    params = strict_json_schema(model.model_json_schema())
 
-    # For some reason, openai (or pydantic?) wants to include a title
-    # at the model and field level. I don't think we actually need or want this.
+    # Pydantic includes a title at the model and field level. I don't think we
+    # actually need or want this.
     if "title" in params:
         del params["title"]
 
-    if "properties" in params and isinstance(params["properties"], dict):
-        for prop in params["properties"].values():
-            if "title" in prop:
+    properties = params.get("properties")
+    if isinstance(properties, dict):
+        for prop in properties.values():
+            if isinstance(prop, dict) and "title" in prop:
                 del prop["title"]
 
     return params
+
+
+def strict_json_schema(schema: dict[str, Any]) -> dict[str, Any]:
+    """
+    Make a JSON schema (of a Pydantic model) conform to the "strict" subset
+    that providers accept for tool parameters and structured outputs. That is,
+    objects don't allow additional properties, all properties are required,
+    and `$ref`s with sibling keywords (e.g., a description) are inlined.
+
+    This follows `openai.pydantic_function_tool()`, so that the openai package
+    isn't needed to define tools (or extract data) with other providers.
+
+    Note that the schema is modified in place.
+    """
+    return _strict_json_schema(schema, root=schema)
+
+
+def _strict_json_schema(schema: object, root: dict[str, Any]) -> dict[str, Any]:
+    if not isinstance(schema, dict):
+        raise TypeError(f"Expected a JSON schema (dictionary), got {schema!r}")
+
+    for key in ("$defs", "definitions"):
+        defs = schema.get(key)
+        if isinstance(defs, dict):
+            for def_schema in defs.values():
+                _strict_json_schema(def_schema, root)
+
+    if schema.get("type") == "object" and "additionalProperties" not in schema:
+        schema["additionalProperties"] = False
+
+    properties = schema.get("properties")
+    if isinstance(properties, dict):
+        schema["required"] = list(properties)
+        schema["properties"] = {
+            key: _strict_json_schema(prop, root) for key, prop in properties.items()
+        }
+
+    items = schema.get("items")
+    if isinstance(items, dict):
+        schema["items"] = _strict_json_schema(items, root)
+
+    any_of = schema.get("anyOf")
+    if isinstance(any_of, list):
+        schema["anyOf"] = [_strict_json_schema(x, root) for x in any_of]
+
+    all_of = schema.get("allOf")
+    if isinstance(all_of, list):
+        if len(all_of) == 1:
+            schema.update(_strict_json_schema(all_of[0], root))
+            schema.pop("allOf")
+        else:
+            schema["allOf"] = [_strict_json_schema(x, root) for x in all_of]
+
+    # A `None` default is implied by the (nullable) type
+    if "default" in schema and schema["default"] is None:
+        schema.pop("default")
+
+    # A $ref can't have sibling keywords, so inline the schema it refers to
+    # (with the siblings taking precedence)
+    ref = schema.get("$ref")
+    if ref and len(schema) > 1:
+        resolved = resolve_json_schema_ref(root, ref)
+        schema.update({**resolved, **schema})
+        schema.pop("$ref")
+        # The inlined schema may need to be made strict too
+        return _strict_json_schema(schema, root)
+
+    return schema
+
+
+def resolve_json_schema_ref(root: dict[str, Any], ref: str) -> dict[str, Any]:
+    if not ref.startswith("#/"):
+        raise ValueError(f"Unexpected $ref format {ref!r} (should start with '#/').")
+    resolved: Any = root
+    for key in ref[2:].split("/"):
+        resolved = resolved[key]
+        if not isinstance(resolved, dict):
+            raise ValueError(f"Expected `$ref: {ref}` to resolve to a dictionary.")
+    return resolved
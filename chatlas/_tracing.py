@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+from contextlib import contextmanager, nullcontext
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ContextManager,
+    Iterator,
+    Mapping,
+    Optional,
+    Protocol,
+    TypeVar,
+)
+
+if TYPE_CHECKING:
+    from ._provider import Provider
+
+__all__ = ("set_tracer",)
+
+T = TypeVar("T")
+
+
+class Span(Protocol):
+    def set_attribute(self, key: str, value: Any) -> Any: ...
+
+    def end(self) -> Any: ...
+
+
+class Tracer(Protocol):
+    def start_span(
+        self,
+        name: str,
+        context: Any = None,
+        attributes: Optional[Mapping[str, Any]] = None,
+    ) -> Span: ...
+
+    def start_as_current_span(
+        self,
+        name: str,
+        context: Any = None,
+        attributes: Optional[Mapping[str, Any]] = None,
+    ) -> ContextManager[Any]: ...
+
+
+# The tracer that spans are started with (if any)
+_tracer: Optional[Tracer] = None
+
+# The (chatlas) span that spans started in this context are children of. It's
+# only set for blocks that don't yield, so it never leaks into the caller
+_parent: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "chatlas_parent_span", default=None
+)
+
+# (Reused, so a step that isn't traced costs next to nothing)
+NO_SPAN: ContextManager[None] = nullcontext()
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    """
+    Trace the steps of chats.
+
+    Once a tracer is set, chats start a span for each request (and its
+    response), the building of the request, the call to the provider, the
+    consumption of a streamed response, and each tool call. This shows where
+    the time goes, e.g., in the rounds of a tool calling loop.
+
+    Parameters
+    ----------
+    tracer
+        An OpenTelemetry tracer (e.g., `opentelemetry.trace.get_tracer("chatlas")`),
+        or any object with compatible `.start_span()` and
+        `.start_as_current_span()` methods. If `None` (the default), nothing is
+        traced.
+
+    Examples
+    --------
+    ```python
+    from chatlas import ChatOpenAI, set_tracer
+    from opentelemetry import trace
+
+    set_tracer(trace.get_tracer("chatlas"))
+    chat = ChatOpenAI()
+    chat.chat("What is the capital of France?")
+    ```
+
+    Note
+    ----
+    Spans are named `chatlas.submit`, `chatlas.request.build`,
+    `chatlas.request`, `chatlas.stream`, and `chatlas.tool`, and have (OpenTelemetry
+    GenAI) attributes for the provider and model (`gen_ai.system` and
+    `gen_ai.request.model`), the tokens of a response
+    (`gen_ai.usage.input_tokens` and `gen_ai.usage.output_tokens`), the tool
+    called (`gen_ai.tool.name` and `gen_ai.tool.call.id`), and any error
+    (`error.type`).
+
+    A `chatlas.submit` span is a child of the span that's current when the
+    request is made, but the spans that stay open while a response is
+    streamed (`chatlas.submit` and `chatlas.stream`) are never made the
+    current span, so a stream may be consumed anywhere (e.g., across tasks),
+    without changing the caller's current span. Their children are given
+    their parent explicitly (as an OpenTelemetry context, if `opentelemetry` is
+    installed, otherwise as the parent span itself).
+    """
+    global _tracer  # noqa: PLW0603
+    _tracer = tracer
+
+
+def span(
+    name: str,
+    attributes: Optional[Mapping[str, Any]] = None,
+    *,
+    provider: Optional[Provider] = None,
+) -> ContextManager[Optional[Span]]:
+    """
+    Start a span (as the current span) for a step that doesn't yield, if a
+    tracer is set. The span is a child of the chatlas span (if any) that the
+    step is part of. If a `provider` is given, the span has its model
+    attributes.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NO_SPAN
+    return traced(tracer, name, span_attributes(attributes, provider))
+
+
+@contextmanager
+def traced(
+    tracer: Tracer, name: str, attributes: Optional[Mapping[str, Any]]
+) -> Iterator[Span]:
+    context = parent_context(_parent.get())
+    with tracer.start_as_current_span(
+        name, context=context, attributes=attributes
+    ) as s:
+        token = _parent.set(s)
+        try:
+            yield s
+        except Exception as e:
+            s.set_attribute("error.type", type(e).__qualname__)
+            raise
+        finally:
+            _parent.reset(token)
+
+
+def open_span(
+    name: str,
+    attributes: Optional[Mapping[str, Any]] = None,
+    *,
+    provider: Optional[Provider] = None,
+    parent: Optional[Span] = None,
+) -> ContextManager[Optional[Span]]:
+    """
+    Start a span for a step that may yield (e.g., the consumption of a stream),
+    if a tracer is set. Unlike `span()`, the span isn't made the current span,
+    so it may be ended in another context than it was started in. It's a
+    child of `parent` (or of the chatlas span, or the current span, if any).
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NO_SPAN
+    return opened(tracer, name, span_attributes(attributes, provider), parent)
+
+
+@contextmanager
+def opened(
+    tracer: Tracer,
+    name: str,
+    attributes: Optional[Mapping[str, Any]],
+    parent: Optional[Span],
+) -> Iterator[Span]:
+    context = parent_context(parent if parent is not None else _parent.get())
+    s = tracer.start_span(name, context=context, attributes=attributes)
+    try:
+        yield s
+    except Exception as e:
+        s.set_attribute("error.type", type(e).__qualname__)
+        raise
+    finally:
+        s.end()
+
+
+def child_spans(parent: Optional[Span]) -> ContextManager[Any]:
+    """
+    Make the spans started in a block (that doesn't yield) children of
+    `parent`.
+    """
+    if parent is None:
+        return NO_SPAN
+    return parented(parent)
+
+
+@contextmanager
+def parented(parent: Span) -> Iterator[None]:
+    token = _parent.set(parent)
+    try:
+        yield
+    finally:
+        _parent.reset(token)
+
+
+def parent_context(parent: Optional[Span]) -> Any:
+    """
+    The context to start a child of `parent` in (`None` for the current one).
+    """
+    if parent is None:
+        return None
+    set_span_in_context = otel_set_span_in_context()
+    if set_span_in_context is None:
+        return parent
+    return set_span_in_context(parent)
+
+
+@functools.lru_cache(maxsize=None)
+def otel_set_span_in_context() -> Optional[Callable[[Any], Any]]:
+    try:
+        from opentelemetry.trace import set_span_in_context
+    except ImportError:
+        return None
+    return set_span_in_context
+
+
+def span_attributes(
+    attributes: Optional[Mapping[str, Any]], provider: Optional[Provider]
+) -> Optional[dict[str, Any]]:
+    if provider is not None:
+        attributes = {**model_attributes(provider), **(attributes or {})}
+    # (OpenTelemetry doesn't allow `None` attributes)
+    if attributes is None:
+        return None
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+def set_attributes(span: Optional[Span], attributes: Mapping[str, Any]) -> None:
+    if span is None:
+        return
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
+
+
+def model_attributes(provider: Provider) -> dict[str, Any]:
+    name = type(provider).__name__.replace("Provider", "").lower()
+    return {
+        "gen_ai.system": name,
+        "gen_ai.request.model": str(getattr(provider, "_model", "")),
+    }
+
+
+def usage_attributes(
+    tokens: Optional[tuple[int, int]], cached: bool = False
+) -> dict[str, Any]:
+    return {
+        "gen_ai.usage.input_tokens": tokens[0] if tokens else None,
+        "gen_ai.usage.output_tokens": tokens[1] if tokens else None,
+        "chatlas.cached": cached,
+    }
+
+
+def propagate(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Run a function (e.g., in another thread) in a copy of the current context,
+    so that its spans are children of the current span.
+    """
+    if _tracer is None:
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Optional
+
+from ._content import ContentToolResult
+from ._tokens import default_tokenizer, turn_tokens
+
+if TYPE_CHECKING:
+    from ._tokens import Tokenizer
+    from ._turn import Turn
+
+
+class ContextTrimmer:
+    """
+    Trim the turns of a request to fit within a token budget, by leaving out
+    the oldest turns.
+
+    The system prompt is always kept, and a request only ever starts with a
+    user turn that isn't a tool result (so tool requests are never separated
+    from their results).
+
+    The token counts of the turns are cached (as prefix sums), so trimming a
+    growing conversation only needs to count the new turns.
+    """
+
+    def __init__(self, total: int, reserve: int = 0):
+        if total <= reserve:
+            raise ValueError(
+                f"Invalid token limits: total={total}, reserve={reserve}. "
+                "The total must be greater than the reserve."
+            )
+        self.total = total
+        self.reserve = reserve
+        # The turns counted so far, the number of tokens in turns[:i], and the
+        # indices of the turns that a request can start with
+        self._turns: list[Turn] = []
+        self._cumsum: list[int] = [0]
+        self._starts: list[int] = []
+        self._tokenizer: Optional[Tokenizer] = None
+
+    def trim(
+        self, turns: list[Turn], tokenizer: Optional[Tokenizer] = None
+    ) -> list[Turn]:
+        tokenizer = tokenizer or default_tokenizer()
+        if tokenizer is not self._tokenizer:
+            self._tokenizer = tokenizer
+            self._turns.clear()
+        self._update(turns, tokenizer)
+
+        n = len(turns)
+        n_system = 1 if turns and turns[0].role == "system" else 0
+        budget = self.total - self.reserve - self._cumsum[n_system]
+        if budget <= 0:
+            raise ValueError(
+                "The system prompt alone exceeds the token limits "
+                f"(total={self.total}, reserve={self.reserve}). Consider "
+                "increasing the limits, or removing them with "
+                "`.set_token_limits(None)`."
+            )
+
+        # The first turn that can be kept (i.e., the later turns fit the budget)
+        first = bisect_left(self._cumsum, self._cumsum[n] - budget, lo=n_system)
+        if first <= n_system:
+            return turns
+
+        i = bisect_left(self._starts, first)
+        if i == len(self._starts):
+            raise ValueError(
+                "The latest turns exceed the token limits "
+                f"(total={self.total}, reserve={self.reserve}). Consider "
+                "increasing the limits, or removing them with "
+                "`.set_token_limits(None)`."
+            )
+        return [*turns[:n_system], *turns[self._starts[i] :]]
+
+    def _update(self, turns: list[Turn], tokenizer: Tokenizer) -> None:
+        # Reuse the counts of the turns that haven't changed (i.e., the common
+        # prefix, unless their contents have since been reset)
+        n = 0
+        n_max = min(len(turns), len(self._turns))
+        while (
+            n < n_max
+            and turns[n] is self._turns[n]
+            and tokenizer in turns[n]._token_counts
+        ):
+            n += 1
+
+        del self._turns[n:]
+        del self._cumsum[n + 1 :]
+        del self._starts[bisect_left(self._starts, n) :]
+
+        for i in range(n, len(turns)):
+            turn = turns[i]
+            self._turns.append(turn)
+            self._cumsum.append(self._cumsum[-1] + turn_tokens(turn, tokenizer))
+            if turn.role == "user" and not any(
+                isinstance(x, ContentToolResult) for x in turn.contents
+            ):
+                self._starts.append(i)
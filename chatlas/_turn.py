@@ -1,12 +1,26 @@
 from __future__ import annotations
 
-from typing import Any, Generic, Literal, Optional, Sequence, TypeVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generic,
+    Literal,
+    Optional,
+    Sequence,
+    TypeVar,
+)
 
 from ._content import Content, ContentText
+from ._tokens import turn_tokens
+
+if TYPE_CHECKING:
+    from ._tokens import Tokenizer
 
 __all__ = ("Turn",)
 
 CompletionT = TypeVar("CompletionT")
+T = TypeVar("T")
 
 
 class Turn(Generic[CompletionT]):
@@ -54,7 +68,9 @@ class Turn(Generic[CompletionT]):
     tokens
         A numeric vector of length 2 representing the number of input and output
         tokens (respectively) used in this turn. Currently only recorded for
-        assistant turns.
+        assistant turns, as a [](`~chatlas.types.Tokens`), which also has the
+        number of input tokens read from, and written to, the provider's prompt
+        cache (if any).
     finish_reason
         A string indicating the reason why the conversation ended. This is only
         relevant for assistant turns.
@@ -92,6 +108,41 @@ class Turn(Generic[CompletionT]):
         self.tokens = tokens
         self.finish_reason = finish_reason
         self.completion = completion
+        # Provider-specific (request) representations of this turn, keyed by
+        # the provider class that produced them
+        self._params_cache: dict[type, Any] = {}
+        # The (estimated) number of tokens in this turn, by tokenizer
+        self._token_counts: dict[Tokenizer, int] = {}
+
+    def _cached_params(self, key: type, convert: Callable[[Turn], T]) -> T:
+        """
+        Convert this turn into a provider's message param(s), reusing the
+        result from a previous request (with the same `key`) when possible.
+        """
+        if key not in self._params_cache:
+            self._params_cache[key] = convert(self)
+        return self._params_cache[key]
+
+    def _reset_params_cache(self) -> None:
+        self._params_cache.clear()
+        self._token_counts.clear()
+        for content in self.contents:
+            content.__dict__.pop("_token_counts", None)
+
+    @property
+    def estimated_tokens(self) -> int:
+        """
+        The (estimated) number of tokens in this turn.
+
+        This is estimated locally (i.e., without a request to the provider), at
+        roughly 4 characters per token. Images are estimated from their size.
+        For assistant turns, the number of output tokens reported by the
+        provider is used, when known.
+
+        The count is cached, so it's cheap to ask for repeatedly. To count with
+        a different tokenizer, see [](`~chatlas.Chat`)'s `.set_tokenizer()`.
+        """
+        return turn_tokens(self)
 
     def __str__(self) -> str:
         return self.text
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import math
+import threading
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Iterator, NamedTuple, Optional
+
+from ._typing_extensions import TypedDict
+
+if TYPE_CHECKING:
+    from ._provider import Provider
+
+__all__ = (
+    "LatencyHistogram",
+    "Tokens",
+    "TokenUsage",
+    "UsageLedger",
+    "track_usage",
+)
+
+# The upper bounds (in seconds) of the buckets of latency histograms
+LATENCY_BOUNDS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, math.inf)
+
+
+class Tokens(tuple):
+    """
+    The (input, output) token counts of a response.
+
+    The input tokens include those read from, and written to, the provider's
+    prompt cache (if any), which are also available as `.cache_read` and
+    `.cache_write`.
+    """
+
+    cache_read: int
+    cache_write: int
+
+    def __new__(
+        cls,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read: int = 0,
+        cache_write: int = 0,
+    ):
+        res = super().__new__(cls, (input_tokens, output_tokens))
+        res.cache_read = cache_read
+        res.cache_write = cache_write
+        return res
+
+    def __getnewargs__(self):  # type: ignore[override]
+        return (self[0], self[1], self.cache_read, self.cache_write)
+
+
+class UsageKey(NamedTuple):
+    """
+    What usage is accounted to: a provider (name), its base URL, and a model.
+    """
+
+    name: str
+    base_url: str
+    model: str
+
+
+class LatencyHistogram(TypedDict):
+    """
+    A histogram of the latency of requests (from sending the request to
+    receiving the last of the response), in seconds.
+    """
+
+    bounds: list[float]
+    """The (inclusive) upper bound of each bucket."""
+    counts: list[int]
+    """The number of requests in each bucket."""
+    total: float
+    """The total latency of the requests."""
+
+
+class TokenUsage(TypedDict):
+    """
+    Token usage for a given provider (name), base URL, and model.
+    """
+
+    name: str
+    base_url: str
+    model: str
+    requests: int
+    input: int
+    output: int
+    cache_read: int
+    cache_write: int
+    latency: LatencyHistogram
+
+
+# The counters of a key: the number of requests, tokens (input, output, cache
+# read, cache write), the total latency, and the latency histogram's counts
+REQUESTS, INPUT, OUTPUT, CACHE_READ, CACHE_WRITE, LATENCY = range(6)
+N_COUNTERS = LATENCY + 1 + len(LATENCY_BOUNDS)
+
+Shard = dict[UsageKey, list[float]]
+
+
+class UsageLedger:
+    """
+    Accumulates the usage (tokens, requests, and latency) of requests, by
+    provider, base URL, and model.
+
+    Each thread records usage in a shard of its own, so recording never waits
+    for (or contends with) other threads. Shards are merged when the usage is
+    read.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # The shards of live threads, and the merged shards of finished ones
+        self._shards: list[tuple[weakref.ref[threading.Thread], Shard]] = []
+        self._retired: Shard = {}
+
+    def record(
+        self,
+        key: UsageKey,
+        tokens: Optional[tuple[int, int]],
+        latency: Optional[float] = None,
+    ) -> None:
+        try:
+            shard: Shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        counters = shard.get(key)
+        if counters is None:
+            counters = shard[key] = [0] * N_COUNTERS
+        counters[REQUESTS] += 1
+        if tokens:
+            counters[INPUT] += tokens[0]
+            counters[OUTPUT] += tokens[1]
+            if isinstance(tokens, Tokens):
+                counters[CACHE_READ] += tokens.cache_read
+                counters[CACHE_WRITE] += tokens.cache_write
+        if latency is not None:
+            counters[LATENCY] += latency
+            counters[LATENCY + 1 + bisect_left(LATENCY_BOUNDS, latency)] += 1
+
+    def token_usage(self) -> list[TokenUsage] | None:
+        """
+        Report on the usage recorded so far.
+
+        Returns
+        -------
+        list[TokenUsage] | None
+            A list of dictionaries, one per provider (name), base URL, and
+            model. If no usage has been recorded, then None is returned.
+        """
+        merged = self._merge()
+        if not merged:
+            return None
+        return [usage_record(key, counters) for key, counters in merged.items()]
+
+    def reset(self) -> None:
+        """
+        Forget the usage recorded so far.
+        """
+        with self._lock:
+            self._local = threading.local()
+            self._shards = []
+            self._retired = {}
+
+    def _new_shard(self) -> Shard:
+        shard: Shard = {}
+        with self._lock:
+            self._local.shard = shard
+            self._shards.append((weakref.ref(threading.current_thread()), shard))
+        return shard
+
+    def _merge(self) -> Shard:
+        with self._lock:
+            live = []
+            for ref, shard in self._shards:
+                thread = ref()
+                if thread is not None and thread.is_alive():
+                    live.append((ref, shard))
+                else:
+                    # (A finished thread won't record any more usage)
+                    merge_shard(self._retired, shard)
+            self._shards = live
+            merged: Shard = {}
+            merge_shard(merged, self._retired)
+            for _, shard in live:
+                merge_shard(merged, shard)
+        return merged
+
+
+def merge_shard(into: Shard, shard: Shard) -> None:
+    # (Copied first, in case the shard's thread adds a key meanwhile)
+    for key, counters in shard.copy().items():
+        total = into.get(key)
+        if total is None:
+            into[key] = list(counters)
+        else:
+            for i, x in enumerate(counters):
+                total[i] += x
+
+
+def usage_record(key: UsageKey, counters: list[float]) -> TokenUsage:
+    return {
+        "name": key.name,
+        "base_url": key.base_url,
+        "model": key.model,
+        "requests": int(counters[REQUESTS]),
+        "input": int(counters[INPUT]),
+        "output": int(counters[OUTPUT]),
+        "cache_read": int(counters[CACHE_READ]),
+        "cache_write": int(counters[CACHE_WRITE]),
+        "latency": {
+            "bounds": list(LATENCY_BOUNDS),
+            "counts": [int(x) for x in counters[LATENCY + 1 :]],
+            "total": counters[LATENCY],
+        },
+    }
+
+
+# The usage of the session, and of the active `track_usage()` scopes
+session_usage = UsageLedger()
+_scopes: ContextVar[tuple[UsageLedger, ...]] = ContextVar(
+    "chatlas_usage_scopes", default=()
+)
+
+
+def record_usage(
+    provider: Provider,
+    tokens: Optional[tuple[int, int]],
+    latency: Optional[float] = None,
+    ledger: Optional[UsageLedger] = None,
+) -> None:
+    """
+    Record the usage of a request in the session's ledger, in those of the
+    active `track_usage()` scopes, and in `ledger` (e.g., a chat's).
+    """
+    key = UsageKey(*provider.usage_key())
+    session_usage.record(key, tokens, latency)
+    for scope in _scopes.get():
+        scope.record(key, tokens, latency)
+    if ledger is not None:
+        ledger.record(key, tokens, latency)
+
+
+@contextmanager
+def track_usage() -> Iterator[UsageLedger]:
+    """
+    Measure the usage (tokens, requests, and latency) of the requests made
+    within a context.
+
+    Returns
+    -------
+    UsageLedger
+        A ledger whose `.token_usage()` reports on the requests made within
+        the context (so far), including those of concurrent tasks and batches
+        started within it.
+
+    Examples
+    --------
+    ```python
+    from chatlas import ChatOpenAI, track_usage
+
+    chat = ChatOpenAI()
+    with track_usage() as usage:
+        chat.chat("What is the capital of France?")
+    print(usage.token_usage())
+    ```
+    """
+    ledger = UsageLedger()
+    token = _scopes.set((*_scopes.get(), ledger))
+    try:
+        yield ledger
+    finally:
+        _scopes.reset(token)
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import functools
+import importlib
 import inspect
 import os
 import re
+import sys
 import warnings
-from typing import Awaitable, Callable, TypeVar, cast
+from typing import Any, Awaitable, Callable, TypeVar, cast
 
 from ._typing_extensions import ParamSpec, TypeGuard
 
@@ -109,3 +111,27 @@ def html_escape(text: str, attr: bool = True) -> str:
     for key, value in table.items():
         text = text.replace(key, value)
     return text
+
+
+def lazy_getattr(package: str, imports: dict[str, str]) -> Callable[[str], Any]:
+    """
+    Create a module-level `__getattr__()` (PEP 562) for a package, which imports
+    `imports[name]` (a module, relative to the package) when `name` is first
+    accessed, and then gets `name` from it (or returns the module itself, if
+    it is named `name`).
+    """
+
+    def __getattr__(name: str) -> Any:
+        module_name = imports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module = importlib.import_module(module_name, package)
+        if module_name == f".{name}":
+            value = module
+        else:
+            value = getattr(module, name)
+        # Cache it, so that `__getattr__()` isn't called again
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
@@ -1,19 +1,30 @@
-from .._chat import ChatResponse, ChatResponseAsync, SubmitInputArgsT
-from .._content import (
-    Content,
-    ContentImage,
-    ContentImageInline,
-    ContentImageRemote,
-    ContentJson,
-    ContentText,
-    ContentToolRequest,
-    ContentToolResult,
-    ImageContentTypes,
-)
-from .._tokens import TokenUsage
-from .._utils import MISSING, MISSING_TYPE
+from typing import TYPE_CHECKING
+
+from .._utils import lazy_getattr
+
+if TYPE_CHECKING:
+    from .._batch import ChatBatchResponse, ChatBatchResult
+    from .._cache import CachedResponse
+    from .._chat import ChatResponse, ChatResponseAsync, SubmitInputArgsT
+    from .._content import (
+        Content,
+        ContentImage,
+        ContentImageInline,
+        ContentImageRemote,
+        ContentJson,
+        ContentText,
+        ContentToolRequest,
+        ContentToolResult,
+        ImageContentTypes,
+    )
+    from .._stats import ResponseStats, RoundStats
+    from .._usage import LatencyHistogram, Tokens, TokenUsage, UsageLedger
+    from .._utils import MISSING, MISSING_TYPE
 
 __all__ = (
+    "CachedResponse",
+    "ChatBatchResponse",
+    "ChatBatchResult",
     "Content",
     "ContentImage",
     "ContentImageInline",
@@ -25,8 +36,47 @@ __all__ = (
     "ChatResponse",
     "ChatResponseAsync",
     "ImageContentTypes",
+    "LatencyHistogram",
+    "ResponseStats",
+    "RoundStats",
     "SubmitInputArgsT",
+    "Tokens",
     "TokenUsage",
+    "UsageLedger",
     "MISSING_TYPE",
     "MISSING",
 )
+
+# Types are imported when first accessed (see `chatlas/__init__.py`)
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "ChatBatchResponse": ".._batch",
+        "ChatBatchResult": ".._batch",
+        "CachedResponse": ".._cache",
+        "ChatResponse": ".._chat",
+        "ChatResponseAsync": ".._chat",
+        "SubmitInputArgsT": ".._chat",
+        "Content": ".._content",
+        "ContentImage": ".._content",
+        "ContentImageInline": ".._content",
+        "ContentImageRemote": ".._content",
+        "ContentJson": ".._content",
+        "ContentText": ".._content",
+        "ContentToolRequest": ".._content",
+        "ContentToolResult": ".._content",
+        "ImageContentTypes": ".._content",
+        "ResponseStats": ".._stats",
+        "RoundStats": ".._stats",
+        "Tokens": ".._usage",
+        "TokenUsage": ".._usage",
+        "LatencyHistogram": ".._usage",
+        "UsageLedger": ".._usage",
+        "MISSING": ".._utils",
+        "MISSING_TYPE": ".._utils",
+    },
+)
+
+
+def __dir__() -> list[str]:
+    return [*globals(), *__all__]
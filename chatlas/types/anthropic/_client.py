@@ -3,10 +3,13 @@
 # ---------------------------------------------------------
 
 
-from typing import Mapping, Optional, TypedDict, Union
+from __future__ import annotations
 
-import anthropic
-import httpx
+from typing import TYPE_CHECKING, Mapping, Optional, TypedDict, Union
+
+if TYPE_CHECKING:
+    import anthropic
+    import httpx
 
 
 class ChatClientArgs(TypedDict, total=False):
@@ -2,10 +2,14 @@
 # Do not modify this file. It was generated by `scripts/generate_typed_dicts.py`.
 # ---------------------------------------------------------
 
-from typing import Mapping, Optional, TypedDict
 
-import anthropic
-import httpx
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Mapping, Optional, TypedDict
+
+if TYPE_CHECKING:
+    import anthropic
+    import httpx
 
 
 class ChatBedrockClientArgs(TypedDict, total=False):
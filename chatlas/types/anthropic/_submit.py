@@ -3,16 +3,19 @@
 # ---------------------------------------------------------
 
 
-from typing import Iterable, Literal, Mapping, Optional, TypedDict, Union
+from __future__ import annotations
 
-import anthropic
-import anthropic._types
-import anthropic.types.message_param
-import anthropic.types.text_block_param
-import anthropic.types.tool_choice_any_param
-import anthropic.types.tool_choice_auto_param
-import anthropic.types.tool_choice_tool_param
-import anthropic.types.tool_param
+from typing import TYPE_CHECKING, Iterable, Literal, Mapping, Optional, TypedDict, Union
+
+if TYPE_CHECKING:
+    import anthropic
+    import anthropic._types
+    import anthropic.types.message_param
+    import anthropic.types.text_block_param
+    import anthropic.types.tool_choice_any_param
+    import anthropic.types.tool_choice_auto_param
+    import anthropic.types.tool_choice_tool_param
+    import anthropic.types.tool_param
 
 
 class SubmitInputArgs(TypedDict, total=False):
@@ -3,14 +3,17 @@
 # ---------------------------------------------------------
 
 
-from typing import Any, Callable, Iterable, TypedDict, Union
+from __future__ import annotations
 
-import google.ai.generativelanguage_v1beta.types.content
-import google.ai.generativelanguage_v1beta.types.file
-import google.ai.generativelanguage_v1beta.types.generative_service
-import google.generativeai.types.content_types
-import google.generativeai.types.file_types
-import google.generativeai.types.generation_types
+from typing import TYPE_CHECKING, Any, Callable, Iterable, TypedDict, Union
+
+if TYPE_CHECKING:
+    import google.ai.generativelanguage_v1beta.types.content
+    import google.ai.generativelanguage_v1beta.types.file
+    import google.ai.generativelanguage_v1beta.types.generative_service
+    import google.generativeai.types.content_types
+    import google.generativeai.types.file_types
+    import google.generativeai.types.generation_types
 
 
 class ChatClientArgs(TypedDict, total=False):
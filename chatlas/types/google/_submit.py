@@ -3,15 +3,18 @@
 # ---------------------------------------------------------
 
 
-from typing import Any, Callable, Iterable, TypedDict, Union
+from __future__ import annotations
 
-import google.ai.generativelanguage_v1beta.types.content
-import google.ai.generativelanguage_v1beta.types.file
-import google.ai.generativelanguage_v1beta.types.generative_service
-import google.generativeai.types.content_types
-import google.generativeai.types.file_types
-import google.generativeai.types.generation_types
-import google.generativeai.types.helper_types
+from typing import TYPE_CHECKING, Any, Callable, Iterable, TypedDict, Union
+
+if TYPE_CHECKING:
+    import google.ai.generativelanguage_v1beta.types.content
+    import google.ai.generativelanguage_v1beta.types.file
+    import google.ai.generativelanguage_v1beta.types.generative_service
+    import google.generativeai.types.content_types
+    import google.generativeai.types.file_types
+    import google.generativeai.types.generation_types
+    import google.generativeai.types.helper_types
 
 
 class SubmitInputArgs(TypedDict, total=False):
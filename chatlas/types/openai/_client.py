@@ -3,10 +3,13 @@
 # ---------------------------------------------------------
 
 
-from typing import Mapping, Optional, TypedDict, Union
+from __future__ import annotations
 
-import httpx
-import openai
+from typing import TYPE_CHECKING, Mapping, Optional, TypedDict, Union
+
+if TYPE_CHECKING:
+    import httpx
+    import openai
 
 
 class ChatClientArgs(TypedDict, total=False):
@@ -2,10 +2,14 @@
 # Do not modify this file. It was generated by `scripts/generate_typed_dicts.py`.
 # ---------------------------------------------------------
 
-from typing import Mapping, Optional, TypedDict
 
-import httpx
-import openai
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Mapping, Optional, TypedDict
+
+if TYPE_CHECKING:
+    import httpx
+    import openai
 
 
 class ChatAzureClientArgs(TypedDict, total=False):
@@ -3,25 +3,28 @@
 # ---------------------------------------------------------
 
 
-from typing import Iterable, Literal, Mapping, Optional, TypedDict, Union
+from __future__ import annotations
 
-import openai
-import openai._types
-import openai.types.chat.chat_completion_assistant_message_param
-import openai.types.chat.chat_completion_audio_param
-import openai.types.chat.chat_completion_function_call_option_param
-import openai.types.chat.chat_completion_function_message_param
-import openai.types.chat.chat_completion_named_tool_choice_param
-import openai.types.chat.chat_completion_prediction_content_param
-import openai.types.chat.chat_completion_stream_options_param
-import openai.types.chat.chat_completion_system_message_param
-import openai.types.chat.chat_completion_tool_message_param
-import openai.types.chat.chat_completion_tool_param
-import openai.types.chat.chat_completion_user_message_param
-import openai.types.chat.completion_create_params
-import openai.types.shared_params.response_format_json_object
-import openai.types.shared_params.response_format_json_schema
-import openai.types.shared_params.response_format_text
+from typing import TYPE_CHECKING, Iterable, Literal, Mapping, Optional, TypedDict, Union
+
+if TYPE_CHECKING:
+    import openai
+    import openai._types
+    import openai.types.chat.chat_completion_assistant_message_param
+    import openai.types.chat.chat_completion_audio_param
+    import openai.types.chat.chat_completion_function_call_option_param
+    import openai.types.chat.chat_completion_function_message_param
+    import openai.types.chat.chat_completion_named_tool_choice_param
+    import openai.types.chat.chat_completion_prediction_content_param
+    import openai.types.chat.chat_completion_stream_options_param
+    import openai.types.chat.chat_completion_system_message_param
+    import openai.types.chat.chat_completion_tool_message_param
+    import openai.types.chat.chat_completion_tool_param
+    import openai.types.chat.chat_completion_user_message_param
+    import openai.types.chat.completion_create_params
+    import openai.types.shared_params.response_format_json_object
+    import openai.types.shared_params.response_format_json_schema
+    import openai.types.shared_params.response_format_text
 
 
 class SubmitInputArgs(TypedDict, total=False):
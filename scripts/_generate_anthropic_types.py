@@ -45,12 +45,12 @@ init_args = generate_typeddict_code(
     "ChatBedrockClientArgs",
     excluded_fields={"self"},
     localns={"URL": httpx.URL},
+    extra_imports={"import anthropic"},
 )
 
 write_code_to_file(
     init_args,
     provider_dir / "_client_bedrock.py",
-    setup_code="import anthropic",
 )
 
 
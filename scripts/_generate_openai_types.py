@@ -42,12 +42,12 @@ init_args = generate_typeddict_code(
         # TODO: for some reason the generated is off for this field
         "azure_ad_token_provider",
     },
+    extra_imports={"import openai"},
 )
 
 write_code_to_file(
     init_args,
     provider_dir / "_client_azure.py",
-    setup_code="import openai",
 )
 
 init = """
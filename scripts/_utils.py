@@ -159,12 +159,23 @@ def generate_typeddict_code(
     class_name: str,
     excluded_fields: Optional[set[str]] = None,
     localns: Optional[dict[str, Any]] = None,
+    extra_imports: Optional[set[str]] = None,
 ) -> str:
     typeddict, imports = create_typeddict_for_method(
         method, class_name, excluded_fields, localns
     )
-    imports_code = "from typing import TypedDict, Any\n"
-    imports_code += "\n".join(sorted(imports)) + "\n\n"
+    imports |= extra_imports or set()
+    typing_imports = {x for x in imports if x.startswith("from typing ")}
+    # Vendor SDKs are only needed by type checkers (the annotations are never
+    # evaluated), so they aren't imported at runtime
+    vendor_imports = imports - typing_imports
+    imports_code = "from __future__ import annotations\n\n"
+    imports_code += "from typing import TYPE_CHECKING, TypedDict, Any\n"
+    imports_code += "\n".join(sorted(typing_imports)) + "\n\n"
+    if vendor_imports:
+        imports_code += "if TYPE_CHECKING:\n"
+        imports_code += "".join(f"    {x}\n" for x in sorted(vendor_imports))
+        imports_code += "\n"
     return imports_code + typeddict
 
 
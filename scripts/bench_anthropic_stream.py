@@ -0,0 +1,100 @@
+"""
+Benchmark merging a (synthetic) stream of Anthropic events into a `Message`.
+
+Usage: python scripts/bench_anthropic_stream.py [n_tokens]
+"""
+
+import json
+import sys
+import time
+
+from anthropic.types import (
+    InputJSONDelta,
+    Message,
+    MessageDeltaUsage,
+    RawContentBlockDeltaEvent,
+    RawContentBlockStartEvent,
+    RawContentBlockStopEvent,
+    RawMessageDeltaEvent,
+    RawMessageStartEvent,
+    RawMessageStopEvent,
+    TextBlock,
+    TextDelta,
+    ToolUseBlock,
+    Usage,
+)
+from chatlas._anthropic import AnthropicProvider
+
+
+def events(n_tokens: int):
+    message = Message(
+        id="msg",
+        content=[],
+        model="claude",
+        role="assistant",
+        stop_reason=None,
+        stop_sequence=None,
+        type="message",
+        usage=Usage(input_tokens=10, output_tokens=1),
+    )
+    yield RawMessageStartEvent(message=message, type="message_start")
+
+    # Half of the tokens are text, the other half are tool input JSON
+    n_text = n_tokens // 2
+    yield RawContentBlockStartEvent(
+        index=0,
+        content_block=TextBlock(text="", type="text"),
+        type="content_block_start",
+    )
+    for i in range(n_text):
+        yield RawContentBlockDeltaEvent(
+            index=0,
+            delta=TextDelta(text=f"word{i} ", type="text_delta"),
+            type="content_block_delta",
+        )
+    yield RawContentBlockStopEvent(index=0, type="content_block_stop")
+
+    tool_input = json.dumps({"text": " ".join(f"word{i}" for i in range(n_text))})
+    n_chars = max(len(tool_input) // (n_tokens - n_text), 1)
+    yield RawContentBlockStartEvent(
+        index=1,
+        content_block=ToolUseBlock(id="id", input={}, name="tool", type="tool_use"),
+        type="content_block_start",
+    )
+    for i in range(0, len(tool_input), n_chars):
+        yield RawContentBlockDeltaEvent(
+            index=1,
+            delta=InputJSONDelta(
+                partial_json=tool_input[i : i + n_chars], type="input_json_delta"
+            ),
+            type="content_block_delta",
+        )
+    yield RawContentBlockStopEvent(index=1, type="content_block_stop")
+
+    yield RawMessageDeltaEvent(
+        delta={"stop_reason": "tool_use", "stop_sequence": None},
+        usage=MessageDeltaUsage(output_tokens=n_tokens),
+        type="message_delta",
+    )
+    yield RawMessageStopEvent(type="message_stop")
+
+
+def main(n_tokens: int = 50_000, repeats: int = 3):
+    provider = AnthropicProvider(model="claude", max_tokens=10, api_key="fake")
+
+    best = float("inf")
+    for _ in range(repeats):
+        stream = list(events(n_tokens))
+        start = time.perf_counter()
+        completion = None
+        for chunk in stream:
+            completion = provider.stream_merge_chunks(completion, chunk)
+        turn = provider.stream_turn(completion, has_data_model=False, stream=None)
+        best = min(best, time.perf_counter() - start)
+
+    assert len(turn.text) > n_tokens
+    print(f"Merged {len(stream)} events in {best * 1000:.1f} ms (best of {repeats})")
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:2]])
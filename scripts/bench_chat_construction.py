@@ -0,0 +1,36 @@
+"""
+Benchmark the cost of constructing a `ChatOpenAI()` (i.e., what a request
+handler or batch job pays when it creates a chat per conversation), both for
+the first chat and for subsequent ones with the same configuration.
+
+Usage: python scripts/bench_chat_construction.py [n_chats]
+"""
+
+import sys
+import time
+import warnings
+
+
+def main(n_chats: int = 200):
+    start = time.perf_counter()
+    from chatlas import ChatOpenAI
+
+    import_time = time.perf_counter() - start
+
+    warnings.simplefilter("ignore")
+    start = time.perf_counter()
+    ChatOpenAI(api_key="bench", model="gpt-4o")
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(n_chats):
+        ChatOpenAI(api_key="bench", model="gpt-4o")
+    per_chat = (time.perf_counter() - start) / n_chats
+
+    print(f"import chatlas: {import_time * 1000:.1f} ms")
+    print(f"first ChatOpenAI(): {first * 1000:.2f} ms")
+    print(f"subsequent ChatOpenAI(): {per_chat * 1e6:.1f} µs/chat ({n_chats} chats)")
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:2]])
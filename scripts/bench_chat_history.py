@@ -0,0 +1,104 @@
+"""
+Benchmark saving and loading a long chat history (i.e., what a stateless web
+tier pays to restore a conversation on every request), compared with pickling
+the turns (including their completion objects).
+
+Usage: python scripts/bench_chat_history.py [n_turns]
+"""
+
+import base64
+import pickle
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+
+def history(n_turns: int):
+    from anthropic.types import Message, TextBlock, Usage
+    from chatlas import Turn
+    from chatlas.types import ContentImageInline, ContentToolRequest, ContentToolResult
+
+    image = ContentImageInline("image/png", base64.b64encode(bytes(50_000)).decode())
+    turns = [Turn("system", "You are a helpful assistant.")]
+    for i in range(n_turns // 2):
+        text = f"Question {i}: " + "lorem ipsum dolor sit amet " * 10
+        contents = [text, image] if i % 100 == 0 else [text]
+        if i % 10 == 5:
+            contents = [
+                ContentToolResult(f"id{i}", {"temperature": 20, "city": "Paris"})
+            ]
+        turns.append(Turn("user", contents))
+
+        answer = f"Answer {i}: " + "consectetur adipiscing elit " * 20
+        completion = Message(
+            id=f"msg{i}",
+            content=[TextBlock(text=answer, type="text")],
+            model="claude",
+            role="assistant",
+            stop_reason="end_turn",
+            stop_sequence=None,
+            type="message",
+            usage=Usage(input_tokens=1000 + i, output_tokens=100),
+        )
+        contents = [answer]
+        if i % 10 == 4:
+            contents.append(
+                ContentToolRequest(f"id{i + 1}", "weather", {"city": "Paris"})
+            )
+        turns.append(
+            Turn("assistant", contents, tokens=(1000 + i, 100), completion=completion)
+        )
+    return turns
+
+
+def timed(label: str, fn, n: int = 5):
+    best = min(_time(fn) for _ in range(n))
+    print(f"{label}: {best * 1000:.1f} ms")
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(n_turns: int = 10_000):
+    from chatlas import ChatAnthropic
+
+    warnings.simplefilter("ignore")
+    chat = ChatAnthropic(api_key="bench")
+    chat._turns = history(n_turns)
+    print(f"{len(chat._turns)} turns")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = Path(tmp) / "chat.jsonl"
+        chat.save(jsonl)
+        print(f"JSONL size: {jsonl.stat().st_size / 1e6:.1f} MB")
+        timed("to_dict()", chat.to_dict)
+        timed("save() (JSONL)", lambda: chat.save(jsonl))
+        timed("load() (JSONL)", lambda: ChatAnthropic(api_key="bench").load(jsonl))
+
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            print("(msgpack isn't installed)")
+        else:
+            packed = Path(tmp) / "chat.msgpack"
+            chat.save(packed)
+            print(f"MessagePack size: {packed.stat().st_size / 1e6:.1f} MB")
+            timed("save() (MessagePack)", lambda: chat.save(packed))
+            timed(
+                "load() (MessagePack)",
+                lambda: ChatAnthropic(api_key="bench").load(packed),
+            )
+
+    pickled = pickle.dumps(chat._turns)
+    print(f"pickle size (with completions): {len(pickled) / 1e6:.1f} MB")
+    timed("pickle.dumps()", lambda: pickle.dumps(chat._turns))
+    timed("pickle.loads()", lambda: pickle.loads(pickled))
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:2]])
@@ -0,0 +1,53 @@
+"""
+Benchmark the per-call overhead of `Chat.chat(echo="none")` (i.e., everything
+but the request itself, which is answered by a fake provider).
+
+Usage: python scripts/bench_echo_none.py [n_calls]
+"""
+
+import sys
+import time
+
+from chatlas import Chat, Provider, Turn
+
+
+class FakeProvider(Provider):
+    def chat_perform(self, *, stream, turns, tools, data_model=None, kwargs=None):
+        return None
+
+    async def chat_perform_async(
+        self, *, stream, turns, tools, data_model=None, kwargs=None
+    ):
+        return None
+
+    def stream_text(self, chunk):
+        return None
+
+    def stream_merge_chunks(self, completion, chunk):
+        return completion
+
+    def stream_turn(self, completion, has_data_model, stream):
+        return Turn("assistant", "Hello")
+
+    async def stream_turn_async(self, completion, has_data_model, stream):
+        return Turn("assistant", "Hello")
+
+    def value_turn(self, completion, has_data_model):
+        return Turn("assistant", "Hello")
+
+
+def main(n_calls: int = 2_000, repeats: int = 3):
+    best = float("inf")
+    for _ in range(repeats):
+        chat = Chat(FakeProvider())
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            chat.chat("Hi", echo="none", stream=False)
+        best = min(best, time.perf_counter() - start)
+
+    per_call = best / n_calls * 1e6
+    print(f"{n_calls} calls in {best * 1000:.1f} ms: {per_call:.1f} µs/call")
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:2]])
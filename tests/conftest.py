@@ -1,3 +1,5 @@
+import json
+import re
 import tempfile
 from pathlib import Path
 from typing import Awaitable, Callable
@@ -208,3 +210,71 @@ def assert_images_remote_error(chat_fun: ChatFun):
         chat.chat("What's in this image?", image_remote)
 
     assert len(chat.turns()) == 0
+
+
+def fake_stream_events(*blocks, stop_reason="end_turn"):
+    """
+    Create a stream of Anthropic events for a message with the given content
+    blocks. A block is either a string (text) or a (id, name, input) tuple
+    (a tool request).
+    """
+    from anthropic.types import (
+        InputJSONDelta,
+        Message,
+        MessageDeltaUsage,
+        RawContentBlockDeltaEvent,
+        RawContentBlockStartEvent,
+        RawContentBlockStopEvent,
+        RawMessageDeltaEvent,
+        RawMessageStartEvent,
+        RawMessageStopEvent,
+        TextBlock,
+        TextDelta,
+        ToolUseBlock,
+        Usage,
+    )
+
+    message = Message(
+        id="msg",
+        content=[],
+        model="claude",
+        role="assistant",
+        stop_reason=None,
+        stop_sequence=None,
+        type="message",
+        usage=Usage(input_tokens=10, output_tokens=1),
+    )
+    yield RawMessageStartEvent(message=message, type="message_start")
+
+    for i, block in enumerate(blocks):
+        if isinstance(block, str):
+            start = TextBlock(text="", type="text")
+            deltas = [
+                TextDelta(text=x, type="text_delta")
+                for x in re.findall(r"\S+\s*", block)
+            ]
+        else:
+            id_, name, input_ = block
+            start = ToolUseBlock(id=id_, input={}, name=name, type="tool_use")
+            input_json = json.dumps(input_)
+            deltas = [
+                InputJSONDelta(
+                    partial_json=input_json[j : j + 3], type="input_json_delta"
+                )
+                for j in range(0, len(input_json), 3)
+            ]
+        yield RawContentBlockStartEvent(
+            index=i, content_block=start, type="content_block_start"
+        )
+        for delta in deltas:
+            yield RawContentBlockDeltaEvent(
+                index=i, delta=delta, type="content_block_delta"
+            )
+        yield RawContentBlockStopEvent(index=i, type="content_block_stop")
+
+    yield RawMessageDeltaEvent(
+        delta={"stop_reason": stop_reason, "stop_sequence": None},
+        usage=MessageDeltaUsage(output_tokens=20),
+        type="message_delta",
+    )
+    yield RawMessageStopEvent(type="message_stop")
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from chatlas import ChatAnthropic
+from pydantic import BaseModel
+
+from .conftest import fake_stream_events
+
+
+def echo_chat(delay: float = 0):
+    """
+    A chat whose responses echo the (last) prompt, and which fails on "fail".
+    """
+    chat = ChatAnthropic(api_key="fake", system_prompt="Echo")
+    state = {"active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    def response(turns, stream):
+        prompt = turns[-1].text
+        if prompt == "fail":
+            raise RuntimeError("Request failed")
+        events = fake_stream_events(f"You said: {prompt}")
+        if stream:
+            return events
+        message = None
+        for event in events:
+            message = chat.provider.stream_merge_chunks(message, event)
+        return message.result()  # type: ignore
+
+    def chat_perform(*, stream, turns, **kwargs):
+        with lock:
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        time.sleep(delay)
+        with lock:
+            state["active"] -= 1
+        return response(turns, stream)
+
+    async def chat_perform_async(*, stream, turns, **kwargs):
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        await asyncio.sleep(delay)
+        state["active"] -= 1
+
+        if not stream:
+            return response(turns, stream)
+
+        async def events():
+            for event in response(turns, stream):
+                yield event
+
+        return events()
+
+    chat.provider.chat_perform = chat_perform  # type: ignore
+    chat.provider.chat_perform_async = chat_perform_async  # type: ignore
+    return chat, state
+
+
+def check_batch(chat, res, progress):
+    assert len(res) == 4
+    assert res.contents() == [
+        "You said: a",
+        "You said: b",
+        None,
+        "You said: d",
+    ]
+    assert [x.index for x in res] == [0, 1, 2, 3]
+
+    # Errors are captured per prompt
+    errors = res.errors()
+    assert len(errors) == 1
+    assert errors[0].index == 2
+    assert str(errors[0].error) == "Request failed"
+
+    # Each prompt runs against its own copy of the chat
+    assert len(chat.turns()) == 0
+    assert [t.role for t in res[0].chat.turns(include_system_prompt=True)] == [
+        "system",
+        "user",
+        "assistant",
+    ]
+    assert res[0].tokens == (10, 20)
+    assert res[2].tokens == (0, 0)
+    assert res.tokens() == (30, 60)
+
+    assert sorted(progress) == [(1, 4), (2, 4), (3, 4), (4, 4)]
+
+
+def test_chat_batch():
+    chat, state = echo_chat(delay=0.05)
+    progress = []
+    res = chat.chat_batch(
+        ["a", "b", "fail", "d"],
+        max_concurrency=2,
+        on_progress=lambda done, total: progress.append((done, total)),
+    )
+    check_batch(chat, res, progress)
+    assert state["max_active"] == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_async():
+    chat, state = echo_chat(delay=0.05)
+    progress = []
+    res = await chat.chat_batch_async(
+        ["a", "b", "fail", "d"],
+        max_concurrency=3,
+        stream=True,
+        on_progress=lambda done, total: progress.append((done, total)),
+    )
+    check_batch(chat, res, progress)
+    assert state["max_active"] == 3
+
+
+class Person(BaseModel):
+    name: str
+    age: int
+
+
+def extraction_chat():
+    chat = ChatAnthropic(api_key="fake")
+
+    def create(*, messages, **kwargs):
+        prompt = messages[-1]["content"][0]["text"]
+        if prompt == "fail":
+            raise RuntimeError("Request failed")
+        name, age = prompt.split(", ")
+        data = {"data": {"name": name, "age": int(age)}}
+        events = fake_stream_events(("id", "_structured_tool_call", data))
+        message = None
+        for event in events:
+            message = chat.provider.stream_merge_chunks(message, event)
+        return message.result()  # type: ignore
+
+    async def create_async(**kwargs):
+        return create(**kwargs)
+
+    # (Not the shared SDK clients, which other chats would see)
+    chat.provider._clients = SimpleNamespace(  # type: ignore
+        key="extraction-test",
+        base_url="https://fake",
+        client=SimpleNamespace(messages=SimpleNamespace(create=create)),
+        async_client=SimpleNamespace(messages=SimpleNamespace(create=create_async)),
+    )
+    return chat
+
+
+def check_extractions(chat, res):
+    assert res.data() == [
+        {"name": "Alice", "age": 30},
+        None,
+        {"name": "Bob", "age": 40},
+    ]
+    assert [x.ok for x in res] == [True, False, True]
+    assert len(chat.turns()) == 0
+
+
+def test_extract_data_many():
+    chat = extraction_chat()
+    prompts = ["Alice, 30", "fail", "Bob, 40"]
+    res = chat.extract_data_many(prompts, data_model=Person, max_concurrency=1)
+    check_extractions(chat, res)
+
+
+@pytest.mark.asyncio
+async def test_extract_data_many_async():
+    chat = extraction_chat()
+    prompts = ["Alice, 30", "fail", "Bob, 40"]
+    res = await chat.extract_data_many_async(prompts, data_model=Person)
+    check_extractions(chat, res)
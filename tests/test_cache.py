@@ -0,0 +1,224 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from chatlas import ChatAnthropic, LRUCache, SQLiteCache, Turn
+from chatlas.types import CachedResponse
+
+from .conftest import fake_stream_events
+
+
+def response(text: str, chunks=None):
+    return CachedResponse(Turn("assistant", text), chunks)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", response("A"))
+    cache.set("b", response("B"))
+    assert cache.get("a") is not None
+    cache.set("c", response("C"))
+    assert cache.get("b") is None
+    assert cache.get("a").turn.text == "A"  # type: ignore
+    assert cache.get("c").turn.text == "C"  # type: ignore
+    assert len(cache) == 2
+
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def test_lru_cache_ttl(monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache = LRUCache(ttl=10)
+    cache.set("a", response("A"))
+    assert cache.get("a") is not None
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache(tmp_path, monkeypatch):
+    path = tmp_path / "cache.db"
+    cache = SQLiteCache(path, ttl=10)
+    cache.set("a", response("A", ["A"]))
+    cache.close()
+
+    # Responses persist across connections
+    cache = SQLiteCache(path, ttl=10)
+    res = cache.get("a")
+    assert res is not None
+    assert res.turn == Turn("assistant", "A")
+    assert res.chunks == ["A"]
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_max_size(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.db")
+    cache.set("a", response("A" * 1000))
+    size = cache._conn.execute("SELECT size FROM responses").fetchone()[0]
+    cache.max_size = int(size * 2.5)
+
+    cache.set("b", response("B" * 1000))
+    assert cache.get("a") is not None
+    cache.set("c", response("C" * 1000))
+    # "b" is the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_cache_key():
+    chat = ChatAnthropic(api_key="fake")
+    provider = chat.provider
+
+    def key(*turns: Turn, **kwargs):
+        return provider.cache_key(
+            turns=list(turns), tools={}, data_model=None, kwargs=kwargs
+        )
+
+    hi = Turn("user", "Hi")
+    assert key(hi) == key(Turn("user", "Hi"))
+    assert key(hi) != key(Turn("user", "Hello"))
+    assert key(hi) != key(hi, temperature=0.5)
+
+    def get_weather(city: str):
+        return "sunny"
+
+    chat.register_tool(get_weather)
+    tools_key = provider.cache_key(
+        turns=[hi], tools=chat.tools, data_model=None, kwargs=None
+    )
+    assert tools_key != key(hi)
+
+
+def test_chat_cache_replays_responses():
+    cache = LRUCache()
+    calls = []
+
+    def chat_perform(**kwargs):
+        calls.append(kwargs)
+        return fake_stream_events("The weather is sunny")
+
+    def new_chat():
+        chat = ChatAnthropic(api_key="fake")
+        chat.set_cache(cache)
+        chat.provider.chat_perform = chat_perform  # type: ignore
+        return chat
+
+    chat = new_chat()
+    chunks = list(chat.stream("What's the weather?"))
+    assert len(calls) == 1
+    assert len(chunks) > 1
+
+    # Streamed responses are replayed as streams...
+    chat2 = new_chat()
+    assert list(chat2.stream("What's the weather?")) == chunks
+    assert chat2.turns() == chat.turns()
+    assert chat2.turns()[1] is not chat.turns()[1]
+
+    # ...or all at once
+    chat3 = new_chat()
+    res = chat3.chat("What's the weather?", echo="none", stream=False)
+    assert str(res) == "".join(chunks)
+    assert len(calls) == 1
+
+    # A different conversation isn't cached
+    chat3.chat("And tomorrow?", echo="none")
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_cache_replays_responses_async():
+    cache = LRUCache()
+    calls = []
+
+    async def chat_perform_async(**kwargs):
+        calls.append(kwargs)
+
+        async def events():
+            for event in fake_stream_events("The weather is sunny"):
+                yield event
+
+        return events()
+
+    chats = [ChatAnthropic(api_key="fake") for _ in range(2)]
+    chunks = []
+    for chat in chats:
+        chat.set_cache(cache)
+        chat.provider.chat_perform_async = chat_perform_async  # type: ignore
+        res = await chat.stream_async("What's the weather?")
+        chunks.append([x async for x in res])
+
+    assert len(calls) == 1
+    assert chunks[0] == chunks[1]
+    assert chats[0].turns() == chats[1].turns()
+
+
+def test_google_cache_key_is_stable():
+    from chatlas import ChatGoogle
+
+    def key(**kwargs):
+        chat = ChatGoogle(api_key="fake", system_prompt="Be terse", **kwargs)
+        provider = chat.provider
+        return provider.cache_key(
+            turns=[Turn("user", "Hi")], tools={}, data_model=None, kwargs=None
+        )
+
+    # (Keys don't depend on the identity of the client, so they're the same
+    # across processes)
+    assert key() is not None
+    assert key() == key()
+    assert key() != key(model="gemini-1.5-pro")
+    assert key() != key(kwargs={"generation_config": {"temperature": 0}})
+
+
+def test_requests_with_arbitrary_objects_arent_cached():
+    from chatlas._cache import request_hash, request_key
+
+    class Foo:
+        pass
+
+    provider = ChatAnthropic(api_key="fake").provider
+    # (Their default repr() has their address, which differs between processes)
+    with pytest.raises(TypeError, match="Foo"):
+        request_hash(provider, {"metadata": Foo()})
+    assert request_key(provider, {"metadata": Foo()}) is None
+    assert request_key(provider, {"metadata": {"user_id": "x"}}) is not None
+
+
+def test_cached_request_is_built_once():
+    calls = []
+    chat = ChatAnthropic(api_key="fake")
+    chat.set_cache(LRUCache())
+    provider = chat.provider
+    build = provider._chat_perform_args
+
+    def chat_perform_args(*args):
+        calls.append(args)
+        return build(*args)
+
+    provider._chat_perform_args = chat_perform_args  # type: ignore
+    sent = []
+
+    def create(**kwargs):
+        sent.append(kwargs)
+        return fake_stream_events("Hello")
+
+    provider._clients = SimpleNamespace(  # type: ignore
+        key="fake",
+        base_url="https://fake",
+        client=SimpleNamespace(messages=SimpleNamespace(create=create)),
+    )
+
+    chat.chat("Hi", echo="none")
+    assert len(calls) == 1
+    assert sent[0]["stream"] is True
+
+    # The stream argument isn't part of the key
+    chat.set_turns([])
+    chat.chat("Hi", echo="none", stream=False)
+    assert len(sent) == 1
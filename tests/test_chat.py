@@ -162,3 +162,153 @@ def test_modify_system_prompt():
     # string -> NULL
     chat.system_prompt = None
     assert chat.system_prompt is None
+
+
+def test_markdown_blocks_end():
+    from chatlas._chat import markdown_blocks_end
+
+    assert markdown_blocks_end("Some text") == 0
+    assert markdown_blocks_end("Some text\n") == 0
+    assert markdown_blocks_end("# Title\n\nSome text") == len("# Title\n\n")
+    # Blank lines inside a code fence don't end a block
+    code = "```python\nx = 1\n\ny = 2\n"
+    assert markdown_blocks_end(code) == 0
+    assert markdown_blocks_end(code + "```\n\nNext") == len(code + "```\n\n")
+    # Nor do blank lines inside a list, or an indented code block
+    loose = "- item one\n\n  continued para\n\n- item two\n"
+    assert markdown_blocks_end(loose) == 0
+    assert markdown_blocks_end("1. a\n\n2. b\n") == 0
+    assert markdown_blocks_end("    x = 1\n\n    y = 2\n") == 0
+    assert markdown_blocks_end(loose + "\nSome text") == len(loose + "\n")
+    # Lines are broken like markdown-it does (i.e., not by U+2028 or U+0085)
+    para = "One\u2028line\x85still\r\none\r\r"
+    assert markdown_blocks_end(para + "Next") == len(para)
+
+
+def test_live_markdown_display_matches_full_render():
+    from io import StringIO
+
+    from chatlas._chat import LiveMarkdownDisplay
+    from rich.console import Console
+    from rich.markdown import Markdown
+
+    text = (
+        "# Title\n\nSome *text* here.\n\n```python\nx = 1\n\ny = 2\n```\n\n"
+        "- a\n- b\n\n> A quote\n\nSome more text.\n\n- c\n- d\n\n"
+        "- item one\n\n  continued para\n\n- item two\n\n1. a\n\n2. b\n\n"
+        "Code:\n\n    x = 1\n\n    y = 2\n\n> A quote\n>\n> continued\n\n"
+        "A line\u2028separator.\n\nThe end."
+    )
+
+    out = StringIO()
+    display = LiveMarkdownDisplay(
+        {
+            "rich_console": {"file": out, "width": 60},
+            "rich_markdown": {},
+            "css_styles": {},
+            "refresh_interval": 0,
+        }
+    )
+    with display:
+        for i in range(0, len(text), 3):
+            display.update(text[i : i + 3])
+
+    expected = StringIO()
+    Console(file=expected, width=60).print(Markdown(text))
+
+    def lines(x: str):
+        return [line.rstrip() for line in x.rstrip().splitlines()]
+
+    assert lines(out.getvalue()) == lines(expected.getvalue())
+
+
+def test_ipy_markdown_display_coalesces_updates(monkeypatch):
+    pytest.importorskip("IPython")
+    import IPython.display
+    from chatlas._chat import IPyMarkdownDisplay
+
+    updates = []
+    monkeypatch.setattr(
+        IPython.display,
+        "update_display",
+        lambda obj, display_id: updates.append(obj.data),
+    )
+    monkeypatch.setattr(IPyMarkdownDisplay, "_init_display", lambda self: "id")
+
+    chunks = ["Hello", " there", ", world", "!"]
+    opts = {"rich_markdown": {}, "rich_console": {}, "css_styles": {}}
+
+    # Within the interval, everything is flushed (once) on exit
+    with IPyMarkdownDisplay({**opts, "refresh_interval": 60}) as display:
+        for chunk in chunks:
+            display.update(chunk)
+    assert updates == ["Hello there, world!"]
+
+    # ...unless too much content is pending
+    updates.clear()
+    monkeypatch.setattr(IPyMarkdownDisplay, "max_pending_chars", 10)
+    with IPyMarkdownDisplay({**opts, "refresh_interval": 60}) as display:
+        for chunk in chunks:
+            display.update(chunk)
+    assert updates == ["Hello there", "Hello there, world!"]
+
+    # No interval means no coalescing
+    updates.clear()
+    with IPyMarkdownDisplay({**opts, "refresh_interval": 0}) as display:
+        for chunk in chunks:
+            display.update(chunk)
+    assert updates == [
+        "Hello",
+        "Hello there",
+        "Hello there, world",
+        "Hello there, world!",
+    ]
+
+
+def test_ipy_markdown_display_flushes_before_tools(monkeypatch):
+    pytest.importorskip("IPython")
+    import IPython.display
+    from chatlas._chat import IPyMarkdownDisplay
+
+    from .test_tracing import weather_chat
+
+    updates = []
+    monkeypatch.setattr(
+        IPython.display,
+        "update_display",
+        lambda obj, display_id: updates.append(obj.data),
+    )
+    monkeypatch.setattr(IPyMarkdownDisplay, "_init_display", lambda self: "id")
+
+    chat = weather_chat()
+    chat._echo_options["refresh_interval"] = 60
+    shown = []
+    tool = chat.tools["get_weather"]
+    get_weather = tool.func
+
+    def record_and_get_weather(city: str):
+        shown.append(list(updates))
+        return get_weather(city)
+
+    tool.func = record_and_get_weather
+    monkeypatch.setattr(
+        chat, "_display_context", lambda echo: IPyMarkdownDisplay(chat._echo_options)
+    )
+
+    chat.chat("Weather?", echo="all")
+    # The pending (coalesced) content was shown before the tools were called
+    assert shown and shown[0] and "get_weather" in shown[0][-1]
+    assert "It is sunny" in updates[-1]
+
+
+def test_echo_none_skips_display(monkeypatch):
+    from chatlas._chat import LiveMarkdownDisplay, NullDisplay
+
+    def fail(*args, **kwargs):
+        raise AssertionError("A display shouldn't be created")
+
+    monkeypatch.setattr(LiveMarkdownDisplay, "__init__", fail)
+
+    chat = ChatOpenAI(api_key="fake")
+    with chat._display_context("none") as display:
+        assert isinstance(display, NullDisplay)
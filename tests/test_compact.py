@@ -0,0 +1,175 @@
+import threading
+
+import pytest
+from chatlas import ChatAnthropic
+from chatlas._compact import SUMMARY_PROMPT, Compactor
+from chatlas._tokens import estimate_tokens
+
+from .conftest import fake_stream_events
+
+
+def fake_chat(reply, system_prompt=None):
+    """
+    A chat whose responses are `reply(turns)`, and which records the turns of
+    its requests.
+    """
+    chat = ChatAnthropic(api_key="fake", system_prompt=system_prompt)
+    sent = []
+
+    def chat_perform(*, stream, turns, **kwargs):
+        sent.append(turns)
+        events = fake_stream_events(reply(turns))
+        if stream:
+            return events
+        message = None
+        for event in events:
+            message = chat.provider.stream_merge_chunks(message, event)
+        return message.result()  # type: ignore
+
+    async def chat_perform_async(*, stream, turns, **kwargs):
+        res = chat_perform(stream=stream, turns=turns)
+        if not stream:
+            return res
+
+        async def events():
+            for event in res:
+                yield event
+
+        return events()
+
+    chat.provider.chat_perform = chat_perform  # type: ignore
+    chat.provider.chat_perform_async = chat_perform_async  # type: ignore
+    # One token per character
+    chat.set_tokenizer(len)
+    return chat, sent
+
+
+def test_chat_compacts_history():
+    summarizer, summarized = fake_chat(lambda turns: "They said a to d")
+    chat, sent = fake_chat(lambda turns: "ok", system_prompt="Be terse")
+    chat.set_compaction(150, keep=40, summarizer=summarizer, background=False)
+
+    # (Each exchange is 33 tokens: the reply's 20 output tokens, plus 3 of
+    # overhead for the prompt)
+    for prompt in ["a", "b", "c", "d", "e", "f"]:
+        chat.chat(prompt * 10, echo="none")
+
+    # Once the history outgrew the threshold, the oldest exchanges were
+    # summarized (as a transcript)
+    assert len(summarized) == 1
+    transcript = summarized[0][-1].text
+    assert "User: aaaaaaaaaa" in transcript
+    assert "User: dddddddddd" in transcript
+    assert "eeeeeeeeee" not in transcript
+
+    # ...and later requests send the summary in their place
+    system, head, *rest = sent[-1]
+    assert system.text == "Be terse"
+    assert head.role == "user"
+    assert head.text.startswith("Summary of the earlier conversation:")
+    assert head.text.endswith("They said a to deeeeeeeeee")
+    assert [x.text for x in rest] == ["ok", "ffffffffff"]
+
+    # The chat's history is left alone
+    assert len(chat.turns()) == 12
+    assert len(summarizer.turns()) == 0
+    assert chat.count_tokens() < estimate_tokens(chat._turns, chat._tokenizer)
+
+    # Changing the history drops the summary
+    chat.set_turns(chat.turns()[2:])
+    assert chat._request_turns() == chat.turns(include_system_prompt=True)
+
+
+def test_chat_compacts_history_in_background():
+    release = threading.Event()
+
+    def summarize(turns):
+        release.wait(timeout=5)
+        return "Summary"
+
+    summarizer, _ = fake_chat(summarize)
+    chat, sent = fake_chat(lambda turns: "ok")
+    chat.set_compaction(40, keep=10, summarizer=summarizer)
+
+    for prompt in ["a" * 10, "b" * 10, "c" * 10]:
+        chat.chat(prompt, echo="none")
+
+    # Requests don't wait for the summary (nor would the interpreter's exit)...
+    assert chat._compactor is not None
+    assert chat._compactor._future is not None
+    assert len(sent[-1]) == 5
+    threads = [x for x in threading.enumerate() if x.name == "chatlas-compact"]
+    assert threads and all(x.daemon for x in threads)
+
+    # ...but use it once it's ready
+    release.set()
+    chat._compactor.wait()
+    chat.chat("d" * 10, echo="none")
+    assert sent[-1][0].text.startswith("Summary of the earlier conversation:")
+    assert len(sent[-1]) < len(chat.turns())
+
+
+@pytest.mark.asyncio
+async def test_chat_compacts_history_async():
+    summarizer, summarized = fake_chat(lambda turns: "Summary")
+    chat, sent = fake_chat(lambda turns: "ok")
+    chat.set_compaction(40, keep=10, summarizer=summarizer, background=False)
+
+    def blocking(**kwargs):
+        raise AssertionError("Summarized with a blocking request")
+
+    # Summaries are requested without blocking the event loop
+    summarizer.provider.chat_perform = blocking  # type: ignore
+    for prompt in ["a" * 10, "b" * 10, "c" * 10, "d" * 10]:
+        await chat.chat_async(prompt, echo="none")
+    assert summarized
+    assert sent[-1][0].text.startswith("Summary of the earlier conversation:")
+
+
+def test_summarizer_keeps_its_system_prompt():
+    summarizer, summarized = fake_chat(
+        lambda turns: "Summary", system_prompt="Summarize tersely"
+    )
+    summarizer.chat("An earlier question", echo="none")
+    chat, _ = fake_chat(lambda turns: "ok")
+    chat.set_compaction(40, keep=10, summarizer=summarizer, background=False)
+    for prompt in ["a" * 10, "b" * 10, "c" * 10]:
+        chat.chat(prompt, echo="none")
+
+    # The summary is requested with the summarizer's system prompt (only)
+    system, request = summarized[-1]
+    assert system.role == "system" and system.text == "Summarize tersely"
+    assert request.text.startswith(SUMMARY_PROMPT)
+
+
+def test_batch_clones_dont_summarize():
+    summarizer, summarized = fake_chat(lambda turns: "Summary")
+    chat, _ = fake_chat(lambda turns: "ok")
+    chat.set_compaction(80, keep=30, summarizer=summarizer, background=False)
+    for prompt in ["a" * 10, "b" * 10]:
+        chat.chat(prompt, echo="none")
+    assert len(summarized) == 0
+
+    # (Each clone outgrows the threshold, but its summary would be thrown away)
+    chat.chat_batch(["c" * 10, "d" * 10])
+    assert len(summarized) == 0
+    chat.chat("c" * 10, echo="none")
+    assert len(summarized) == 1
+
+
+def test_compactor_keeps_tool_results_with_requests():
+    from chatlas._content import ContentToolRequest, ContentToolResult
+
+    from .test_trim import conversation, heuristic
+
+    turns = conversation()
+    compactor = Compactor(ChatAnthropic(api_key="fake"), threshold=60, keep=50)
+    # (The tool request and result turns start at index 4)
+    assert compactor._cut(turns, heuristic) == 7
+    compactor.keep = 51
+    assert compactor._cut(turns, heuristic) == 3
+    assert isinstance(turns[4].contents[0], ContentToolRequest)
+    assert isinstance(turns[5].contents[0], ContentToolResult)
+
+    with pytest.raises(ValueError, match="must be greater"):
+        Compactor(ChatAnthropic(api_key="fake"), threshold=10, keep=10)
@@ -1,9 +1,12 @@
+import asyncio
+import threading
+import time
 from typing import Union
 
 import pytest
 
-from chatlas import ChatOpenAI
-from chatlas.types import ContentToolResult
+from chatlas import ChatOpenAI, Turn
+from chatlas.types import ContentToolRequest, ContentToolResult
 
 
 def test_register_tool():
@@ -151,3 +154,127 @@ async def test_invoke_tool_returns_tool_result_async():
     assert res.id == "x"
     assert res.error == "Unknown tool"
     assert res.value is None
+
+
+def tool_request_turn(*names: str) -> Turn:
+    return Turn(
+        "assistant",
+        [
+            ContentToolRequest(f"id{i}", name=name, arguments={"i": i})
+            for i, name in enumerate(names)
+        ],
+    )
+
+
+def make_concurrency_probe(delay: float):
+    state = {"running": 0, "max_running": 0}
+
+    async def probe(i: int):
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        # Finish in reverse order so that result order can't come for free
+        await asyncio.sleep(delay / (i + 1))
+        state["running"] -= 1
+        return i
+
+    return probe, state
+
+
+@pytest.mark.asyncio
+async def test_invoke_tools_async_runs_concurrently_in_order():
+    chat = ChatOpenAI()
+    probe, state = make_concurrency_probe(0.05)
+    chat.register_tool(probe)
+    chat.set_turns([Turn("user", "Hi"), tool_request_turn(*["probe"] * 5, "nope")])
+
+    turn = await chat._invoke_tools_async()
+    assert turn is not None
+    results = turn.contents
+    assert [x.id for x in results] == [f"id{i}" for i in range(6)]
+    assert [x.value for x in results[:5]] == list(range(5))  # type: ignore
+    assert results[5].error == "Unknown tool"  # type: ignore
+    assert state["max_running"] == 5
+
+
+@pytest.mark.asyncio
+async def test_invoke_tools_async_respects_concurrency_limits():
+    chat = ChatOpenAI()
+    probe, state = make_concurrency_probe(0.02)
+    chat.register_tool(probe, max_concurrency=2)
+    chat.set_turns([Turn("user", "Hi"), tool_request_turn(*["probe"] * 5)])
+
+    turn = await chat._invoke_tools_async()
+    assert turn is not None
+    assert [x.value for x in turn.contents] == list(range(5))  # type: ignore
+    assert state["max_running"] == 2
+
+    state["max_running"] = 0
+    chat.set_tool_options(max_concurrency=1)
+    await chat._invoke_tools_async()
+    assert state["max_running"] == 1
+
+    with pytest.raises(ValueError, match="max_concurrency"):
+        chat.set_tool_options(max_concurrency=0)
+
+    # Options that aren't given are kept
+    chat.set_tool_options(use_threads=True)
+    assert chat._tool_options["max_concurrency"] == 1
+    chat.set_tool_options(max_concurrency=None, eager=True)
+    assert chat._tool_options == {
+        "max_concurrency": None,
+        "use_threads": True,
+        "eager": True,
+    }
+
+
+@pytest.mark.asyncio
+async def test_invoke_tools_async_with_sync_tool():
+    chat = ChatOpenAI()
+
+    def add(i: int):
+        return i + 1
+
+    chat.register_tool(add)
+    chat.set_turns([Turn("user", "Hi"), tool_request_turn("add", "add")])
+
+    turn = await chat._invoke_tools_async()
+    assert turn is not None
+    assert [x.value for x in turn.contents] == [1, 2]  # type: ignore
+
+
+def test_invoke_tools_in_threads():
+    chat = ChatOpenAI()
+    lock = threading.Lock()
+    state = {"running": 0, "max_running": 0}
+
+    def probe(i: int):
+        with lock:
+            state["running"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+        time.sleep(0.05 / (i + 1))
+        with lock:
+            state["running"] -= 1
+        if i == 3:
+            raise ValueError("boom")
+        return i
+
+    chat.register_tool(probe)
+    chat.set_turns([Turn("user", "Hi"), tool_request_turn(*["probe"] * 5)])
+
+    # By default, tools run one at a time on the calling thread
+    chat._invoke_tools()
+    assert state["max_running"] == 1
+
+    chat.set_tool_options(use_threads=True)
+    turn = chat._invoke_tools()
+    assert turn is not None
+    results = turn.contents
+    assert [x.id for x in results] == [f"id{i}" for i in range(5)]
+    assert [x.value for x in results] == [0, 1, 2, None, 4]  # type: ignore
+    assert results[3].error == "boom"  # type: ignore
+    assert state["max_running"] == 5
+
+    state["max_running"] = 0
+    chat.set_tool_options(use_threads=True, max_concurrency=2)
+    chat._invoke_tools()
+    assert state["max_running"] == 2
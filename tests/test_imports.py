@@ -0,0 +1,58 @@
+import subprocess
+import sys
+
+import pytest
+
+# Modules that are (relatively) expensive to import, and should only be
+# imported once they're actually needed
+HEAVY_MODULES = {
+    "anthropic",
+    "google.generativeai",
+    "httpx",
+    "IPython",
+    "jinja2",
+    "openai",
+    "rich",
+    "sqlite3",
+}
+
+
+def import_times(statement: str) -> dict[str, int]:
+    """
+    Run a statement in a fresh interpreter, and return the cumulative import
+    time (in microseconds) of each module it imported.
+    """
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_chatlas_is_lazy():
+    times = import_times("import chatlas")
+    assert not HEAVY_MODULES & times.keys()
+    assert "pydantic" not in times
+    # A (generous) budget, which catches anything heavy sneaking back in
+    assert times["chatlas"] < 100_000
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "from chatlas import ChatOpenAI, ChatAnthropic, ChatGoogle",
+        "from chatlas.types import ChatResponse, Content",
+        "import chatlas.types.openai, chatlas.types.anthropic, chatlas.types.google",
+    ],
+)
+def test_imports_defer_vendor_sdks(statement: str):
+    times = import_times(statement)
+    assert not HEAVY_MODULES & times.keys()
@@ -1,3 +1,6 @@
+import asyncio
+import threading
+
 import pytest
 from chatlas import ChatAnthropic
 
@@ -11,6 +14,7 @@ from .conftest import (
     assert_tools_simple,
     assert_turns_existing,
     assert_turns_system,
+    fake_stream_events,
     retryassert,
     retryassert_async,
 )
@@ -84,3 +88,278 @@ def test_anthropic_images():
     chat_fun = ChatAnthropic
     assert_images_inline(chat_fun)
     assert_images_remote_error(chat_fun)
+
+
+# ----------------------------------------------------------------------------
+# Offline tests (against a fake stream of events)
+# ----------------------------------------------------------------------------
+
+
+def test_anthropic_eager_tools():
+    chat = ChatAnthropic(api_key="fake")
+    chat.set_tool_options(eager=True)
+
+    started = threading.Event()
+
+    def get_weather(city: str):
+        started.set()
+        return f"sunny in {city}"
+
+    chat.register_tool(get_weather)
+
+    def first_response():
+        for event in fake_stream_events(
+            ("id1", "get_weather", {"city": "Paris"}), "More text"
+        ):
+            # Tool starts before the rest of the response has arrived
+            if event.type == "content_block_start" and event.index == 1:
+                assert started.wait(5)
+            yield event
+
+    responses = [
+        first_response(),
+        fake_stream_events("It is sunny"),
+    ]
+    chat.provider.chat_perform = lambda **kwargs: responses.pop(0)  # type: ignore
+
+    response = chat.chat("What's the weather in Paris?", echo="none")
+    assert str(response) == "More textIt is sunny"
+    turns = chat.turns()
+    assert len(turns) == 4
+    result = turns[2].contents[0]
+    assert result.id == "id1"  # type: ignore
+    assert result.value == "sunny in Paris"  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_anthropic_eager_tools_async():
+    chat = ChatAnthropic(api_key="fake")
+    chat.set_tool_options(eager=True)
+
+    started = asyncio.Event()
+
+    async def get_weather(city: str):
+        started.set()
+        return f"sunny in {city}"
+
+    chat.register_tool(get_weather)
+
+    async def first_response():
+        for event in fake_stream_events(
+            ("id1", "get_weather", {"city": "Paris"}), "More text"
+        ):
+            if event.type == "content_block_start" and event.index == 1:
+                await asyncio.wait_for(started.wait(), 5)
+            yield event
+
+    async def second_response():
+        for event in fake_stream_events("It is sunny"):
+            yield event
+
+    responses = [first_response(), second_response()]
+
+    async def chat_perform_async(**kwargs):
+        return responses.pop(0)
+
+    chat.provider.chat_perform_async = chat_perform_async  # type: ignore
+
+    response = await chat.chat_async("What's the weather in Paris?", echo="none")
+    assert "sunny" in await response.get_content()
+    turns = chat.turns()
+    assert len(turns) == 4
+    assert turns[2].contents[0].value == "sunny in Paris"  # type: ignore
+
+
+def test_anthropic_stream_merge():
+    from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+    from chatlas._anthropic import AnthropicProvider
+
+    provider = AnthropicProvider(model="claude", max_tokens=10, api_key="fake")
+
+    completion = None
+    for event in fake_stream_events(
+        "Let me check the weather. ",
+        ("id1", "get_weather", {"city": "Paris", "days": [1, 2]}),
+        ("id2", "get_time", {}),
+        stop_reason="tool_use",
+    ):
+        completion = provider.stream_merge_chunks(completion, event)
+
+    turn = provider.stream_turn(completion, has_data_model=False, stream=None)
+    assert turn.completion == Message(
+        id="msg",
+        content=[
+            TextBlock(text="Let me check the weather. ", type="text"),
+            ToolUseBlock(
+                id="id1",
+                input={"city": "Paris", "days": [1, 2]},
+                name="get_weather",
+                type="tool_use",
+            ),
+            ToolUseBlock(id="id2", input={}, name="get_time", type="tool_use"),
+        ],
+        model="claude",
+        role="assistant",
+        stop_reason="tool_use",
+        stop_sequence=None,
+        type="message",
+        usage=Usage(input_tokens=10, output_tokens=20),
+    )
+    assert turn.tokens == (10, 20)
+
+
+def test_anthropic_request_schemas_are_cached(monkeypatch):
+    from chatlas import Tool
+    from chatlas._anthropic import AnthropicProvider
+    from pydantic import BaseModel
+
+    provider = AnthropicProvider(model="claude", max_tokens=10, api_key="fake")
+
+    class Person(BaseModel):
+        name: str
+        age: int
+
+    def get_weather(city: str):
+        """Get the weather"""
+        return "sunny"
+
+    tools = {"get_weather": Tool(get_weather)}
+
+    def request():
+        return provider._chat_perform_args(False, [], tools, Person)
+
+    args = request()
+    tool, data_tool = args["tools"]  # type: ignore
+    assert tool["name"] == "get_weather"
+    assert data_tool == {
+        "name": "_structured_tool_call",
+        "description": "Extract structured data",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "data": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string"},
+                        "age": {"type": "integer"},
+                    },
+                    "required": ["name", "age"],
+                    "additionalProperties": False,
+                }
+            },
+        },
+    }
+    assert args["tool_choice"] == {"type": "tool", "name": "_structured_tool_call"}  # type: ignore
+
+    # Later requests don't translate (or even look at) the schemas again
+    def fail(*args, **kwargs):
+        raise AssertionError("Schema was rebuilt")
+
+    monkeypatch.setattr(AnthropicProvider, "_anthropic_tool_schema", fail)
+    args2 = request()
+    assert args2["tools"][0] is tool  # type: ignore
+    assert args2["tools"][1] is data_tool  # type: ignore
+
+
+def test_anthropic_prompt_caching():
+    from types import SimpleNamespace
+
+    from anthropic.types import Message, TextBlock, Usage
+    from chatlas import token_usage
+    from chatlas._tokens import tokens_reset
+
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return Message(
+            id="msg",
+            content=[TextBlock(text="Hi", type="text")],
+            model="claude",
+            role="assistant",
+            stop_reason="end_turn",
+            stop_sequence=None,
+            type="message",
+            usage=Usage(
+                input_tokens=5,
+                output_tokens=2,
+                cache_read_input_tokens=100,
+                cache_creation_input_tokens=20,
+            ),
+        )
+
+    chat = ChatAnthropic(api_key="fake", system_prompt="Be terse", prompt_caching=True)
+    chat.provider._clients = SimpleNamespace(  # type: ignore
+        key="prompt-caching-test",
+        base_url="https://fake",
+        client=SimpleNamespace(messages=SimpleNamespace(create=create)),
+    )
+
+    def get_weather(city: str):
+        """Get the weather"""
+        return "sunny"
+
+    def get_time():
+        """Get the time"""
+        return "noon"
+
+    chat.register_tool(get_weather)
+    chat.register_tool(get_time)
+
+    tokens_reset()
+    chat.chat("Hello", echo="none", stream=False)
+    chat.chat("Again", echo="none", stream=False)
+
+    ephemeral = {"type": "ephemeral"}
+    request = requests[-1]
+    assert request["system"] == [
+        {"type": "text", "text": "Be terse", "cache_control": ephemeral}
+    ]
+    assert [x.get("cache_control") for x in request["tools"]] == [None, ephemeral]
+    messages = request["messages"]
+    assert [x["content"][-1].get("cache_control") for x in messages] == [
+        None,
+        None,
+        ephemeral,
+    ]
+    # The (shared) params of turns and tools aren't modified (e.g., the first
+    # turn was marked in the first request)
+    assert requests[0]["messages"][0]["content"][-1]["cache_control"] == ephemeral
+    tool_schema = chat.tools["get_time"]._schemas["anthropic"]
+    assert "cache_control" not in tool_schema
+
+    # Cache reads/writes are included in (and reported apart from) the input
+    tokens = chat.turns()[-1].tokens
+    assert tokens == (125, 2)
+    assert (tokens.cache_read, tokens.cache_write) == (100, 20)  # type: ignore
+    usage = token_usage()
+    assert usage is not None
+    assert usage[0]["cache_read"] == 200
+    assert usage[0]["cache_write"] == 40
+    tokens_reset()
+
+
+def test_anthropic_prompt_caching_breakpoint_limit():
+    from chatlas._anthropic import AnthropicProvider
+    from chatlas._turn import Turn
+
+    provider = AnthropicProvider(
+        model="claude", max_tokens=10, api_key="fake", prompt_caching=True
+    )
+    turns = [Turn("system", "Be terse"), Turn("user", "Hello")]
+    ephemeral = {"type": "ephemeral"}
+
+    # Breakpoints in the kwargs count towards the limit (of 4)
+    system = [{"type": "text", "text": x, "cache_control": ephemeral} for x in "abc"]
+    args = provider._chat_perform_args(False, turns, {}, kwargs={"system": system})  # type: ignore
+    assert args["system"] == system
+    assert args["messages"][-1]["content"][-1]["cache_control"] == ephemeral  # type: ignore
+
+    system.append({"type": "text", "text": "d", "cache_control": ephemeral})
+    args = provider._chat_perform_args(False, turns, {}, kwargs={"system": system})  # type: ignore
+    assert "cache_control" not in args["messages"][-1]["content"][-1]  # type: ignore
+
+    # Without prompt caching, requests are left alone
+    provider._prompt_caching = False
+    args = provider._chat_perform_args(False, turns, {})
+    assert args["system"] == "Be terse"
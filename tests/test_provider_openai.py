@@ -82,3 +82,223 @@ async def test_openai_logprobs():
     logprobs = turn.completion.choices[0].logprobs.content
     assert logprobs is not None
     assert len(logprobs) == len(pieces)
+
+
+# ----------------------------------------------------------------------------
+# Offline tests (against fake chunks)
+# ----------------------------------------------------------------------------
+
+
+def fake_chunks(n_tokens: int = 20, n_tool_calls: int = 2):
+    from openai.types.chat import ChatCompletionChunk
+
+    def chunk(choices, **kwargs):
+        return ChatCompletionChunk.model_validate(
+            {
+                "id": "chatcmpl-1",
+                "choices": choices,
+                "created": 1,
+                "model": "gpt-4o",
+                "object": "chat.completion.chunk",
+                "system_fingerprint": "fp",
+                **kwargs,
+            }
+        )
+
+    def logprobs(token: str):
+        return {
+            "content": [
+                {"token": token, "logprob": -0.1, "bytes": None, "top_logprobs": []}
+            ]
+        }
+
+    yield chunk([{"index": 0, "delta": {"role": "assistant", "content": ""}}])
+    for i in range(n_tokens):
+        token = f"tok{i} "
+        yield chunk(
+            [{"index": 0, "delta": {"content": token}, "logprobs": logprobs(token)}]
+        )
+
+    for i in range(n_tool_calls):
+        yield chunk(
+            [
+                {
+                    "index": 0,
+                    "delta": {
+                        "tool_calls": [
+                            {
+                                "index": i,
+                                "id": f"call_{i}",
+                                "type": "function",
+                                "function": {"name": f"tool{i}", "arguments": ""},
+                            }
+                        ]
+                    },
+                }
+            ]
+        )
+    # Interleave argument fragments of the different tool calls
+    for frag in ['{"x', '": ', "1", "2}"]:
+        for i in range(n_tool_calls):
+            yield chunk(
+                [
+                    {
+                        "index": 0,
+                        "delta": {
+                            "tool_calls": [
+                                {"index": i, "function": {"arguments": frag}}
+                            ]
+                        },
+                    }
+                ]
+            )
+
+    yield chunk([{"index": 0, "delta": {}, "finish_reason": "tool_calls"}])
+    yield chunk(
+        [],
+        usage={"prompt_tokens": 5, "completion_tokens": 10, "total_tokens": 15},
+        x_groq={"id": "req_1"},
+    )
+
+
+def test_openai_stream_merge_matches_merge_dicts():
+    from chatlas._merge import merge_dicts
+    from chatlas._openai import OpenAIProvider
+
+    provider = OpenAIProvider(model="gpt-4o", api_key="fake")
+
+    expected = None
+    result = None
+    for chunk in fake_chunks():
+        chunkd = chunk.model_dump()
+        expected = chunkd if expected is None else merge_dicts(expected, chunkd)
+        result = provider.stream_merge_chunks(result, chunk)
+
+    assert result is not None
+    assert result.result() == expected
+
+    turn = provider.stream_turn(result, has_data_model=False, stream=None)
+    assert turn.text == "".join(f"tok{i} " for i in range(20))
+    assert turn.tokens == (5, 10)
+    assert turn.finish_reason == "tool_calls"
+    requests = turn.contents[1:]
+    assert [x.name for x in requests] == ["tool0", "tool1"]  # type: ignore
+    assert [x.arguments for x in requests] == [{"x": 12}, {"x": 12}]  # type: ignore
+    assert turn.completion is not None
+    assert len(turn.completion.choices[0].logprobs.content) == 20  # type: ignore
+
+
+def test_openai_stream_merge_tool_call_without_arguments():
+    from chatlas._openai import OpenAIProvider
+    from openai.types.chat import ChatCompletionChunk
+
+    provider = OpenAIProvider(model="gpt-4o", api_key="fake")
+    delta = {
+        "tool_calls": [
+            {"index": 0, "id": "call_0", "type": "function", "function": {"name": "f"}}
+        ]
+    }
+    chunk = ChatCompletionChunk.model_validate(
+        {
+            "id": "chatcmpl-1",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": "tool_calls"}],
+            "created": 1,
+            "model": "gpt-4o",
+            "object": "chat.completion.chunk",
+        }
+    )
+    result = provider.stream_merge_chunks(None, chunk)
+
+    # (Like the tool calls of the SDK's objects, which always have arguments)
+    (call,) = result.result()["choices"][0]["delta"]["tool_calls"]  # type: ignore
+    assert call["function"] == {"name": "f", "arguments": ""}
+
+
+def test_openai_clients_are_shared():
+    chat1 = ChatOpenAI(api_key="shared-client-test")
+    chat2 = ChatOpenAI(api_key="shared-client-test", model="gpt-4o-mini")
+    chat3 = ChatOpenAI(api_key="shared-client-test", base_url="http://localhost/v1")
+
+    client = chat1.provider._client  # type: ignore
+    assert chat2.provider._client is client  # type: ignore
+    assert chat3.provider._client is not client  # type: ignore
+    assert str(chat3.provider._client.base_url) == "http://localhost/v1/"  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_openai_async_clients_are_shared_per_event_loop():
+    import asyncio
+    import threading
+
+    chat1 = ChatOpenAI(api_key="shared-async-client-test")
+    chat2 = ChatOpenAI(api_key="shared-async-client-test")
+    client = chat1.provider._async_client  # type: ignore
+    assert chat2.provider._async_client is client  # type: ignore
+
+    async def get_client():
+        return chat1.provider._async_client  # type: ignore
+
+    other: list = []
+    thread = threading.Thread(target=lambda: other.append(asyncio.run(get_client())))
+    thread.start()
+    thread.join()
+    assert other[0] is not client
+
+
+def test_openai_clients_are_dropped_once_unused():
+    import gc
+
+    from chatlas._clients import RECENT_CLIENTS, _clients
+
+    chat = ChatOpenAI(api_key="dropped-client-test")
+    key = (type(chat.provider._client), chat.provider._clients.key)  # type: ignore
+    assert key in _clients._clients
+    del chat
+    # (Push the client out of the recently used ones)
+    for i in range(RECENT_CLIENTS):
+        ChatOpenAI(api_key=f"other-client-test-{i}")
+    gc.collect()
+    assert key not in _clients._clients
+
+
+def test_openai_async_clients_of_closed_loops_are_dropped():
+    import asyncio
+
+    from chatlas._clients import _async_clients
+
+    chat = ChatOpenAI(api_key="closed-loop-client-test")
+
+    async def get_client():
+        return chat.provider._async_client  # type: ignore
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(get_client())
+    assert loop in _async_clients
+    loop.close()
+    asyncio.run(get_client())
+    assert loop not in _async_clients
+
+
+def test_openai_missing_api_key_is_reported_at_construction(monkeypatch):
+    from openai import OpenAIError
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(OpenAIError, match="api_key"):
+        ChatOpenAI()
+
+
+def test_openai_response_format_is_cached():
+    from chatlas._openai import OpenAIProvider
+    from pydantic import BaseModel
+
+    class Person(BaseModel):
+        name: str
+
+    provider = OpenAIProvider(model="gpt-4o", api_key="fake")
+    args = provider._chat_perform_args(False, [], {}, Person)
+    fmt = args["response_format"]  # type: ignore
+    assert fmt["json_schema"]["schema"]["additionalProperties"] is False  # type: ignore
+    assert fmt["json_schema"]["strict"] is True  # type: ignore
+
+    args2 = provider._chat_perform_args(False, [], {}, Person)
+    assert args2["response_format"] is fmt  # type: ignore
@@ -0,0 +1,208 @@
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from chatlas import ChatAnthropic, ChatOpenAI
+from chatlas._ratelimit import (
+    RateLimiter,
+    TokenBucket,
+    parse_duration,
+    parse_retry_headers,
+    rate_limiter,
+)
+
+from .conftest import fake_stream_events
+
+
+class FakeAPIError(Exception):
+    """
+    Mimics the (HTTP status) errors raised by provider SDKs.
+    """
+
+    def __init__(self, message: str, status_code: int, headers: dict[str, str]):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers)
+
+
+def rate_limit_error(status_code=429, **headers):
+    headers = {k.replace("_", "-"): v for k, v in headers.items()}
+    message = "Rate limited" if status_code == 429 else "Error"
+    return FakeAPIError(message, status_code, headers)
+
+
+def test_parse_retry_headers():
+    assert parse_retry_headers({}) is None
+    assert parse_retry_headers({"Retry-After": "2"}) == 2
+    assert parse_retry_headers({"retry-after-ms": "1500", "retry-after": "2"}) == 1.5
+
+    date = datetime.now(timezone.utc) + timedelta(seconds=30)
+    http_date = date.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    assert 25 < parse_retry_headers({"retry-after": http_date}) <= 30  # type: ignore
+
+    # OpenAI: wait for the exhausted limit(s) to reset
+    openai = {
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "6m0s",
+        "x-ratelimit-remaining-tokens": "100",
+        "x-ratelimit-reset-tokens": "20m",
+    }
+    assert parse_retry_headers(openai) == 360
+
+    # Anthropic
+    reset = (datetime.now(timezone.utc) + timedelta(seconds=10)).isoformat()
+    anthropic = {
+        "anthropic-ratelimit-tokens-remaining": "0",
+        "anthropic-ratelimit-tokens-reset": reset.replace("+00:00", "Z"),
+        "anthropic-ratelimit-requests-remaining": "5",
+    }
+    assert 5 < parse_retry_headers(anthropic) <= 10  # type: ignore
+
+
+def test_parse_duration():
+    assert parse_duration("1s") == 1
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("1h2m3.5s") == 3723.5
+    assert parse_duration("soon") is None
+
+
+def test_token_bucket():
+    bucket = TokenBucket(60, period=60)
+    now = bucket._updated
+    assert bucket.reserve(30, now) == 0
+    assert bucket.reserve(30, now) == 0
+    # In debt: wait for the tokens to be refilled (at 1 per second)
+    assert bucket.reserve(10, now) == 10
+    assert bucket.reserve(15, now + 5) == 20
+    # Never refilled beyond capacity
+    assert bucket.reserve(60, now + 1000) == 0
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Replace the clock with a fake one, which only advances when sleeping.
+    """
+    clock = [1000.0]
+    sleeps = []
+
+    def sleep(seconds: float):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(time, "sleep", sleep)
+    return sleeps
+
+
+def test_rate_limiter_retries(sleeps):
+    limiter = RateLimiter(max_retries=2, backoff_base=1)
+    errors = [rate_limit_error(retry_after="3"), rate_limit_error(500)]
+
+    def perform():
+        if errors:
+            raise errors.pop(0)
+        return "done"
+
+    assert limiter.call(perform) == "done"
+    # The server's advice pauses all requests; otherwise, jittered backoff
+    assert len(sleeps) == 2
+    assert sleeps[0] == 3
+    assert 0 <= sleeps[1] <= 2
+
+    # Non-retryable errors (and exhausted retries) are raised
+    def fail(status_code: int):
+        def perform():
+            raise rate_limit_error(status_code)
+
+        return perform
+
+    with pytest.raises(Exception, match="Error"):
+        limiter.call(fail(400))
+    with pytest.raises(Exception, match="Rate limited"):
+        RateLimiter(max_retries=0).call(fail(429))
+
+    # Retries are opt-in (the SDKs already retry)
+    n_sleeps = len(sleeps)
+    with pytest.raises(Exception, match="Rate limited"):
+        RateLimiter().call(fail(429))
+    assert len(sleeps) == n_sleeps
+
+
+def test_rate_limiter_budgets(sleeps):
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=600)
+    for _ in range(3):
+        limiter.call(lambda: None, tokens=100)
+    # The third request exceeds the request budget (2 per minute)
+    assert len(sleeps) == 1
+    assert sleeps[0] == 30
+
+    # Underestimated token usage is charged once known
+    limiter = RateLimiter(tokens_per_minute=600)
+    limiter.record_usage(100, (500, 500))
+    assert limiter.reserve(10) == 31
+
+
+def test_rate_limiters_are_shared_by_credentials():
+    chat1 = ChatOpenAI(api_key="key1")
+    chat2 = ChatOpenAI(api_key="key1", model="gpt-4o-mini")
+    chat3 = ChatOpenAI(api_key="key2")
+    chat4 = ChatAnthropic(api_key="key1")
+    limiter = rate_limiter(chat1.provider)
+    assert rate_limiter(chat2.provider) is limiter
+    assert rate_limiter(chat3.provider) is not limiter
+    assert rate_limiter(chat4.provider) is not limiter
+
+    # Other client options (e.g., timeouts) don't matter, but the account does
+    chat5 = ChatOpenAI(api_key="key1", kwargs={"timeout": 5, "max_retries": 0})
+    chat6 = ChatOpenAI(api_key="key1", kwargs={"organization": "org2"})
+    assert rate_limiter(chat5.provider) is limiter
+    assert rate_limiter(chat6.provider) is not limiter
+
+    chat2.set_rate_limits(requests_per_minute=10)
+    assert limiter._requests is not None
+    assert "key1" not in (chat1.provider.rate_limit_key() or "")
+
+
+def test_chat_retries_rate_limited_requests(sleeps):
+    chat = ChatAnthropic(api_key="retry-test")
+    chat.set_rate_limits(max_retries=1)
+    responses = [
+        rate_limit_error(retry_after="2"),
+        fake_stream_events("Hello there"),
+    ]
+
+    def chat_perform(**kwargs):
+        res = responses.pop(0)
+        if isinstance(res, Exception):
+            raise res
+        return res
+
+    chat.provider.chat_perform = chat_perform  # type: ignore
+    assert str(chat.chat("Hi", echo="none")) == "Hello there"
+    assert not responses
+    assert sleeps == [2]
+
+
+@pytest.mark.asyncio
+async def test_chat_retries_rate_limited_requests_async():
+    chat = ChatAnthropic(api_key="retry-test-async")
+    chat.set_rate_limits(max_retries=1, backoff_base=0.01)
+    responses = [rate_limit_error(503), fake_stream_events("Hello there")]
+
+    async def chat_perform_async(**kwargs):
+        res = responses.pop(0)
+        if isinstance(res, Exception):
+            raise res
+
+        async def events():
+            for event in res:
+                yield event
+
+        return events()
+
+    chat.provider.chat_perform_async = chat_perform_async  # type: ignore
+    response = await chat.chat_async("Hi", echo="none")
+    assert await response.get_content() == "Hello there"
+    assert not responses
@@ -0,0 +1,155 @@
+import json
+
+import pytest
+from chatlas import ChatAnthropic, Turn
+from chatlas._usage import Tokens
+from chatlas.types import (
+    ContentImageInline,
+    ContentImageRemote,
+    ContentJson,
+    ContentText,
+    ContentToolRequest,
+    ContentToolResult,
+)
+
+from .test_batch import echo_chat
+
+IMAGE = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk"
+
+
+def history():
+    return [
+        Turn("system", "Be terse"),
+        Turn(
+            "user",
+            [
+                ContentText("What's in these images?"),
+                ContentImageInline("image/png", IMAGE),
+                ContentImageRemote("https://example.com/cat.png", detail="low"),
+            ],
+        ),
+        Turn(
+            "assistant",
+            [ContentToolRequest("id1", "describe", {"image": 1, "depth": [1, 2]})],
+            tokens=Tokens(100, 5, cache_read=50),
+            finish_reason="tool_use",
+            completion={"id": "msg_1", "stop_reason": "tool_use"},
+        ),
+        Turn(
+            "user",
+            [
+                ContentToolResult("id1", {"labels": ["cat"]}),
+                ContentToolResult("id2", None, "Unknown tool"),
+            ],
+        ),
+        Turn("user", [ContentImageInline("image/png", IMAGE)]),
+        Turn("assistant", [ContentJson({"animal": "cat"})], tokens=(120, 8)),
+    ]
+
+
+def chat_with_history():
+    chat = ChatAnthropic(api_key="fake")
+    chat._turns = history()
+    return chat
+
+
+def test_round_trips_every_content_type():
+    chat = chat_with_history()
+    data = chat.to_dict()
+    data = json.loads(json.dumps(data))
+
+    restored = ChatAnthropic(api_key="fake").from_dict(data)
+    expected = history()
+    for turn in expected:
+        turn.completion = None  # Dropped by default
+    assert restored.turns(include_system_prompt=True) == expected
+    assert restored.system_prompt == "Be terse"
+    assert restored.turns()[1].tokens.cache_read == 50  # type: ignore
+    assert restored.turns()[-1].tokens.cache_read == 0  # type: ignore
+
+    # Text is stored as plain strings, and image data only once
+    assert data["turns"][0]["contents"] == ["Be terse"]
+    assert list(data["images"].values()) == [IMAGE]
+    assert json.dumps(data["turns"]).count(IMAGE) == 0
+
+
+def test_completions_are_compacted():
+    data = chat_with_history().to_dict(completions=True)
+    assert data["turns"][2]["completion"] == {"id": "msg_1", "stop_reason": "tool_use"}
+    assert "completion" not in data["turns"][1]
+
+    from anthropic.types import Message, TextBlock, Usage
+
+    message = Message(
+        id="msg",
+        content=[TextBlock(text="Hi", type="text")],
+        model="claude",
+        role="assistant",
+        stop_reason="end_turn",
+        stop_sequence=None,
+        type="message",
+        usage=Usage(input_tokens=1, output_tokens=1),
+    )
+    chat = ChatAnthropic(api_key="fake")
+    chat._turns = [Turn("assistant", "Hi", completion=message)]
+    (turn,) = chat.to_dict(completions=True)["turns"]
+    assert turn["completion"]["id"] == "msg"
+    assert "stop_sequence" not in turn["completion"]
+
+
+def test_values_json_cant_represent_are_strings():
+    chat = ChatAnthropic(api_key="fake")
+    chat._turns = [Turn("user", [ContentToolResult("id", {"tags": {"a"}})])]
+    (content,) = chat.to_dict()["turns"][0]["contents"]
+    assert content["value"] == {"tags": "{'a'}"}
+
+
+def test_unknown_versions_and_contents_are_errors():
+    chat = ChatAnthropic(api_key="fake")
+    with pytest.raises(ValueError, match="version 2"):
+        chat.from_dict({"version": 2, "turns": []})
+    with pytest.raises(ValueError, match="Unknown content type"):
+        chat.from_dict({"version": 1, "turns": [{"role": "user", "contents": [{}]}]})
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".msgpack"])
+def test_save_and_load(tmp_path, suffix):
+    if suffix == ".msgpack":
+        pytest.importorskip("msgpack")
+
+    path = chat_with_history().save(tmp_path / f"chat{suffix}")
+    if suffix == ".jsonl":
+        lines = path.read_text().splitlines()
+        assert len(lines) == 1 + len(history())
+        assert json.loads(lines[0])["version"] == 1
+
+    chat, _ = echo_chat()
+    chat.load(path)
+    assert len(chat.turns(include_system_prompt=True)) == len(history())
+    assert chat.turns()[-1].contents == [ContentJson({"animal": "cat"})]
+
+    # A restored chat can carry on
+    chat._turns = chat._turns[:2]
+    assert str(chat.chat("hi", echo="none")) == "You said: hi"
+
+
+def test_load_skips_blank_lines(tmp_path):
+    path = chat_with_history().save(tmp_path / "chat.jsonl")
+    # (E.g., edited by hand, or appended to)
+    header, *turns = path.read_text().splitlines()
+    path.write_text(header + "\n\n" + "\n\n".join(turns) + "\n\n \n")
+
+    chat, _ = echo_chat()
+    chat.load(path)
+    assert len(chat.turns(include_system_prompt=True)) == len(history())
+
+
+def test_load_keeps_other_line_boundaries(tmp_path):
+    # (Written unescaped, but only "\n" separates the turns of a .jsonl file)
+    texts = ["line one\u2028line two", "para\u2029graph", "ok\x85", "a\rb\x0cc\x1ed"]
+    chat = ChatAnthropic(api_key="fake")
+    chat._turns = [Turn("user", x) for x in texts]
+    path = chat.save(tmp_path / "chat.jsonl")
+
+    chat.load(path)
+    assert [x.text for x in chat.turns()] == texts
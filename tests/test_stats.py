@@ -0,0 +1,76 @@
+import pytest
+from chatlas import ChatAnthropic, LRUCache
+
+from .conftest import fake_stream_events
+from .test_batch import echo_chat
+
+
+def test_stats_of_tool_rounds():
+    chat = ChatAnthropic(api_key="fake")
+
+    def get_weather():
+        return "sunny"
+
+    chat.register_tool(get_weather)
+
+    responses = [
+        fake_stream_events("Let me check", ("id1", "get_weather", {})),
+        fake_stream_events("It is sunny"),
+    ]
+    chat.provider.chat_perform = lambda **kwargs: responses.pop(0)  # type: ignore
+
+    received = []
+    chat.set_stats_callback(received.append)
+    response = chat.chat("What's the weather?", echo="none")
+    stats = response.stats
+
+    assert received == [stats]
+    assert len(stats.rounds) == 2
+    first, second = stats.rounds
+    for x in stats.rounds:
+        assert x.start <= x.request_start <= x.headers <= x.first_chunk  # type: ignore
+        assert x.first_text <= x.last_text <= x.end <= stats.end  # type: ignore
+        assert x.tokens == (10, 20)
+        assert not x.cached
+    # The second round starts after the tool ran
+    assert first.end <= second.start  # type: ignore
+    assert first.text_chunks == second.text_chunks == 3
+    assert stats.bytes == len("Let me checkIt is sunny")
+    assert stats.chunks == first.chunks + second.chunks > 5
+    assert stats.time_to_first_token == first.first_text
+    assert stats.inter_token_latency is not None
+    assert stats.to_dict()["rounds"][1]["bytes"] == len("It is sunny")
+
+
+def test_stats_without_streaming_or_from_cache():
+    cache = LRUCache()
+    chat, _ = echo_chat()
+    chat.set_cache(cache)
+
+    stats = chat.chat("hi", echo="none", stream=False).stats
+    (x,) = stats.rounds
+    assert (x.chunks, x.text_chunks, x.bytes) == (1, 1, len("You said: hi"))
+    assert x.latency is not None and x.latency >= 0
+    assert not x.cached
+
+    # A cached response is replayed (but not sent)
+    chat, _ = echo_chat()
+    chat.set_cache(cache)
+    (x,) = chat.chat("hi", echo="none", stream=False).stats.rounds
+    assert x.cached
+    assert x.request_start is None and x.latency is None
+    assert x.bytes == len("You said: hi")
+
+
+@pytest.mark.asyncio
+async def test_stats_async():
+    chat, _ = echo_chat()
+    received = []
+    chat.set_stats_callback(received.append)
+
+    response = await chat.stream_async("hi")
+    assert response.stats.end is None
+    assert await response.get_content() == "You said: hi"
+    assert received == [response.stats]
+    assert response.stats.end is not None
+    assert response.stats.rounds[0].text_chunks == 3
@@ -1,5 +1,13 @@
+import pytest
+from chatlas._content import ContentToolRequest
 from chatlas._openai import OpenAIAzureProvider, OpenAIProvider
-from chatlas._tokens import token_usage, tokens_log, tokens_reset
+from chatlas._tokens import (
+    image_tokens,
+    token_usage,
+    tokens_log,
+    tokens_reset,
+    turn_tokens,
+)
 
 
 def test_usage_is_none():
@@ -32,3 +40,134 @@ def test_can_retrieve_and_log_tokens():
     assert usage[1]["output"] == 25
 
     tokens_reset()
+
+
+def test_tokenizer_backends():
+    from types import SimpleNamespace
+
+    from chatlas._tokens import Tokenizer
+
+    assert Tokenizer().count("x" * 9) == 3
+    assert Tokenizer(lambda x: 42).count("Hello") == 42
+
+    class Tiktoken:
+        def encode_ordinary(self, text):
+            return text.split()
+
+    assert Tokenizer(Tiktoken()).count("a b c") == 3
+
+    class Tokenizers:
+        def encode(
+            self, sequence, pair=None, is_pretokenized=False, add_special_tokens=True
+        ):
+            ids = sequence.split() + (["<s>"] if add_special_tokens else [])
+            return SimpleNamespace(ids=ids)
+
+    assert Tokenizer(Tokenizers()).count("a b c") == 3
+
+
+def test_tiktoken_is_opt_in(monkeypatch):
+    import sys
+
+    from chatlas._tokens import Tokenizer, default_tokenizer
+
+    # The default tokenizer never loads (or downloads) an encoding
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    assert default_tokenizer().encoding is None
+    with pytest.raises(ImportError, match="pip install tiktoken"):
+        Tokenizer("o200k_base")
+
+
+def test_content_tokens_are_cached():
+    from chatlas import Turn
+    from chatlas._tokens import TURN_OVERHEAD, Tokenizer
+
+    counted = []
+
+    def count(text):
+        counted.append(text)
+        return len(text)
+
+    tokenizer = Tokenizer(count)
+    turn = Turn("user", "Hello")
+    assert turn_tokens(turn, tokenizer) == 5 + TURN_OVERHEAD
+    assert turn_tokens(turn, tokenizer) == 5 + TURN_OVERHEAD
+    assert counted == ["Hello"]
+
+    # Contents shared by turns are counted once
+    turn2 = Turn("user", turn.contents)
+    assert turn_tokens(turn2, tokenizer) == 5 + TURN_OVERHEAD
+    assert counted == ["Hello"]
+    # ...and the (cached) counts don't affect equality
+    assert turn.contents[0] == Turn("user", "Hello").contents[0]
+
+    # Tool requests count their name and arguments
+    turn3 = Turn("assistant", [ContentToolRequest("id", "add", {"x": 1})])
+    assert turn_tokens(turn3, tokenizer) == 3 + len('{"x": 1}') + TURN_OVERHEAD
+
+
+def test_image_tokens():
+    import base64
+    import io
+
+    from chatlas._content import ContentImageInline, ContentImageRemote
+    from chatlas._content_image import image_size
+    from chatlas._tokens import (
+        IMAGE_HEADER_BYTES,
+        IMAGE_MAX_TOKENS,
+        Tokenizer,
+        content_tokens,
+        image_header,
+    )
+    from PIL import Image
+
+    assert image_tokens(200, 200) == 54
+    # Large images are scaled down (by their longest edge, and their area)
+    assert image_tokens(3136, 100) == image_tokens(1568, 50)
+    assert image_tokens(4000, 4000) == IMAGE_MAX_TOKENS
+
+    for fmt in ["PNG", "JPEG", "GIF", "WEBP"]:
+        buffer = io.BytesIO()
+        Image.new("RGB", (321, 123)).save(buffer, format=fmt)
+        assert image_size(buffer.getvalue()) == (321, 123)
+    assert image_size(b"not an image") is None
+
+    data = base64.b64encode(buffer.getvalue()).decode()
+    image = ContentImageInline("image/webp", data)
+    assert content_tokens(image, Tokenizer()) == image_tokens(321, 123)
+
+    # Only the header of a (large) image is decoded
+    buffer = io.BytesIO()
+    Image.effect_noise((1000, 800), 64).save(buffer, format="PNG")
+    assert len(buffer.getvalue()) > 2 * IMAGE_HEADER_BYTES
+    data = base64.b64encode(buffer.getvalue()).decode()
+    assert len(image_header(data)) == IMAGE_HEADER_BYTES
+    image = ContentImageInline("image/png", data)
+    assert content_tokens(image, Tokenizer()) == image_tokens(1000, 800)
+    # ...and invalid data falls back to the largest estimate
+    image = ContentImageInline("image/png", "not base64!")
+    assert content_tokens(image, Tokenizer()) == IMAGE_MAX_TOKENS
+    # The size of remote images is unknown
+    remote = ContentImageRemote(url="https://example.com/image.png")
+    assert content_tokens(remote, Tokenizer()) == IMAGE_MAX_TOKENS
+
+
+def test_chat_count_tokens():
+    from chatlas import ChatOpenAI, Turn
+    from chatlas._tokens import TURN_OVERHEAD
+
+    chat = ChatOpenAI(api_key="fake", system_prompt="Be terse")
+    chat.set_tokenizer(len)
+    assert chat.count_tokens() == len("Be terse") + TURN_OVERHEAD
+    assert chat.count_tokens("Hi") == len("Be terse") + len("Hi") + 2 * TURN_OVERHEAD
+
+    def add(x: int, y: int) -> int:
+        "Add two numbers."
+        return x + y
+
+    chat.register_tool(add)
+    assert chat.count_tokens() > len("Be terse") + TURN_OVERHEAD + 50
+
+    # Turns estimate their tokens with the default tokenizer
+    turn = Turn("user", "x" * 8)
+    assert turn.estimated_tokens > TURN_OVERHEAD
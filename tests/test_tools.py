@@ -0,0 +1,154 @@
+import copy
+import datetime
+import enum
+from typing import Any, Dict, List, Literal, Optional, Union
+
+import pytest
+from chatlas import Tool
+from chatlas._tools import _basemodel_to_param_schema, strict_json_schema
+from pydantic import BaseModel, Field
+
+
+class Color(enum.Enum):
+    RED = "red"
+    GREEN = "green"
+
+
+class Address(BaseModel):
+    """A postal address"""
+
+    street: str
+    city: str = Field(description="The city")
+    zip: Optional[str] = None
+
+
+class Person(BaseModel):
+    """A person"""
+
+    name: str = Field(description="Full name")
+    age: int = 0
+    height: Optional[float] = None
+    email: str = Field(alias="e-mail")
+    birthday: datetime.date
+    tags: List[str] = []
+    scores: Dict[str, float] = {}
+    color: Color
+    favorite: Color = Field(description="Favorite color")
+    kind: Literal["a", "b"] = "a"
+    value: Union[int, str, None] = None
+
+
+class Company(BaseModel):
+    name: str
+    address: Address
+    billing: Optional[Address] = None
+    hq: Address = Field(description="Headquarters")
+    employees: List[Person]
+    parent: Optional["Company"] = None
+    extra: Any = None
+
+
+class Shapes(BaseModel):
+    shapes: List[Union[Address, Person]]
+    nested: List[List[int]]
+
+
+CORPUS = [Address, Person, Company, Shapes]
+
+
+@pytest.mark.parametrize("model", CORPUS, ids=lambda x: x.__name__)
+def test_param_schema_matches_openai(model):
+    openai = pytest.importorskip("openai")
+
+    # The previous implementation, which relied on openai
+    params = openai.pydantic_function_tool(model)["function"]["parameters"]
+    params.pop("title", None)
+    for prop in params.get("properties", {}).values():
+        prop.pop("title", None)
+
+    assert _basemodel_to_param_schema(model) == params
+
+
+def test_strict_json_schema():
+    schema = {
+        "type": "object",
+        "properties": {
+            "a": {"$ref": "#/$defs/A", "description": "An A"},
+            "b": {"type": "string", "default": None},
+            "c": {"allOf": [{"$ref": "#/$defs/A"}]},
+        },
+        "$defs": {"A": {"type": "object", "properties": {"x": {"type": "integer"}}}},
+    }
+    res = strict_json_schema(copy.deepcopy(schema))
+    a = {
+        "type": "object",
+        "properties": {"x": {"type": "integer"}},
+        "required": ["x"],
+        "additionalProperties": False,
+    }
+    assert res["additionalProperties"] is False
+    assert res["required"] == ["a", "b", "c"]
+    # $refs with siblings are inlined, while the siblings are kept
+    assert res["properties"]["a"] == {**a, "description": "An A"}
+    # None defaults are dropped
+    assert res["properties"]["b"] == {"type": "string"}
+    # A single allOf is merged (and its $ref kept)
+    assert res["properties"]["c"] == {"$ref": "#/$defs/A"}
+    assert res["$defs"]["A"] == a
+
+    with pytest.raises(ValueError, match="should start with"):
+        strict_json_schema({"$ref": "other.json#/A", "description": "x"})
+
+
+def test_tool_schema_doesnt_need_openai(monkeypatch):
+    import sys
+
+    # Make `import openai` fail
+    monkeypatch.setitem(sys.modules, "openai", None)
+
+    def add(x: int, y: int = 1) -> int:
+        """Add two numbers"""
+        return x + y
+
+    tool = Tool(add)
+    assert tool.schema == {
+        "type": "function",
+        "function": {
+            "name": "add",
+            "description": "Add two numbers",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "x": {"type": "integer"},
+                    "y": {"type": "integer", "default": 1},
+                },
+                "required": ["x", "y"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def test_model_param_schema_is_built_once(monkeypatch):
+    from chatlas import _tools
+
+    schemas = []
+
+    def param_schema(model):
+        schemas.append(model)
+        return convert(model)
+
+    convert = _tools._basemodel_to_param_schema
+    monkeypatch.setattr(_tools, "_basemodel_to_param_schema", param_schema)
+
+    class Person(BaseModel):
+        name: str
+
+    # (e.g., once for a whole batch of extractions)
+    first = _tools.basemodel_to_param_schema(Person)
+    second = _tools.basemodel_to_param_schema(Person)
+    assert schemas == [Person]
+    assert first == second
+    # Callers get copies, since they may modify them
+    assert first is not second
+    assert _tools.model_param_schema(Person) is _tools.model_param_schema(Person)
@@ -0,0 +1,245 @@
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from chatlas import ChatAnthropic, set_tracer
+from chatlas._tracing import NO_SPAN, span
+
+from .conftest import fake_stream_events
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class FakeSpan:
+    def __init__(self, tracer, name, attributes, parent):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.ended = False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self):
+        self.ended = True
+        self.tracer.spans.append(self)
+
+
+class InMemoryTracer:
+    """
+    A tracer that keeps its (finished) spans in memory.
+    """
+
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, context=None, attributes=None):
+        return FakeSpan(self, name, attributes, parent_of(context))
+
+    @contextmanager
+    def start_as_current_span(self, name, context=None, attributes=None):
+        s = self.start_span(name, context, attributes)
+        token = _current.set(s)
+        try:
+            yield s
+        finally:
+            _current.reset(token)
+            s.end()
+
+
+def parent_of(context):
+    if context is None:
+        return _current.get()
+    if isinstance(context, FakeSpan):
+        return context
+    from opentelemetry import trace
+
+    return trace.get_current_span(context)
+
+
+@pytest.fixture
+def tracer():
+    tracer = InMemoryTracer()
+    set_tracer(tracer)
+    yield tracer
+    set_tracer(None)
+
+
+def weather_chat():
+    chat = ChatAnthropic(api_key="fake", model="claude-test")
+
+    def get_weather(city: str):
+        if city == "Atlantis":
+            raise ValueError("No such city")
+        return f"sunny in {city}"
+
+    chat.register_tool(get_weather)
+    responses = [
+        fake_stream_events(
+            ("id1", "get_weather", {"city": "Paris"}),
+            ("id2", "get_weather", {"city": "Atlantis"}),
+        ),
+        fake_stream_events("It is sunny"),
+    ]
+    chat.provider._chat_perform_args = lambda *args: {}  # type: ignore
+    chat.provider._clients = SimpleNamespace(  # type: ignore
+        key="fake",
+        base_url="https://fake",
+        client=SimpleNamespace(
+            messages=SimpleNamespace(create=lambda **kwargs: responses.pop(0))
+        ),
+    )
+    return chat
+
+
+def test_no_tracer_costs_nothing():
+    assert span("chatlas.submit") is NO_SPAN
+    with span("chatlas.submit") as s:
+        assert s is None
+
+
+def test_spans_of_tool_loop(tracer):
+    chat = weather_chat()
+    assert str(chat.chat("Weather?", echo="none")) == "It is sunny"
+
+    names = [x.name for x in tracer.spans]
+    # Spans are recorded as they end (i.e., children before their parents)
+    assert names == [
+        "chatlas.request.build",
+        "chatlas.request",
+        "chatlas.stream",
+        "chatlas.submit",
+        "chatlas.tool",
+        "chatlas.tool",
+        "chatlas.request.build",
+        "chatlas.request",
+        "chatlas.stream",
+        "chatlas.submit",
+    ]
+    build, request, stream, submit, paris, atlantis = tracer.spans[:6]
+    assert all(x.parent is submit for x in (build, request, stream))
+    assert submit.parent is None
+    assert request.attributes["gen_ai.request.model"] == "claude-test"
+    assert submit.attributes["gen_ai.system"] == "anthropic"
+    assert submit.attributes["gen_ai.usage.input_tokens"] == 10
+    assert submit.attributes["gen_ai.usage.output_tokens"] == 20
+    assert submit.attributes["chatlas.cached"] is False
+    assert stream.attributes["chatlas.chunks"] > 0
+
+    assert paris.attributes["gen_ai.tool.name"] == "get_weather"
+    assert paris.attributes["gen_ai.tool.call.id"] == "id1"
+    assert "error.type" not in paris.attributes
+    assert atlantis.attributes["error.type"] == "ValueError"
+
+
+def test_spans_of_threaded_tools_have_parents(tracer):
+    chat = weather_chat()
+    chat.set_tool_options(eager=True)
+    chat.chat("Weather?", echo="none")
+
+    tools = [x for x in tracer.spans if x.name == "chatlas.tool"]
+    assert len(tools) == 2
+    # Eager tools start (in other threads) while the response is streaming
+    assert all(x.parent.name == "chatlas.stream" for x in tools)
+
+
+@pytest.mark.asyncio
+async def test_spans_async(tracer):
+    chat = weather_chat()
+
+    async def create(**kwargs):
+        async def events():
+            for event in fake_stream_events("It is sunny"):
+                yield event
+
+        return events()
+
+    chat.provider._clients.async_client = SimpleNamespace(  # type: ignore
+        messages=SimpleNamespace(create=create)
+    )
+    await chat.chat_async("Weather?", echo="none")
+
+    request, stream, submit = tracer.spans[1:]
+    assert request.parent is submit and stream.parent is submit
+    assert submit.attributes["gen_ai.usage.output_tokens"] == 20
+
+
+def test_streams_dont_change_the_current_span(tracer):
+    chat = weather_chat()
+    with tracer.start_as_current_span("caller") as caller:
+        chunks = iter(chat.stream("Weather?", echo="none"))
+        first = next(chunks)
+        # The (open) spans of the response aren't made the current span
+        assert _current.get() is caller
+        assert first + "".join(chunks) == "It is sunny"
+    assert _current.get() is None
+
+    submit = next(x for x in tracer.spans if x.name == "chatlas.submit")
+    assert submit.parent is caller
+    assert all(x.ended for x in tracer.spans)
+
+
+@pytest.mark.asyncio
+async def test_streams_can_be_consumed_across_tasks(tracer):
+    chat = weather_chat()
+
+    async def create(**kwargs):
+        async def events():
+            for event in fake_stream_events("It is sunny"):
+                yield event
+
+        return events()
+
+    chat.provider._clients.async_client = SimpleNamespace(  # type: ignore
+        messages=SimpleNamespace(create=create)
+    )
+    response = await chat.stream_async("Weather?", echo="none")
+    chunks = response.__aiter__()
+    # Start consuming the stream (and its spans) in one task, and finish it in
+    # another
+    first = await asyncio.create_task(chunks.__anext__())  # type: ignore
+    rest = await asyncio.create_task(collect(chunks))
+    assert first + "".join(rest) == "It is sunny"
+
+    request, stream, submit = tracer.spans[1:]
+    assert request.parent is submit and stream.parent is submit
+    assert submit.ended and stream.ended
+
+
+async def collect(chunks):
+    return [x async for x in chunks]
+
+
+def test_span_records_errors(tracer):
+    with pytest.raises(RuntimeError):
+        with span("chatlas.request", {"gen_ai.request.model": None}):
+            raise RuntimeError("Request failed")
+
+    (s,) = tracer.spans
+    assert s.attributes == {"error.type": "RuntimeError"}
+
+
+def test_opentelemetry_in_memory_exporter():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    set_tracer(provider.get_tracer("chatlas"))
+    try:
+        weather_chat().chat("Weather?", echo="none")
+    finally:
+        set_tracer(None)
+
+    spans = exporter.get_finished_spans()
+    assert [x.name for x in spans].count("chatlas.submit") == 2
+    tool = next(x for x in spans if x.name == "chatlas.tool")
+    assert tool.attributes["gen_ai.tool.name"] == "get_weather"  # type: ignore
@@ -0,0 +1,113 @@
+import pytest
+from chatlas import ChatAnthropic, Turn
+from chatlas._content import ContentToolRequest, ContentToolResult
+from chatlas._tokens import TURN_OVERHEAD, Tokenizer, turn_tokens
+from chatlas._trim import ContextTrimmer
+
+from .conftest import fake_stream_events
+
+# (Pinned, in case tiktoken is installed)
+heuristic = Tokenizer()
+
+
+def text(n_tokens: int) -> str:
+    # ~4 characters per token (plus the turn's overhead)
+    return "x" * (n_tokens - TURN_OVERHEAD) * 4
+
+
+def conversation() -> list[Turn]:
+    return [
+        Turn("system", text(10)),
+        Turn("user", text(10)),
+        Turn("assistant", text(10)),
+        Turn("user", text(10)),
+        Turn("assistant", [ContentToolRequest("id", "tool", {})], tokens=(0, 10)),
+        Turn("user", [ContentToolResult("id", text(11))]),
+        Turn("assistant", text(10)),
+        Turn("user", text(10)),
+    ]
+
+
+def test_turn_tokens():
+    assert turn_tokens(Turn("user", text(10)), heuristic) == 10
+    # The reported (output) tokens of assistant turns are used
+    assert turn_tokens(Turn("assistant", "Hi", tokens=(100, 42)), heuristic) == 42
+
+
+def test_trimmer_keeps_everything_that_fits():
+    turns = conversation()
+    assert ContextTrimmer(1000).trim(turns, heuristic) == turns
+    assert ContextTrimmer(91, reserve=10).trim(turns, heuristic) is turns
+
+
+def test_trimmer_drops_oldest_turns():
+    turns = conversation()
+    # Keeps the system prompt, and starts with a user turn
+    assert ContextTrimmer(61).trim(turns, heuristic) == [turns[0], *turns[3:]]
+    assert ContextTrimmer(71, reserve=10).trim(turns, heuristic) == [
+        turns[0],
+        *turns[3:],
+    ]
+
+    # Never separates tool requests from their results (so rather than
+    # starting with the tool request, or its result, start with the next
+    # "real" user turn)
+    assert ContextTrimmer(60).trim(turns, heuristic) == [turns[0], turns[7]]
+
+    with pytest.raises(ValueError, match="latest turns exceed"):
+        ContextTrimmer(15).trim(turns, heuristic)
+    with pytest.raises(ValueError, match="system prompt alone"):
+        ContextTrimmer(20, reserve=10).trim(turns, heuristic)
+    with pytest.raises(ValueError, match="must be greater"):
+        ContextTrimmer(10, reserve=10)
+
+
+def test_trimmer_counts_turns_once(monkeypatch):
+    import chatlas._trim
+
+    counted = []
+
+    def count(turn, tokenizer):
+        counted.append(turn)
+        return turn_tokens(turn, tokenizer)
+
+    monkeypatch.setattr(chatlas._trim, "turn_tokens", count)
+
+    turns = conversation()
+    trimmer = ContextTrimmer(61)
+    trimmer.trim(turns[:4], heuristic)
+    assert len(counted) == 4
+    assert trimmer.trim(turns, heuristic) == [turns[0], *turns[3:]]
+    assert counted[4:] == turns[4:]
+
+    # Changed turns (and the ones after them) are counted again
+    turns2 = [*turns[:2], Turn("assistant", text(5)), *turns[3:]]
+    counted.clear()
+    assert trimmer.trim(turns2, heuristic) == [turns[0], *turns[3:]]
+    assert counted == turns2[2:]
+
+
+def test_chat_trims_requests():
+    chat = ChatAnthropic(api_key="fake", system_prompt=text(10))
+    sent = []
+
+    def chat_perform(*, turns, **kwargs):
+        sent.append(turns)
+        return fake_stream_events("Hello there")
+
+    chat.provider.chat_perform = chat_perform  # type: ignore
+    # Each exchange is (roughly) 10 tokens of prompt and 20 of response
+    chat.set_tokenizer(lambda x: (len(x) + 3) // 4)
+    chat.set_token_limits(100, reserve=20)
+    for _ in range(4):
+        chat.chat(text(10), echo="none")
+
+    assert [len(x) for x in sent] == [2, 4, 6, 6]
+    assert sent[-1][0].role == "system"
+    assert sent[-1][1:] == chat.turns()[2:7]
+    # The chat's history is left alone
+    assert len(chat.turns()) == 8
+
+    chat.set_token_limits(None)
+    chat.chat(text(10), echo="none")
+    assert len(sent[-1]) == 10
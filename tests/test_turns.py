@@ -28,3 +28,49 @@ def test_normalize_turns_errors():
 def test_can_extract_text_easily():
     turn = Turn("assistant", [ContentText("ABC"), ContentImage(), ContentText("DEF")])
     assert turn.text == "ABCDEF"
+
+
+def test_provider_params_are_cached_per_turn():
+    from chatlas import ChatOpenAI
+    from chatlas._anthropic import AnthropicProvider
+    from chatlas._openai import OpenAIProvider
+    from chatlas.types import ContentToolRequest
+
+    user = Turn("user", "What's the weather?")
+    assistant = Turn(
+        "assistant",
+        [ContentToolRequest("x", name="weather", arguments={"city": "Paris"})],
+    )
+    turns = [Turn("system", "Be terse"), user, assistant]
+
+    msgs = OpenAIProvider._as_message_param(turns)
+    assert len(msgs) == 3
+    assert msgs[2]["tool_calls"][0]["function"]["arguments"] == '{"city": "Paris"}'  # type: ignore
+    msgs2 = OpenAIProvider._as_message_param(turns)
+    assert all(x is y for x, y in zip(msgs, msgs2))
+
+    provider = AnthropicProvider(model="foo", max_tokens=10, api_key="fake")
+    msgs3 = provider._as_message_params(turns)
+    assert len(msgs3) == 2
+    assert msgs3[0] is provider._as_message_params(turns)[0]
+    # Each provider keeps its own representation
+    assert msgs3[0] is not msgs2[1]
+
+    chat = ChatOpenAI(api_key="fake")
+    chat.set_turns([user, assistant])
+    assert OpenAIProvider._as_message_param([user])[0] is not msgs[1]
+
+
+def test_system_prompt_change_resets_cache():
+    from chatlas import ChatOpenAI
+    from chatlas._openai import OpenAIProvider
+
+    chat = ChatOpenAI(api_key="fake", system_prompt="foo")
+    system = chat.turns(include_system_prompt=True)[0]
+    OpenAIProvider._as_message_param([system])
+    assert system._params_cache
+
+    chat.system_prompt = "bar"
+    assert not system._params_cache
+    msgs = OpenAIProvider._as_message_param(chat.turns(include_system_prompt=True))
+    assert msgs[0]["content"] == "bar"
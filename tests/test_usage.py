@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+from chatlas import ChatGroq, ChatOpenAI, token_usage, track_usage
+from chatlas._tokens import tokens_log, tokens_reset
+from chatlas._usage import Tokens, UsageKey, UsageLedger
+
+from .test_batch import echo_chat
+
+
+def test_ledger_merges_threads():
+    ledger = UsageLedger()
+    key = UsageKey("OpenAI", "https://api.openai.com/v1", "gpt-4o")
+
+    def record():
+        for _ in range(1000):
+            ledger.record(key, Tokens(3, 2, cache_read=1), latency=0.3)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ledger.record(key, (1, 1))
+
+    (usage,) = ledger.token_usage()  # type: ignore
+    assert usage["requests"] == 8001
+    assert (usage["input"], usage["output"]) == (24001, 16001)
+    assert (usage["cache_read"], usage["cache_write"]) == (8000, 0)
+    # (Requests without a latency aren't in the histogram)
+    latency = usage["latency"]
+    assert sum(latency["counts"]) == 8000
+    assert latency["counts"][latency["bounds"].index(0.5)] == 8000
+    assert latency["total"] == pytest.approx(2400)
+
+    # The shards of finished threads are retired, but their usage is kept
+    assert len(ledger._shards) == 1
+    assert ledger.token_usage() == [usage]
+
+    ledger.reset()
+    assert ledger.token_usage() is None
+
+
+def test_usage_is_keyed_by_base_url_and_model():
+    tokens_reset()
+    tokens_log(ChatOpenAI(api_key="fake", model="gpt-4o").provider, (1, 2))
+    tokens_log(ChatOpenAI(api_key="fake", model="gpt-4o-mini").provider, (3, 4))
+    tokens_log(ChatGroq(api_key="fake", model="llama3").provider, (5, 6))
+
+    usage = token_usage()
+    assert usage is not None
+    assert [(x["name"], x["base_url"], x["model"]) for x in usage] == [
+        ("OpenAI", "https://api.openai.com/v1/", "gpt-4o"),
+        ("OpenAI", "https://api.openai.com/v1/", "gpt-4o-mini"),
+        ("OpenAI", "https://api.groq.com/openai/v1/", "llama3"),
+    ]
+    assert [x["input"] for x in usage] == [1, 3, 5]
+    tokens_reset()
+
+
+def test_chat_and_scoped_usage():
+    chat, _ = echo_chat()
+    other, _ = echo_chat()
+    tokens_reset()
+
+    other.chat("a", echo="none")
+    with track_usage() as usage:
+        chat.chat("b", echo="none")
+        chat.chat_batch(["c", "d"], max_concurrency=2)
+        with track_usage() as inner:
+            other.chat("e", echo="none")
+    other.chat("f", echo="none")
+
+    def requests(ledger):
+        return sum(x["requests"] for x in ledger.token_usage() or [])
+
+    # Scopes measure everything within them (including batches' threads)
+    assert requests(usage) == 4
+    assert requests(inner) == 1
+    # Chats measure their own requests (including their batches')
+    assert requests(chat._usage) == 3
+    assert chat.token_usage() == chat._usage.token_usage()
+    assert requests(other._usage) == 3
+    session = token_usage()
+    assert session is not None
+    assert session[0]["requests"] == 6
+    assert session[0]["input"] == 60
+    assert sum(session[0]["latency"]["counts"]) == 6
+    tokens_reset()